@@ -0,0 +1,14 @@
+from django.db.backends.mysql import base
+
+from ..pool import PooledConnectionMixin
+
+
+class DatabaseWrapper(PooledConnectionMixin, base.DatabaseWrapper):
+    def is_pooled_connection_healthy(self, connection):
+        if not self.settings_dict['CONN_HEALTH_CHECKS']:
+            return True
+        try:
+            connection.ping()
+        except self.Database.Error:
+            return False
+        return True
@@ -0,0 +1,152 @@
+"""
+Process-wide connection pooling for Django database backends.
+
+Django 4.2 opens a connection per thread and closes it when CONN_MAX_AGE runs
+out (after every request with the default of 0). ``PooledConnectionMixin``
+keeps closed connections in a pool shared by every thread of the process and
+hands them back out on the next connect, so a request does not pay for a new
+TCP/auth handshake. Configure it with a ``POOL`` entry in the database
+settings:
+
+    'POOL': {'SIZE': 10, 'MAX_OVERFLOW': 10, 'TIMEOUT': 30}
+
+``SIZE`` idle connections are kept, at most ``SIZE + MAX_OVERFLOW`` are open
+at once, and a connect waits up to ``TIMEOUT`` seconds for one to be returned.
+A ``SIZE`` of 0 turns pooling off.
+"""
+import queue
+import threading
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    def __init__(self, size, max_overflow, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=size)
+        self.slots = threading.BoundedSemaphore(size + max_overflow)
+        self.lock = threading.Lock()
+        self.in_use = 0
+
+    def checkout(self, connect, is_healthy):
+        """
+        Return an idle connection that passes ``is_healthy``, or a new one from ``connect``.
+        """
+        if not self.slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f'No database connection was free within {self.timeout}s')
+        try:
+            while True:
+                try:
+                    connection = self.idle.get_nowait()
+                except queue.Empty:
+                    connection = connect()
+                    break
+                if is_healthy(connection):
+                    break
+                self.discard(connection)
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.in_use += 1
+        return connection
+
+    def checkin(self, connection, reusable=True):
+        with self.lock:
+            self.in_use -= 1
+        try:
+            if not reusable:
+                self.discard(connection)
+                return
+            try:
+                self.idle.put_nowait(connection)
+            except queue.Full:
+                self.discard(connection)
+        finally:
+            self.slots.release()
+
+    @staticmethod
+    def discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_idle(self):
+        while True:
+            try:
+                self.discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def stats(self):
+        return {'size': self.size, 'idle': self.idle.qsize(), 'in_use': self.in_use}
+
+
+def get_pool(settings_dict):
+    """
+    Return the pool shared by every connection to the same database, or None when pooling is off.
+    """
+    options = settings_dict.get('POOL') or {}
+    size = int(options.get('SIZE', 0))
+    if size <= 0:
+        return None
+    key = (settings_dict['ENGINE'], settings_dict['NAME'], settings_dict.get('HOST'), settings_dict.get('PORT'), settings_dict.get('USER'))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(size, int(options.get('MAX_OVERFLOW', 0)), float(options.get('TIMEOUT', 30)))
+        return _pools[key]
+
+def close_pools():
+    """
+    Close every idle pooled connection, e.g. before forking worker processes.
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_idle()
+
+
+class PooledConnectionMixin:
+    """
+    Mix into a backend's DatabaseWrapper to borrow connections from the process pool.
+    """
+
+    @property
+    def pool(self):
+        return get_pool(self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connect = lambda: super(PooledConnectionMixin, self).get_new_connection(conn_params)
+        return pool.checkout(connect, self.is_pooled_connection_healthy)
+
+    def is_pooled_connection_healthy(self, connection):
+        if not self.settings_dict['CONN_HEALTH_CHECKS']:
+            return True
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        # A connection dropped mid-transaction or after errors is not trusted with the next request
+        reusable = not self.in_atomic_block and not self.errors_occurred
+        if reusable:
+            try:
+                with self.wrap_database_errors:
+                    self.connection.rollback()
+            except Exception:
+                reusable = False
+        pool.checkin(self.connection, reusable)
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'rmsapp.metrics.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +57,11 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
 ]
 
+# Per-view timings, query counts and Server-Timing headers; False removes the middleware entirely
+RMS_PERFORMANCE_METRICS = True
+# Latest requests kept per view for the percentile report
+RMS_PERFORMANCE_SAMPLES = 5000
+
 REST_FRAMEWORK = {'DEFAULT_PERMISSION_CLASSES': 
                   ['rest_framework.permissions.AllowAny']}
 
@@ -83,17 +91,98 @@ WSGI_APPLICATION = 'myproject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connection settings come from the environment so each deployment can tune them:
+#   RMS_DB_ENGINE, RMS_DB_NAME, RMS_DB_USER, RMS_DB_PASSWORD, RMS_DB_HOST, RMS_DB_PORT
+#   RMS_DB_CONN_MAX_AGE     seconds a connection is kept per thread (0 closes it after every request)
+#   RMS_DB_HEALTH_CHECKS    check a reused connection before the first query of a request
+#   RMS_DB_POOL_SIZE        idle connections kept in the process-wide pool (0 turns pooling off)
+#   RMS_DB_POOL_OVERFLOW    extra connections allowed above the pool size under load
+#   RMS_DB_POOL_TIMEOUT     seconds to wait for a free connection
+#   RMS_DB_REPLICA_HOST     read replica used by the read-only endpoints (dashboard, earnings, graphs)
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'rmsdata',
-        'USER': 'daigoab',
-        'PASSWORD': '2017abraham2027',
-        'HOST': 'localhost',
-        'PORT': '3306',
+        'ENGINE': os.environ.get('RMS_DB_ENGINE', 'myproject.backends.mysql'),
+        'NAME': os.environ.get('RMS_DB_NAME', 'rmsdata'),
+        'USER': os.environ.get('RMS_DB_USER', 'daigoab'),
+        'PASSWORD': os.environ.get('RMS_DB_PASSWORD', '2017abraham2027'),
+        'HOST': os.environ.get('RMS_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('RMS_DB_PORT', '3306'),
+        'CONN_MAX_AGE': int(os.environ.get('RMS_DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': env_bool('RMS_DB_HEALTH_CHECKS', True),
+        'POOL': {
+            'SIZE': int(os.environ.get('RMS_DB_POOL_SIZE', '0')),
+            'MAX_OVERFLOW': int(os.environ.get('RMS_DB_POOL_OVERFLOW', '10')),
+            'TIMEOUT': float(os.environ.get('RMS_DB_POOL_TIMEOUT', '30')),
+        },
     }
 }
 
+if os.environ.get('RMS_DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['RMS_DB_REPLICA_HOST'],
+        'PORT': os.environ.get('RMS_DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['rmsapp.routers.ReadReplicaRouter']
+# Alias the read-only endpoints read from when it is configured
+RMS_READ_REPLICA = 'replica'
+# Seconds the replica may trail default; a landlord's cached responses are rebuilt from default for this long after a write
+RMS_REPLICA_MAX_LAG = int(os.environ.get('RMS_REPLICA_MAX_LAG', '10'))
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+
+# The backend comes from the environment as well:
+#   RMS_CACHE_BACKEND       cache backend class; the default local-memory cache is private to each process
+#   RMS_CACHE_LOCATION      its location, e.g. redis://cache:6379/1 or cache:11211
+# Cached responses are invalidated by bumping a version token in this cache, so with several
+# workers it must be a shared backend (redis/memcached). Otherwise a write only invalidates the
+# worker that handled it, and the others keep serving stale responses until they expire.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('RMS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('RMS_CACHE_LOCATION', 'rms'),
+    }
+}
+
+# Seconds a cached dashboard/earnings/graph response is kept
+RMS_RESPONSE_CACHE_TIMEOUT = 300
+
+# Days past today the daily occupancy series is built up to
+RMS_OCCUPANCY_HORIZON_DAYS = 365
+
+# Password hashing
+# https://docs.djangoproject.com/en/4.2/topics/auth/passwords/
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# RMS_FAST_PASSWORD_HASHER hashes new passwords with MD5 for test runs and local seeding; never enable it in production.
+# Existing hashes still verify and are upgraded on the next login once it is off again.
+if env_bool('RMS_FAST_PASSWORD_HASHER', sys.argv[1:2] == ['test']):
+    PASSWORD_HASHERS.insert(0, 'django.contrib.auth.hashers.MD5PasswordHasher')
+
+# Processes hashing the passwords of a bulk registration (1 hashes in the request's own process),
+# used once a batch has at least RMS_PASSWORD_HASH_MIN_BATCH passwords
+RMS_PASSWORD_HASH_WORKERS = int(os.environ.get('RMS_PASSWORD_HASH_WORKERS', '1'))
+RMS_PASSWORD_HASH_MIN_BATCH = 8
+
+# Absolute link emailed to tenants invited to choose a password, e.g. https://app.example.com/invite/{uid}/{token}/;
+# the page behind it posts uid, token and password to invite/accept/. Inviting fails until it is set.
+RMS_INVITE_URL = os.environ.get('RMS_INVITE_URL')
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -17,10 +17,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.urls import re_path as url
-from rmsapp.views import *
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('', include('rmsapp.urls')),
     # path('', RentView.as_view(), name="tenant")
 ]
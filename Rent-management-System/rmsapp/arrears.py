@@ -0,0 +1,175 @@
+"""
+Arrears aging report.
+
+The database does the heavy lifting: one GROUP BY query sums the open balance
+of every (tenant, property) per aging bucket (0-30, 31-60, 61-90 and over 90
+days overdue), and another sums the payment credit not yet reconciled per
+(tenant, property). The reconciliation allocator then spends that credit on
+the oldest bucket first, exactly as reconciling would, so the report does not
+depend on whether the month has been reconciled. Results are stored in
+ArrearsSnapshot: a tenant's rows are rebuilt after a transaction that saved one
+of their payments or dues commits (see the signal handlers in models.py), once
+per transaction however many rows it touched. Balances move between buckets
+overnight, so the ``refresh_arrears`` command rebuilds everyone's rows and
+should run daily. The report itself only reads the snapshot and gives the date
+its oldest row was computed on. NumPy is imported on the first refresh, so
+importing the views does not load it.
+"""
+import datetime
+import time
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Min, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .bulk import insert_rows
+from .models import ArrearsSnapshot, Payment, RentDue
+
+BUCKETS = ('days_0_30', 'days_31_60', 'days_61_90', 'days_over_90')
+# Last day overdue of every bucket but the open-ended one
+BUCKET_LIMITS = (30, 60, 90)
+ZERO = Decimal('0.00')
+SNAPSHOT_FIELDS = ('landlord', 'tenant', 'property', 'as_of', *BUCKETS, 'total')
+
+
+def balance(minuend, subtrahend):
+    return Sum(F(minuend) - F(subtrahend), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+def bucket_of(as_of):
+    """
+    Expression giving the index in BUCKETS of a due's age on ``as_of``.
+    """
+    return Case(
+        *[When(due_date__gte=as_of - datetime.timedelta(days=limit), then=Value(index)) for index, limit in enumerate(BUCKET_LIMITS)],
+        default=Value(len(BUCKET_LIMITS)), output_field=IntegerField(),
+    )
+
+def compute_arrears(as_of, landlord=None, tenant_ids=None):
+    """
+    Return a tuple of SNAPSHOT_FIELDS values for every (tenant, property) owing rent on ``as_of``.
+    """
+    import numpy as np
+    from .reconciliation import allocate, from_cents, match_key, to_cents
+
+    dues = (
+        RentDue.objects.filter(is_paid=False, due_date__lte=as_of)
+        .annotate(
+            match_property_id=Coalesce('property_id', 'tenant__leased_property_id'),
+            match_landlord_id=Coalesce('property__landlord_id', 'tenant__leased_property__landlord_id'),
+        )
+        .filter(match_property_id__isnull=False)
+    )
+    payments = Payment.objects.filter(payment_date__lte=as_of, applied_amount__lt=F('amount'))
+    if landlord is not None:
+        dues = dues.filter(match_landlord_id=landlord.pk)
+        payments = payments.filter(property__landlord=landlord)
+    if tenant_ids is not None:
+        dues = dues.filter(tenant_id__in=tenant_ids)
+        payments = payments.filter(tenant_id__in=tenant_ids)
+
+    dues = list(
+        dues.annotate(bucket=bucket_of(as_of))
+        .values_list('tenant_id', 'match_property_id', 'match_landlord_id', 'bucket')
+        .annotate(owed=balance('rent_amount', 'amount_paid')).order_by()
+    )
+    credits = list(
+        payments.values_list('tenant_id', 'property_id')
+        .annotate(credit=balance('amount', 'applied_amount')).order_by()
+    )
+
+    pairs = {}
+    count = len(dues)
+    due_keys = np.fromiter((match_key(pairs, row[0], row[1]) for row in dues), dtype=np.int64, count=count)
+    landlords = np.fromiter((row[2] for row in dues), dtype=np.int64, count=count)
+    buckets = np.fromiter((row[3] for row in dues), dtype=np.int64, count=count)
+    owed = np.fromiter((to_cents(row[4]) for row in dues), dtype=np.int64, count=count)
+    # Oldest bucket first within each pair, the order credit pays dues in
+    order = np.lexsort((-buckets, due_keys))
+    due_keys, landlords, buckets, owed = due_keys[order], landlords[order], buckets[order], owed[order]
+
+    payment_keys = np.fromiter((match_key(pairs, row[0], row[1]) for row in credits), dtype=np.int64, count=len(credits))
+    payment_credits = np.fromiter((to_cents(row[2]) for row in credits), dtype=np.int64, count=len(credits))
+    order = np.argsort(payment_keys)
+    applied, _ = allocate(due_keys, owed, payment_keys[order], payment_credits[order])
+
+    owed -= applied
+    owing = owed > 0
+    due_keys, landlords, buckets, owed = due_keys[owing], landlords[owing], buckets[owing], owed[owing]
+    if not len(due_keys):
+        return []
+
+    pair_keys, starts, rows = np.unique(due_keys, return_index=True, return_inverse=True)
+    table = np.zeros((len(pair_keys), len(BUCKETS)), dtype=np.int64)
+    table[rows, buckets] = owed
+
+    # Keys number the pairs in the order they were first seen
+    pairs = list(pairs)
+    return [
+        (int(landlords[start]), *pairs[key], as_of, *map(from_cents, row), from_cents(row.sum()))
+        for key, start, row in zip(pair_keys, starts, table)
+    ]
+
+def refresh_arrears(as_of=None, landlord=None, tenant_ids=None, batch_size=2000):
+    """
+    Rebuild the snapshot for everyone, one landlord or some tenants, and return a summary.
+    """
+    started = time.perf_counter()
+    as_of = as_of or datetime.date.today()
+    rows = compute_arrears(as_of, landlord=landlord, tenant_ids=tenant_ids)
+
+    with transaction.atomic():
+        existing = ArrearsSnapshot.objects.all()
+        if landlord is not None:
+            existing = existing.filter(landlord=landlord)
+        if tenant_ids is not None:
+            existing = existing.filter(tenant_id__in=tenant_ids)
+        existing.delete()
+        insert_rows(ArrearsSnapshot, SNAPSHOT_FIELDS, rows, batch_size)
+
+    return {
+        'rows': len(rows),
+        'total': sum((row[-1] for row in rows), ZERO),
+        'seconds': time.perf_counter() - started,
+    }
+
+def schedule_refresh(tenant_id):
+    """
+    Refresh a tenant's snapshot once the current transaction commits.
+
+    Tenants are collected per connection, so the first callback refreshes every
+    tenant the transaction touched in one pass and the others find nothing to do.
+    A rolled back transaction leaves its tenants to the next commit, which
+    refreshes them needlessly but harmlessly.
+    """
+    connection = transaction.get_connection()
+    connection.__dict__.setdefault('rms_pending_arrears', set()).add(tenant_id)
+    transaction.on_commit(refresh_pending)
+
+def refresh_pending():
+    connection = transaction.get_connection()
+    tenant_ids = connection.__dict__.pop('rms_pending_arrears', None)
+    if tenant_ids:
+        refresh_arrears(tenant_ids=sorted(tenant_ids))
+
+def aging_report(landlord):
+    """
+    Return a landlord's arrears per tenant and property from the snapshot, largest balance first, with bucket totals.
+    """
+    snapshot = ArrearsSnapshot.objects.filter(landlord=landlord)
+    totals = snapshot.aggregate(as_of=Min('as_of'), **{field: Sum(field) for field in BUCKETS + ('total',)})
+    as_of = totals.pop('as_of')
+    rows = snapshot.order_by('-total', 'tenant_id').values(
+        'tenant_id', 'tenant__username', 'property_id', 'property__property_name', *BUCKETS, 'total'
+    )
+    return {
+        'as_of': as_of,
+        'totals': {field: value or ZERO for field, value in totals.items()},
+        'arrears': [{
+            'tenant_id': row['tenant_id'],
+            'tenant': row['tenant__username'],
+            'property_id': row['property_id'],
+            'property_name': row['property__property_name'],
+            **{field: row[field] for field in BUCKETS + ('total',)},
+        } for row in rows],
+    }
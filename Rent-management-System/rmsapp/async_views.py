@@ -0,0 +1,134 @@
+"""
+Native async versions of the read-heavy endpoints, served under ``async/``.
+
+They answer exactly like their synchronous counterparts in views.py but read
+through Django's async ORM, so under ASGI a request waiting on the database
+does not hold a worker thread. DRF 3.14 has no async ``@api_view``; the
+``async_api_view`` decorator runs DRF authentication and checks the method
+instead, and answers authentication errors with the status and detail the
+synchronous views give.
+
+With Django 4.2 the async ORM still executes queries on one shared
+thread-sensitive executor, so the dashboard's ``asyncio.gather`` overlaps
+Python work rather than database round trips. The views need no change to
+benefit once queries run natively async.
+"""
+import asyncio
+import datetime
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .cache import cache_per_landlord
+from .models import Property, Tenant
+from .routers import read_from_replica
+from .serializer import property_list_encoder, tenant_list_encoder
+from .views import (
+    income_graph_response, income_rows, income_series, monthly_graph_title, series_params, series_response,
+    yearly_graph_title,
+)
+
+
+def error_response(request, error):
+    """
+    Answer a DRF APIException raised while authenticating, as APIView.handle_exception would.
+    """
+    status, headers = error.status_code, {}
+    if isinstance(error, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        header = request.authenticators[0].authenticate_header(request) if request.authenticators else None
+        if header:
+            headers['WWW-Authenticate'] = header
+        else:
+            status = 403
+    data = error.detail if isinstance(error.detail, (list, dict)) else {'detail': error.detail}
+    return JsonResponse(data, status=status, headers=headers, safe=False)
+
+def async_api_view(methods):
+    """
+    Authenticate an async view with DRF's authentication classes and only allow ``methods``.
+
+    The view receives the DRF ``Request``.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+            request = Request(request, authenticators=[authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+            try:
+                # Bad credentials raise AuthenticationFailed here
+                user = await sync_to_async(lambda: request.user)()
+                if not user or not user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+            except exceptions.APIException as error:
+                return error_response(request, error)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+#Dashboard for authenticated users
+@async_api_view(['GET'])
+@cache_per_landlord('async_dashboard')
+@read_from_replica
+async def dashboard(request):
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    properties, tenants = await asyncio.gather(
+        property_list_encoder.aencode(Property.objects.filter(landlord=landlord)),
+        tenant_list_encoder.aencode(Tenant.objects.filter(leased_property__landlord=landlord)),
+    )
+    return JsonResponse({'properties': properties, 'tenants': tenants})
+
+#Calculate the total yearly income
+@async_api_view(['GET'])
+@cache_per_landlord('async_total_earnings_for_year')
+@read_from_replica
+async def total_earnings_for_year(request, year):
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    return JsonResponse({'total_earnings': await landlord.atotal_earnings_for_year(year)})
+
+#Calculate the total monthly income
+@async_api_view(['GET'])
+@cache_per_landlord('async_total_earnings_for_month')
+@read_from_replica
+async def total_earnings_for_month(request, year, month):
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    return JsonResponse({'total_earnings': await landlord.atotal_earnings_for_month(year, month)})
+
+#Earnings for every month of a date range
+@async_api_view(['GET'])
+@cache_per_landlord('async_earnings_series')
+@read_from_replica
+async def earnings_series(request):
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    try:
+        start_month, end_month, by_property = series_params(request.query_params)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    months, series = await landlord.aearnings_series(start_month, end_month, by_property=by_property)
+    return series_response(months, series, by_property)
+
+#Graphical progress of monthly income
+@async_api_view(['GET'])
+@cache_per_landlord('async_monthly_income_graph')
+@read_from_replica
+async def monthly_income_graph(request, year, month):
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    first_month = datetime.date(year, month, 1)
+    labels, totals = income_series([row async for row in income_rows(landlord, first_month, first_month)])
+    return income_graph_response(request, labels, totals, monthly_graph_title(year, month))
+
+#Graph for yearly income progress
+@async_api_view(['GET'])
+@cache_per_landlord('async_yearly_income_graph')
+@read_from_replica
+async def yearly_income_graph(request, year):
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    labels, totals = income_series([row async for row in income_rows(landlord, datetime.date(year, 1, 1), datetime.date(year, 12, 1))])
+    return income_graph_response(request, labels, totals, yearly_graph_title(year))
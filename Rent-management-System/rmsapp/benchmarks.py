@@ -0,0 +1,135 @@
+"""
+Helpers shared by the benchmark management commands.
+"""
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.test.client import AsyncClient, AsyncClientHandler
+from rest_framework.test import force_authenticate
+
+HEAVY_MODULES = ('plotly', 'pandas', 'numpy')
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """
+    Run a benchmark inside a transaction that is always rolled back, so seeded
+    rows never reach the database.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+class ForceAuthAsyncClientHandler(AsyncClientHandler):
+    """
+    ASGI test handler that authenticates every request as ``force_user``, like DRF's APIClient does for WSGI.
+    """
+    force_user = None
+
+    async def get_response_async(self, request):
+        force_authenticate(request, self.force_user)
+        return await super().get_response_async(request)
+
+
+class ForceAuthAsyncClient(AsyncClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.handler = ForceAuthAsyncClientHandler(self.handler.enforce_csrf_checks)
+
+    def force_authenticate(self, user):
+        self.handler.force_user = user
+
+
+def timed(function, *args, repeat=1):
+    """
+    Call ``function`` ``repeat`` times and return the best wall time in seconds.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure_import_time(module):
+    """
+    Import ``module`` and the project URLconf in a fresh interpreter under
+    ``python -X importtime`` and return the total time and the slowest packages.
+    """
+    code = f'import {module}; import {settings.ROOT_URLCONF}'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env=os.environ.copy(), cwd=settings.BASE_DIR,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'Importing {module} failed:\n{result.stderr}')
+
+    total_us = 0
+    self_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        total_us += int(self_us)
+        package = name.strip().split('.')[0]
+        self_times[package] = self_times.get(package, 0) + int(self_us)
+
+    return {
+        'module': module,
+        'total_ms': round(total_us / 1000, 1),
+        'heavy_modules': sorted(set(self_times).intersection(HEAVY_MODULES)),
+        'slowest': [
+            {'package': package, 'self_ms': round(us / 1000, 1)}
+            for package, us in sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:10]
+        ],
+    }
+
+
+def latency_summary(durations):
+    """
+    Summarize per-request durations (seconds) as throughput and latency percentiles in milliseconds.
+    """
+    from .metrics import percentile
+
+    ordered = sorted(duration * 1000 for duration in durations)
+    total = sum(durations)
+    return {
+        'requests': len(ordered),
+        'requests_per_second': round(len(ordered) / total, 1) if total else 0.0,
+        'p50_ms': percentile(ordered, 50),
+        'p95_ms': percentile(ordered, 95),
+        'p99_ms': percentile(ordered, 99),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance=0.2):
+    """
+    Return one message per scenario whose p95 latency grew, or throughput
+    dropped, by more than ``tolerance`` compared with ``baseline``.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current['requests_per_second'] < previous['requests_per_second'] * (1 - tolerance):
+            regressions.append(f"{name}: {previous['requests_per_second']} -> {current['requests_per_second']} requests/s")
+    return regressions
@@ -0,0 +1,68 @@
+"""
+Rent-due generation for the whole portfolio.
+
+Tenants are walked in primary-key order in fixed-size chunks and each chunk is
+written with one ``bulk_create(ignore_conflicts=True)``. The unique
+(tenant, due_date) constraint makes re-runs idempotent, and ``start_after``
+lets an interrupted run resume from the last tenant id it reported.
+"""
+import datetime
+import time
+
+from django.db import transaction
+
+from .models import RentDue, Tenant
+
+
+def next_billing_date(today=None):
+    """
+    Return the first day of the month after ``today``.
+    """
+    today = today or datetime.date.today()
+    return datetime.date(today.year + today.month // 12, today.month % 12 + 1, 1)
+
+def leased_tenants(due_date):
+    """
+    Tenants whose property lease covers ``due_date``.
+    """
+    cycle_start = datetime.datetime.combine(due_date, datetime.time.min, tzinfo=datetime.timezone.utc)
+    return Tenant.objects.filter(
+        leased_property__isnull=False,
+        leased_property__lease_start_date__lt=cycle_start + datetime.timedelta(days=1),
+        leased_property__lease_end_date__gt=cycle_start,
+    )
+
+def generate_rent_dues(due_date, chunk_size=5000, start_after=0, progress=None):
+    """
+    Create the RentDue row for ``due_date`` for every leased tenant.
+
+    Returns a dict with the number of tenants scanned, the last tenant id
+    processed, the elapsed time and the throughput. ``progress`` is called
+    with that dict after every chunk.
+    """
+    tenants = leased_tenants(due_date).order_by('pk').values_list(
+        'pk', 'leased_property_id', 'leased_property__property_name', 'leased_property__rent_amount'
+    )
+    stats = {'tenants': 0, 'last_tenant_id': start_after, 'seconds': 0.0, 'tenants_per_second': 0.0}
+    started = time.perf_counter()
+
+    while True:
+        # Keyset pagination keeps every chunk an indexed range read and memory bounded by chunk_size
+        chunk = list(tenants.filter(pk__gt=stats['last_tenant_id'])[:chunk_size])
+        if not chunk:
+            break
+
+        with transaction.atomic():
+            RentDue.objects.bulk_create([
+                RentDue(tenant_id=tenant_id, property_id=property_id, property_name=property_name, due_date=due_date, rent_amount=rent_amount)
+                for tenant_id, property_id, property_name, rent_amount in chunk
+            ], ignore_conflicts=True)
+
+        stats['tenants'] += len(chunk)
+        stats['last_tenant_id'] = chunk[-1][0]
+        stats['seconds'] = time.perf_counter() - started
+        stats['tenants_per_second'] = stats['tenants'] / stats['seconds'] if stats['seconds'] else 0.0
+        if progress:
+            progress(stats)
+
+    return stats
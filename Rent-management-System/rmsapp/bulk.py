@@ -0,0 +1,110 @@
+"""
+Bulk reads and writes.
+
+insert_rows does raw multi-row inserts for the seeder, the arrears snapshot
+and the daily occupancy series. Neither it nor bulk_create returns keys on
+MySQL, so created_ids and set_created_keys read them back. keyset_chunks walks a large result a chunk at
+a time for the streaming exports. ``iterator(chunk_size=...)`` would not bound
+memory on MySQL, because mysqlclient buffers the whole result client-side.
+"""
+import functools
+import itertools
+import operator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+
+BATCH_SIZE = 2000
+
+
+def insert_rows(model, field_names, rows, batch_size=BATCH_SIZE):
+    """
+    Insert tuples of raw values for ``field_names`` with ``executemany``, one batch at a time.
+
+    Columns not listed get their field default. This skips building a model
+    instance per row, which is most of bulk_create's cost at this volume.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    ops = connection.ops
+    given = [model._meta.get_field(name) for name in field_names]
+    defaults = [field for field in model._meta.concrete_fields if not field.primary_key and field not in given]
+    default_values = tuple(field.get_db_prep_save(field.get_default(), connection) for field in defaults)
+    converters = []
+    for field in given:
+        kind = field.get_internal_type()
+        if kind == 'DateTimeField':
+            converters.append(ops.adapt_datetimefield_value)
+        elif kind == 'DateField':
+            converters.append(ops.adapt_datefield_value)
+        elif kind == 'DecimalField':
+            converters.append(lambda value, field=field: ops.adapt_decimalfield_value(value, field.max_digits, field.decimal_places))
+        else:
+            converters.append(None)
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        ops.quote_name(model._meta.db_table),
+        ', '.join(ops.quote_name(field.column) for field in given + defaults),
+        ', '.join(['%s'] * (len(given) + len(defaults))),
+    )
+
+    rows = iter(rows)
+    count = 0
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                return count
+            cursor.executemany(sql, [
+                tuple(convert(value) if convert else value for convert, value in zip(converters, row)) + default_values
+                for row in batch
+            ])
+            count += len(batch)
+
+def created_ids(model, after_id, count):
+    """
+    Primary keys of the ``count`` rows inserted after ``after_id``, in insertion order.
+    """
+    return list(model.objects.filter(pk__gt=after_id).order_by('pk').values_list('pk', flat=True)[:count])
+
+def last_id(model):
+    return model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+def set_created_keys(objects, field='username'):
+    """
+    Set the primary key of every bulk_create'd object that lacks one, looking them up by their unique ``field``.
+    """
+    missing = [obj for obj in objects if obj.pk is None]
+    if not missing:
+        return
+    model = type(missing[0])
+    ids = dict(model.objects.filter(**{f'{field}__in': [getattr(obj, field) for obj in missing]}).values_list(field, 'pk'))
+    for obj in missing:
+        obj.pk = ids[getattr(obj, field)]
+
+def after(order, values):
+    """
+    Filter for rows sorting after ``values`` in ``order``.
+    """
+    return functools.reduce(operator.or_, (
+        Q(**{field: value for field, value in zip(order[:position], values)}, **{f'{order[position]}__gt': values[position]})
+        for position in range(len(order))
+    ))
+
+def keyset_chunks(queryset, order, key, chunk_size=2000):
+    """
+    Yield the rows of a ``values()`` or ``values_list()`` queryset in lists of up to ``chunk_size``.
+
+    Rows come sorted by the ``order`` fields, the last of which must be unique.
+    ``key(row)`` returns a row's values for them. Every chunk is its own query
+    starting after the previous chunk's last row, so it stays an indexed range
+    read whatever the ledger size.
+    """
+    queryset = queryset.order_by(*order)
+    last = None
+    while True:
+        chunk = list((queryset if last is None else queryset.filter(after(order, last)))[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = key(chunk[-1])
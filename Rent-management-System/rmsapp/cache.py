@@ -0,0 +1,194 @@
+"""
+Per-landlord response cache for the read-heavy endpoints.
+
+Every landlord has a version token in the cache. It is part of each cached
+entry's key and of the ETag, and it is replaced whenever one of that landlord's
+properties, tenants or revenue rows changes (see the signal handlers in
+models.py). The token is replaced when the change is made and again when its
+transaction commits, so anything cached from a read in between is dropped too.
+Old entries are never read again and expire on their own. Clients
+that send the current ETag or a fresh If-Modified-Since get a 304 without the
+view running. For ``RMS_REPLICA_MAX_LAG`` seconds after a landlord's token
+changes, a cache miss is rebuilt from ``default``. A replica that has not
+applied the write yet would otherwise be cached under the new token. Tokens
+live in the ``default`` cache, which must be shared between workers (see
+``CACHES`` in settings.py) for a write to invalidate all of them.
+"""
+import asyncio
+import functools
+import hashlib
+import time
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+from .routers import primary_reads
+
+GENERATION_KEY = 'rms:generation'
+
+
+def timeout():
+    return getattr(settings, 'RMS_RESPONSE_CACHE_TIMEOUT', 300)
+
+def new_token():
+    return format(time.time_ns(), 'x')
+
+def generation():
+    """
+    Global token, bumped to drop every landlord's entries at once.
+    """
+    token = cache.get(GENERATION_KEY)
+    if token is None:
+        token = new_token()
+        if not cache.add(GENERATION_KEY, token, None):
+            token = cache.get(GENERATION_KEY, token)
+    return token
+
+def landlord_state(landlord_id):
+    """
+    Return ``(version, last_modified)`` for a landlord's cached data.
+    """
+    key = f'rms:{generation()}:landlord:{landlord_id}'
+    state = cache.get(key)
+    if state is None:
+        state = (new_token(), int(time.time()))
+        if not cache.add(key, state, None):
+            state = cache.get(key, state)
+    return state
+
+def replace_landlord_token(landlord_id):
+    cache.set(f'rms:{generation()}:landlord:{landlord_id}', (new_token(), int(time.time())), None)
+
+def invalidate_landlord(landlord_id):
+    """
+    Make every cached response of this landlord stale, now and once the current transaction commits.
+    """
+    if landlord_id is not None:
+        replace_landlord_token(landlord_id)
+        transaction.on_commit(functools.partial(replace_landlord_token, landlord_id))
+
+def replace_generation():
+    cache.set(GENERATION_KEY, new_token(), None)
+
+def invalidate_all():
+    replace_generation()
+    transaction.on_commit(replace_generation)
+
+def reads_for(last_modified):
+    """
+    Read from ``default`` while the replica may still be missing the landlord's last write.
+    """
+    if time.time() - last_modified <= getattr(settings, 'RMS_REPLICA_MAX_LAG', 10):
+        return primary_reads()
+    return nullcontext()
+
+def count(view_name, outcome):
+    key = f'rms:stats:{view_name}:{outcome}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+def cache_stats(view_names):
+    """
+    Return the hit/miss/not-modified counters of each cached view.
+    """
+    outcomes = ('hit', 'miss', 'not_modified')
+    keys = [f'rms:stats:{name}:{outcome}' for name in view_names for outcome in outcomes]
+    values = cache.get_many(keys)
+    return {
+        name: {outcome: values.get(f'rms:stats:{name}:{outcome}', 0) for outcome in outcomes}
+        for name in view_names
+    }
+
+def not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and if_modified_since >= last_modified
+
+def with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+CACHED_VIEWS = []
+
+def lookup(request, view_name, kwargs):
+    """
+    Return ``(etag, last_modified, key, response)``; ``response`` is set when the view need not run.
+    """
+    version, last_modified = landlord_state(request.user.pk)
+    params = f'{sorted(kwargs.items())}?{sorted(request.query_params.lists())}'
+    digest = hashlib.sha1(params.encode()).hexdigest()[:16]
+    etag = f'"{view_name}-{version}-{digest}"'
+
+    if not_modified(request, etag, last_modified):
+        count(view_name, 'not_modified')
+        return etag, last_modified, None, with_validators(HttpResponseNotModified(), etag, last_modified)
+
+    key = f'rms:response:{view_name}:{request.user.pk}:{version}:{digest}'
+    entry = cache.get(key)
+    if entry is None:
+        count(view_name, 'miss')
+        return etag, last_modified, key, None
+
+    count(view_name, 'hit')
+    kind, status, payload = entry
+    if kind == 'data':
+        response = Response(payload, status=status)
+    else:
+        response = HttpResponse(payload, status=status, content_type='application/json')
+    return etag, last_modified, key, with_validators(response, etag, last_modified)
+
+def store(response, key, etag, last_modified):
+    if response.status_code == 200:
+        if isinstance(response, Response):
+            cache.set(key, ('data', response.status_code, response.data), timeout())
+        elif isinstance(response, JsonResponse):
+            cache.set(key, ('json', response.status_code, response.content), timeout())
+        with_validators(response, etag, last_modified)
+    return response
+
+def cache_per_landlord(view_name):
+    """
+    Cache a GET view's output per authenticated landlord and request parameters.
+
+    Goes directly above the view function, below ``@api_view`` and
+    ``@permission_classes``, so authentication has already run. Async views
+    are wrapped with an async wrapper.
+    """
+    CACHED_VIEWS.append(view_name)
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                etag, last_modified, key, response = await sync_to_async(lookup)(request, view_name, kwargs)
+                if response is not None:
+                    return response
+                with reads_for(last_modified):
+                    response = await view(request, *args, **kwargs)
+                return await sync_to_async(store)(response, key, etag, last_modified)
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag, last_modified, key, response = lookup(request, view_name, kwargs)
+            if response is not None:
+                return response
+            with reads_for(last_modified):
+                response = view(request, *args, **kwargs)
+            return store(response, key, etag, last_modified)
+        return wrapper
+    return decorator
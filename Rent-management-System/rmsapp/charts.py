@@ -0,0 +1,16 @@
+"""
+Chart rendering for the income graph endpoints.
+
+Plotly (and the pandas stack it pulls in) is only imported the first time a
+figure is actually requested, so workers do not pay for it at boot.
+"""
+
+
+def plotly_bar_json(labels, totals, title):
+    """
+    Build a Plotly bar chart of ``totals`` per label and return it as JSON.
+    """
+    import plotly.express as px
+
+    fig = px.bar(x=labels, y=[float(total) for total in totals], labels={'x': 'property__property_name', 'y': 'total_amount'}, title=title)
+    return fig.to_json()
@@ -0,0 +1,132 @@
+"""
+Streaming exports of a landlord's revenue and payment ledgers.
+
+Rows are read with keyset pagination, one ``chunk_size`` query at a time (see
+bulk.keyset_chunks), and encoded chunk by chunk, so memory stays flat however
+long the ledger is, on MySQL too. CSV is always available.
+Parquet needs pyarrow, which is imported only when a Parquet export is
+requested.
+"""
+import csv
+import datetime
+import io
+
+from .bulk import keyset_chunks
+from .models import Payment, Revenue
+
+LEDGERS = {
+    'revenue': {
+        'columns': ['id', 'payment_date', 'property', 'tenant_email', 'amount'],
+        'fields': ['id', 'payment_date', 'property__property_name', 'tenant__email', 'amount'],
+        'types': ['int64', 'timestamp', 'string', 'string', 'decimal'],
+    },
+    'payments': {
+        'columns': ['id', 'payment_date', 'property', 'tenant_email', 'amount', 'applied_amount'],
+        'fields': ['id', 'payment_date', 'property__property_name', 'tenant__email', 'amount', 'applied_amount'],
+        'types': ['int64', 'date', 'string', 'string', 'decimal', 'decimal'],
+    },
+}
+
+
+def ledger_rows(ledger, landlord, start=None, end=None, chunk_size=2000):
+    """
+    Return ``(columns, types, row_iterator)`` for one ledger, oldest payment first.
+
+    ``start`` and ``end`` are inclusive dates.
+    """
+    if ledger == 'revenue':
+        # Compare against UTC day boundaries so the (landlord, payment_date) index can be used
+        queryset = Revenue.objects.filter(landlord=landlord)
+        if start:
+            queryset = queryset.filter(payment_date__gte=datetime.datetime.combine(start, datetime.time.min, tzinfo=datetime.timezone.utc))
+        if end:
+            queryset = queryset.filter(payment_date__lt=datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tzinfo=datetime.timezone.utc))
+    else:
+        queryset = Payment.objects.filter(property__landlord=landlord)
+        if start:
+            queryset = queryset.filter(payment_date__gte=start)
+        if end:
+            queryset = queryset.filter(payment_date__lte=end)
+
+    spec = LEDGERS[ledger]
+    # 'id' and 'payment_date' are the first two fields of both ledgers
+    chunks = keyset_chunks(queryset.values_list(*spec['fields']), ('payment_date', 'id'), lambda row: (row[1], row[0]), chunk_size)
+    return spec['columns'], spec['types'], (row for chunk in chunks for row in chunk)
+
+def iter_csv(columns, rows, chunk_size=2000):
+    """
+    Yield CSV text, ``chunk_size`` rows at a time.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that hands back whatever has been written since the last drain.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(columns, types, rows, chunk_size=50000):
+    """
+    Yield Parquet bytes, writing one row group per ``chunk_size`` rows.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {
+        'int64': pa.int64(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+        'date': pa.date32(),
+        'string': pa.string(),
+        'decimal': pa.decimal128(12, 2),
+    }
+    schema = pa.schema([(column, arrow_types[kind]) for column, kind in zip(columns, types)])
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in chunk], schema=schema))
+            chunk = []
+            yield sink.drain()
+    if chunk:
+        writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in chunk], schema=schema))
+    writer.close()
+    yield sink.drain()
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
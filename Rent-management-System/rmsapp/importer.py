@@ -0,0 +1,355 @@
+"""
+Bulk import of properties, tenants and historical revenue from CSV or JSONL.
+
+Files are read one record at a time and handled in batches. Each batch is
+validated, has its foreign keys resolved through in-memory lookup maps (filled
+with one query per batch for keys not seen before), and is written with
+``bulk_create`` in its own transaction. A batch the database rejects is
+retried one row per transaction, so only the offending rows fail. Bad rows are
+reported with their line number and skipped; they never abort the rest of the
+file. No emails are sent, except invitations to imported tenants when asked
+for.
+"""
+import csv
+import datetime
+import io
+import json
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from .bulk import set_created_keys
+from .cache import invalidate_landlord
+from .invitations import invitation_url, queue_invitations
+from .models import (
+    LEASE_FIELDS, Property, Revenue, Tenant, apply_occupancy_changes, apply_revenue_to_rollup, occupancy_intervals, property_intervals,
+    revenue_month,
+)
+
+MAX_REPORTED_ERRORS = 1000
+# Lookup-map value of a key that matches more than one row
+AMBIGUOUS = object()
+
+
+def read_records(stream, file_format):
+    """
+    Yield ``(line_number, record)`` pairs from a CSV or JSONL text stream.
+
+    A JSONL line that is not a JSON object is yielded as an exception in place of its record.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError as error:
+                    yield line_number, error
+                    continue
+                if isinstance(record, dict):
+                    yield line_number, record
+                else:
+                    yield line_number, ValueError(f'expected a JSON object, got {type(record).__name__}')
+    else:
+        raise ValueError(f'Unsupported file format: {file_format}')
+
+def text_stream(uploaded_file):
+    """
+    Wrap a binary upload so it can be read line by line as UTF-8 text.
+    """
+    return io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': message})
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'errors': self.error_count,
+            'error_details': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def field_value(model, name, record, required=True, default=None):
+    """
+    Convert a raw record value with the model field's own ``to_python``.
+    """
+    raw = record.get(name)
+    if raw in (None, ''):
+        if required and default is None:
+            raise ValidationError(f'{name} is required')
+        return default
+    field = model._meta.get_field(name)
+    value = field.to_python(raw)
+    for validator in field.validators:
+        validator(value)
+    return value
+
+
+class Importer:
+    """
+    Base class: subclasses parse records into unsaved model instances and resolve foreign keys per batch.
+    """
+    model = None
+
+    def __init__(self, landlord, batch_size=1000):
+        self.landlord = landlord
+        self.batch_size = batch_size
+
+    def run(self, records, progress=None):
+        report = ImportReport()
+        batch = []
+        for line_number, record in records:
+            report.rows += 1
+            batch.append((line_number, record))
+            if len(batch) == self.batch_size:
+                self.import_batch(batch, report)
+                batch = []
+                if progress:
+                    progress(report)
+        if batch:
+            self.import_batch(batch, report)
+        report.seconds = time.perf_counter() - report.started
+        return report
+
+    def import_batch(self, batch, report):
+        self.prepare(batch)
+        objects = []
+        for line_number, record in batch:
+            if isinstance(record, Exception):
+                report.error(line_number, f'Invalid record: {record}')
+                continue
+            try:
+                objects.append((line_number, self.build(record)))
+            except (ValidationError, ValueError, KeyError) as error:
+                report.error(line_number, '; '.join(error.messages) if isinstance(error, ValidationError) else str(error))
+
+        if not objects:
+            return
+        try:
+            self.create([obj for _, obj in objects])
+        except DatabaseError:
+            # Find the rows the database rejects by saving them one at a time
+            created = 0
+            for line_number, obj in objects:
+                # Keys set by the rolled back insert are not in the table
+                obj.pk = None
+                try:
+                    self.create([obj])
+                except DatabaseError as error:
+                    report.error(line_number, f'Rejected by the database: {error}')
+                else:
+                    created += 1
+        else:
+            created = len(objects)
+        if created:
+            report.created += created
+            invalidate_landlord(self.landlord.pk)
+
+    def create(self, objects):
+        with transaction.atomic():
+            self.model.objects.bulk_create(objects)
+            self.after_create(objects)
+
+    def prepare(self, batch):
+        """
+        Load whatever lookup-map entries this batch needs, in as few queries as possible.
+        """
+
+    def build(self, record):
+        raise NotImplementedError
+
+    def after_create(self, objects):
+        """
+        Keep denormalized state in sync; bulk_create does not send model signals.
+        """
+
+
+class PropertyImporter(Importer):
+    model = Property
+
+    def build(self, record):
+        return Property(
+            landlord=self.landlord,
+            property_name=field_value(Property, 'property_name', record),
+            address=field_value(Property, 'address', record),
+            bedrooms=field_value(Property, 'bedrooms', record),
+            rent_amount=field_value(Property, 'rent_amount', record),
+            lease_start_date=field_value(Property, 'lease_start_date', record, required=False, default=Property._meta.get_field('lease_start_date').get_default()),
+            lease_end_date=field_value(Property, 'lease_end_date', record, required=False, default=Property._meta.get_field('lease_end_date').get_default()),
+            status=field_value(Property, 'status', record, required=False, default=True),
+        )
+
+    def after_create(self, properties):
+        apply_occupancy_changes(self.landlord.pk, [
+            ([], occupancy_intervals(property.lease_start_date, property.lease_end_date, property.status, property.occupied))
+            for property in properties
+        ])
+
+
+class PropertyLookupMixin:
+    """
+    Resolves a ``property_name`` column against the landlord's properties.
+    Names are not unique, and a name shared by several properties is reported
+    instead of picking one of them.
+    """
+
+    def prepare(self, batch):
+        super().prepare(batch)
+        if not hasattr(self, 'properties'):
+            self.properties = {}
+            for name, pk in Property.objects.filter(landlord=self.landlord).values_list('property_name', 'pk'):
+                self.properties[name] = AMBIGUOUS if name in self.properties else pk
+
+    def property_id(self, record):
+        name = record.get('property_name')
+        if name not in self.properties:
+            raise ValueError(f'Unknown property: {name}')
+        if self.properties[name] is AMBIGUOUS:
+            raise ValueError(f'More than one of your properties is named {name}')
+        return self.properties[name]
+
+
+class TenantImporter(PropertyLookupMixin, Importer):
+    """
+    Tenants are created with an unusable password; with ``invite`` each one is
+    emailed a link to choose it.
+    """
+    model = Tenant
+
+    def __init__(self, landlord, batch_size=1000, invite=False):
+        super().__init__(landlord, batch_size=batch_size)
+        self.invite = invite
+        if invite:
+            invitation_url()
+
+    def prepare(self, batch):
+        super().prepare(batch)
+        usernames = {record.get('username') or record.get('email') for _, record in batch if isinstance(record, dict)}
+        self.taken_usernames = set(Tenant.objects.filter(username__in=usernames).values_list('username', flat=True))
+        property_ids = [self.properties.get(record.get('property_name')) for _, record in batch if isinstance(record, dict)]
+        self.leased = set(Tenant.objects.filter(
+            leased_property_id__in=[pk for pk in property_ids if pk is not None and pk is not AMBIGUOUS]
+        ).values_list('leased_property_id', flat=True))
+
+    def build(self, record):
+        email = field_value(Tenant, 'email', record)
+        # The username defaults to the email, and either one must pass the username field's checks
+        username = field_value(Tenant, 'username', {'username': record.get('username') or email})
+        if username in self.taken_usernames:
+            raise ValueError(f'A tenant with username {username} already exists')
+
+        leased_property_id = self.property_id(record) if record.get('property_name') else None
+        if leased_property_id is not None and leased_property_id in self.leased:
+            raise ValueError(f"Property {record['property_name']} already has a tenant")
+
+        tenant = Tenant(
+            username=username,
+            email=email,
+            first_name=field_value(Tenant, 'first_name', record, required=False, default=''),
+            last_name=field_value(Tenant, 'last_name', record, required=False, default=''),
+            phone_number=field_value(Tenant, 'phone_number', record),
+            address=field_value(Tenant, 'address', record, required=False, default=''),
+            city=field_value(Tenant, 'city', record, required=False, default=''),
+            leased_property_id=leased_property_id,
+        )
+        tenant.set_unusable_password()
+        self.taken_usernames.add(username)
+        if leased_property_id is not None:
+            self.leased.add(leased_property_id)
+        return tenant
+
+    def after_create(self, tenants):
+        leased = Property.objects.filter(pk__in=[tenant.leased_property_id for tenant in tenants if tenant.leased_property_id], occupied=False)
+        rows = list(leased.values(*LEASE_FIELDS))
+        leased.update(occupied=True)
+        apply_occupancy_changes(self.landlord.pk, [(property_intervals(row), property_intervals({**row, 'occupied': True})) for row in rows])
+        if self.invite:
+            # Invitation links need the keys
+            set_created_keys(tenants)
+            queue_invitations(tenants)
+
+
+class RevenueImporter(PropertyLookupMixin, Importer):
+    model = Revenue
+
+    def prepare(self, batch):
+        super().prepare(batch)
+        if not hasattr(self, 'tenants'):
+            self.tenants = {}
+        emails = {record.get('tenant_email') for _, record in batch if isinstance(record, dict)} - set(self.tenants)
+        # Only this landlord's tenants: current ones and those already paying them. Emails are not unique.
+        matches = defaultdict(set)
+        for email, pk in Tenant.objects.filter(
+            Q(leased_property__landlord=self.landlord) | Q(revenue__landlord=self.landlord), email__in=emails
+        ).values_list('email', 'pk'):
+            matches[email].add(pk)
+        self.tenants.update((email, pks.pop() if len(pks) == 1 else AMBIGUOUS) for email, pks in matches.items())
+
+    def build(self, record):
+        email = record.get('tenant_email')
+        if email not in self.tenants:
+            raise ValueError(f'Unknown tenant: {email}')
+        if self.tenants[email] is AMBIGUOUS:
+            raise ValueError(f'More than one of your tenants has the email {email}')
+        payment_date = field_value(Revenue, 'payment_date', record)
+        if isinstance(payment_date, datetime.datetime) and payment_date.tzinfo is None:
+            payment_date = payment_date.replace(tzinfo=datetime.timezone.utc)
+        return Revenue(
+            landlord=self.landlord,
+            property_id=self.property_id(record),
+            tenant_id=self.tenants[email],
+            amount=field_value(Revenue, 'amount', record),
+            payment_date=payment_date,
+        )
+
+    def after_create(self, revenues):
+        totals = defaultdict(lambda: [Decimal('0'), 0])
+        for revenue in revenues:
+            bucket = totals[(revenue.property_id, revenue_month(revenue.payment_date))]
+            bucket[0] += revenue.amount
+            bucket[1] += 1
+        for (property_id, month), (amount, payments) in totals.items():
+            apply_revenue_to_rollup(self.landlord.pk, property_id, month, amount, payments)
+
+
+IMPORTERS = {
+    'properties': PropertyImporter,
+    'tenants': TenantImporter,
+    'revenue': RevenueImporter,
+}
+
+def import_file(kind, stream, file_format, landlord, batch_size=1000, progress=None, **options):
+    """
+    Import one file of ``kind`` records for ``landlord`` and return an ImportReport.
+
+    ``options`` go to the importer, e.g. ``invite=True`` for tenants.
+    """
+    importer = IMPORTERS[kind](landlord, batch_size=batch_size, **options)
+    return importer.run(read_records(stream, file_format), progress=progress)
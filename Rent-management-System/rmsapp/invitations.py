@@ -0,0 +1,83 @@
+"""
+Invitations for tenants created without a password.
+
+Imported and bulk-registered tenants can be created with an unusable password
+and emailed a link instead. The link carries the tenant's id and a token from
+a password reset token generator with its own salt. That token covers the
+current password hash, so it stops working as soon as the tenant has set a
+password, and it expires after ``PASSWORD_RESET_TIMEOUT``. The link points at
+the front end page given by ``RMS_INVITE_URL``, which must be an absolute URL;
+inviting raises ImproperlyConfigured until it is set.
+"""
+from django.conf import settings
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .mail import queue_mass_mail
+from .models import Tenant
+
+INVITE_SUBJECT = 'Set up your Quebec Homes LTD account'
+
+
+class InvitationTokenGenerator(PasswordResetTokenGenerator):
+    key_salt = 'rmsapp.invitations.InvitationTokenGenerator'
+
+
+invitation_token_generator = InvitationTokenGenerator()
+
+
+def invitation_url():
+    """
+    Return the ``RMS_INVITE_URL`` template, or raise ImproperlyConfigured when it cannot make a working link.
+    """
+    url = getattr(settings, 'RMS_INVITE_URL', None)
+    if not url or not url.startswith(('https://', 'http://')) or '{uid}' not in url or '{token}' not in url:
+        raise ImproperlyConfigured('RMS_INVITE_URL must be an absolute URL containing {uid} and {token} to send invitations')
+    return url
+
+def invitation_link(tenant):
+    uid = urlsafe_base64_encode(force_bytes(tenant.pk))
+    return invitation_url().format(uid=uid, token=invitation_token_generator.make_token(tenant))
+
+def invitation_message(tenant):
+    return (
+        f'Welcome, {tenant.first_name or tenant.username}! An account has been created for you. '
+        f'Choose your password here: {invitation_link(tenant)}'
+    )
+
+def invitation_emails(tenants):
+    """
+    Return ``queue_mass_mail`` data for inviting ``tenants``, which must have their ids.
+    """
+    return [
+        (INVITE_SUBJECT, invitation_message(tenant), settings.DEFAULT_FROM_EMAIL, [tenant.email])
+        for tenant in tenants if tenant.email
+    ]
+
+def queue_invitations(tenants):
+    """
+    Queue an invitation for every tenant with an email address in one insert.
+    """
+    return queue_mass_mail(invitation_emails(tenants))
+
+def accept_invitation(uid, token, password):
+    """
+    Set the password of the tenant the invitation was sent to and return the tenant.
+
+    Raises ValueError for an unknown, used or expired invitation and
+    ValidationError for a password the validators reject.
+    """
+    try:
+        tenant = Tenant.objects.get(pk=urlsafe_base64_decode(uid).decode())
+    except (ValueError, OverflowError, Tenant.DoesNotExist):
+        raise ValueError('Invalid invitation')
+    if tenant.has_usable_password() or not invitation_token_generator.check_token(tenant, token):
+        raise ValueError('Invalid or expired invitation')
+
+    validate_password(password, user=tenant)
+    tenant.set_password(password)
+    tenant.save(update_fields=['password'])
+    return tenant
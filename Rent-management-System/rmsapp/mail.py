@@ -0,0 +1,111 @@
+"""
+Outbox for transactional email.
+
+Views only queue messages; the ``send_queued_mail`` command delivers them in
+batches from a thread pool, reusing one SMTP connection per worker, and
+retries failures with exponential backoff.
+"""
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+# A claimed message is not picked up again by another dispatcher until this expires.
+CLAIM_TIMEOUT = datetime.timedelta(minutes=5)
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """
+    Queue a single email for delivery.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject, message=message, from_email=from_email or settings.DEFAULT_FROM_EMAIL, recipients=list(recipient_list)
+    )
+
+def queue_mass_mail(datatuple):
+    """
+    Queue many emails in one insert; ``datatuple`` follows ``send_mass_mail``.
+    """
+    return OutboxEmail.objects.bulk_create([
+        OutboxEmail(subject=subject, message=message, from_email=from_email or settings.DEFAULT_FROM_EMAIL, recipients=list(recipient_list))
+        for subject, message, from_email, recipient_list in datatuple
+    ])
+
+def claim_batch(batch_size):
+    """
+    Reserve up to ``batch_size`` due messages so concurrent dispatchers skip them.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(next_attempt_at=now + CLAIM_TIMEOUT)
+    return batch
+
+def send_chunk(emails):
+    """
+    Send a chunk of outbox rows over one connection and return ``(id, error)`` pairs.
+    """
+    results = []
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        return [(email.pk, repr(error)) for email in emails]
+
+    try:
+        for email in emails:
+            message = EmailMessage(email.subject, email.message, email.from_email, email.recipients, connection=connection)
+            try:
+                message.send()
+            except Exception as error:
+                results.append((email.pk, repr(error)))
+            else:
+                results.append((email.pk, None))
+    finally:
+        connection.close()
+    return results
+
+def dispatch_outbox(batch_size=100, workers=4, max_attempts=5, backoff=datetime.timedelta(seconds=30)):
+    """
+    Deliver one batch of due messages and return ``(sent, failed)`` counts.
+
+    Failed messages are retried after ``backoff * 2 ** (attempts - 1)``, so
+    ``backoff`` after the first failure and twice as long after each further one,
+    until they have been tried ``max_attempts`` times.
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    chunk_size = -(-len(batch) // workers)
+    chunks = [batch[start:start + chunk_size] for start in range(0, len(batch), chunk_size)]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        errors = dict(result for chunk_results in executor.map(send_chunk, chunks) for result in chunk_results)
+
+    now = timezone.now()
+    sent, failed = [], []
+    for email in batch:
+        error = errors.get(email.pk)
+        email.attempts += 1
+        if error is None:
+            email.status = OutboxEmail.SENT
+            email.sent_at = now
+            email.last_error = ''
+            sent.append(email)
+        else:
+            email.status = OutboxEmail.FAILED if email.attempts >= max_attempts else OutboxEmail.PENDING
+            email.next_attempt_at = now + backoff * 2 ** (email.attempts - 1)
+            email.last_error = error
+            failed.append(email)
+
+    OutboxEmail.objects.bulk_update(sent + failed, ['status', 'attempts', 'sent_at', 'next_attempt_at', 'last_error'])
+    return len(sent), len(failed)
@@ -0,0 +1,105 @@
+import asyncio
+import datetime
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from rmsapp.benchmarks import ForceAuthAsyncClient, latency_summary
+from rmsapp.models import Landlord
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent-request throughput of the sync views behind the WSGI handler with the async views '
+        'behind the ASGI handler (the application uvicorn serves). Run seed_data first; needs a file database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='seed', help='Username prefix of the seeded landlords to authenticate as.')
+        parser.add_argument('--landlords', type=int, default=10, help='Seeded landlords to spread the requests over.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and concurrency level.')
+        parser.add_argument('--cache', action='store_true', help='Keep the response cache on (by default every request runs the view).')
+
+    def handle(self, *args, **options):
+        landlords = list(Landlord.objects.filter(username__startswith=f"{options['prefix']}-landlord-").order_by('pk')[:options['landlords']])
+        if not landlords:
+            raise CommandError(f"No landlords named {options['prefix']}-landlord-*; run seed_data first.")
+
+        year = datetime.date.today().year
+        paths = ['dashboard/', f'earnings/{year}/', f'earnings/series/?start={year - 1}-01&end={year}-12', f'graphs/yearly/{year}/']
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['cache']:
+            overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        self.stdout.write(f"{'endpoint':<30} {'conc':>5} {'path':<14} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        with override_settings(**overrides):
+            for path in paths:
+                for concurrency in options['concurrency']:
+                    for name, runner, url in [
+                        ('wsgi sync', self.run_wsgi, f'/{path}'),
+                        ('asgi async', self.run_asgi, f'/async/{path}'),
+                        ('asgi sync', self.run_asgi, f'/{path}'),
+                    ]:
+                        summary = runner(url, landlords, concurrency, options['requests'])
+                        self.stdout.write(
+                            f"{path.split('?')[0]:<30} {concurrency:>5} {name:<14} {summary['throughput']:>9,.1f} "
+                            f"{summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f}"
+                        )
+
+    def run_wsgi(self, url, landlords, concurrency, requests):
+        """
+        ``concurrency`` threads, each with its own client and database connection, as a threaded WSGI server would.
+        """
+        durations = []
+        lock = threading.Lock()
+
+        def worker(number):
+            client = APIClient()
+            client.force_authenticate(user=landlords[number % len(landlords)])
+            mine = []
+            for _ in range(number, requests, concurrency):
+                start = time.perf_counter()
+                client.get(url)
+                mine.append(time.perf_counter() - start)
+            connections.close_all()
+            with lock:
+                durations.extend(mine)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.summary(durations, time.perf_counter() - started)
+
+    def run_asgi(self, url, landlords, concurrency, requests):
+        """
+        ``concurrency`` coroutines on one event loop, as a single uvicorn worker would run them.
+        """
+        durations = []
+
+        async def worker(number):
+            client = ForceAuthAsyncClient()
+            client.force_authenticate(landlords[number % len(landlords)])
+            for _ in range(number, requests, concurrency):
+                start = time.perf_counter()
+                await client.get(url)
+                durations.append(time.perf_counter() - start)
+
+        async def run():
+            await asyncio.gather(*(worker(number) for number in range(concurrency)))
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        return self.summary(durations, time.perf_counter() - started)
+
+    def summary(self, durations, wall):
+        summary = latency_summary(durations)
+        summary['throughput'] = len(durations) / wall
+        return summary
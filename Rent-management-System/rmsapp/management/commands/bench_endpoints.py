@@ -0,0 +1,141 @@
+import datetime
+import json
+import logging
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from rmsapp.benchmarks import compare_with_baseline, latency_summary, rolled_back
+from rmsapp.models import Property
+from rmsapp.seeding import seed_dataset
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic portfolio and measure throughput and latency percentiles of every rmsapp endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--landlords', type=int, default=2)
+        parser.add_argument('--properties', type=int, default=200, help='Properties per landlord.')
+        parser.add_argument('--tenants', type=int, default=150, help='Leased properties per landlord.')
+        parser.add_argument('--years', type=int, default=2, help='Years of monthly Revenue per tenant.')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint before measuring.')
+        parser.add_argument('--only', nargs='+', help='Run only these scenarios.')
+        parser.add_argument('--cold', action='store_true', help='Clear the response cache before every request.')
+        parser.add_argument('--output', help='Write the results to this JSON file, to be used as a baseline.')
+        parser.add_argument('--baseline', help='Compare against a JSON file written by an earlier --output run.')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative slowdown before a scenario counts as a regression.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        scenarios = self.scenarios()
+        names = options['only'] or list(scenarios)
+        unknown = set(names) - set(scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}. Choose from {', '.join(scenarios)}")
+
+        # Failed requests are counted instead of flooding the output with tracebacks
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            results = self.run_all(names, scenarios, options)
+        # Latencies of error responses say nothing about the endpoint, so such a run is no baseline
+        failing = [f"{name} ({summary['errors']})" for name, summary in results.items() if summary['errors']]
+        if failing:
+            raise CommandError(f"Requests failed in: {', '.join(failing)}")
+
+        report = {
+            'scale': {key: options[key] for key in ('landlords', 'properties', 'tenants', 'years', 'requests', 'cold')},
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+            if baseline.get('scale') != report['scale']:
+                self.stdout.write(self.style.WARNING('The baseline was recorded at a different scale'))
+            regressions = compare_with_baseline(results, baseline['scenarios'], options['tolerance'])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+            elif options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+
+    def run_all(self, names, scenarios, options):
+        results = {}
+        with rolled_back():
+            started = time.perf_counter()
+            landlords = seed_dataset(options['landlords'], options['properties'], options['tenants'], options['years'])
+            self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+            # Every register_tenant request leases a property of its own
+            self.vacant = list(Property.objects.filter(landlord__in=landlords, occupied=False).order_by('pk').values_list('pk', flat=True))
+            needed = options['warmup'] + options['requests']
+            if 'register_tenant' in names and len(self.vacant) < needed:
+                raise CommandError(f'register_tenant needs {needed} vacant properties but {len(self.vacant)} were seeded; raise --properties above --tenants')
+
+            client = APIClient()
+            client.raise_request_exception = False
+            self.stdout.write(f"{'scenario':<20} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+            for name in names:
+                summary = results[name] = self.run_scenario(client, landlords, scenarios[name], options)
+                self.stdout.write(
+                    f"{name:<20} {summary['requests_per_second']:>9,.1f} {summary['p50_ms']:>9.2f} "
+                    f"{summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f} {summary['errors']:>7}"
+                )
+        return results
+
+    def run_scenario(self, client, landlords, scenario, options):
+        method, build = scenario
+        durations = []
+        errors = 0
+        for number in range(options['warmup'] + options['requests']):
+            landlord = landlords[number % len(landlords)]
+            client.force_authenticate(user=landlord)
+            path, data = build(number)
+            if options['cold']:
+                cache.clear()
+
+            start = time.perf_counter()
+            response = client.post(path, data, format='json') if method == 'post' else client.get(path, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+
+            if number >= options['warmup']:
+                durations.append(elapsed)
+                errors += response.status_code >= 400
+        summary = latency_summary(durations)
+        summary['errors'] = errors
+        return summary
+
+    def register_tenant(self, number):
+        return '/register/tenant/', {
+            'property_id': self.vacant[number], 'username': f'bench-new-tenant-{number}', 'email': f'bench-new-tenant-{number}@example.com',
+            'first_name': 'New', 'last_name': 'Tenant', 'phone_number': '555-0199', 'city': 'Quebec', 'password': 'bench-long-secret',
+        }
+
+    def scenarios(self):
+        year = datetime.date.today().year
+        return {
+            'dashboard': ('get', lambda number: ('/dashboard/', None)),
+            'tenant_list': ('get', lambda number: ('/tenants/', None)),
+            'tenant_stream': ('get', lambda number: ('/tenants/', {'stream': 'true'})),
+            'earnings_month': ('get', lambda number: (f'/earnings/{year}/{number % 12 + 1}/', None)),
+            'earnings_year': ('get', lambda number: (f'/earnings/{year}/', None)),
+            'earnings_series': ('get', lambda number: ('/earnings/series/', {'start': f'{year - 1}-01', 'end': f'{year}-12'})),
+            'earnings_forecast': ('get', lambda number: ('/earnings/forecast/', None)),
+            'graph_monthly': ('get', lambda number: (f'/graphs/monthly/{year}/{number % 12 + 1}/', None)),
+            'graph_yearly': ('get', lambda number: (f'/graphs/yearly/{year}/', None)),
+            'graph_yearly_plotly': ('get', lambda number: (f'/graphs/yearly/{year}/', {'chart': 'plotly'})),
+            'register_landlord': ('post', lambda number: ('/register/landlord/', {
+                'first_name': 'Bench', 'email': f'bench-new-landlord-{number}@example.com', 'phone_number': '555-0198', 'address': '1 Main St',
+            })),
+            'register_tenant': ('post', self.register_tenant),
+        }
@@ -0,0 +1,50 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rmsapp.benchmarks import rolled_back
+from rmsapp.reconciliation import reconcile_month
+from rmsapp.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = 'Seed rent dues and payments and time reconcile_month end to end, split into load, allocate and write.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000], help='Rent-due rows per run (about as many payments are seeded alongside).')
+        parser.add_argument('--months', type=int, default=12, help='Dues per lease.')
+        parser.add_argument('--properties', type=int, default=1000, help='Leased properties per seeded landlord.')
+        parser.add_argument('--repeat', type=int, default=1, help='Reconciliations per size, each from the freshly seeded state; the fastest is reported.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if min(options['rows'] + [options['months'], options['properties'], options['repeat']]) < 1:
+            raise CommandError('--rows, --months, --properties and --repeat must be at least 1')
+        today = datetime.date.today()
+        self.stdout.write(
+            f"{'dues':>9} {'payments':>9} {'seed s':>8} {'load s':>8} {'alloc s':>8} {'write s':>8} {'total s':>8} {'rows/s':>10}"
+        )
+        for rows in options['rows']:
+            leases = max(rows // options['months'], 1)
+            properties = min(leases, options['properties'])
+            # Seeded rows and reconciliation updates are all rolled back
+            with rolled_back():
+                started = time.perf_counter()
+                Seeder(
+                    landlords=-(-leases // properties), properties=properties, tenants=properties, months=options['months'],
+                    seed=options['seed'], prefix=f'bench-reconcile-{rows}',
+                ).run()
+                seeded = time.perf_counter() - started
+
+                best = None
+                for _ in range(options['repeat']):
+                    with rolled_back():
+                        summary = reconcile_month(today.year, today.month)
+                    if best is None or summary['seconds'] < best['seconds']:
+                        best = summary
+
+            total = best['dues'] + best['payments']
+            self.stdout.write(
+                f"{best['dues']:>9} {best['payments']:>9} {seeded:>8.2f} {best['load_seconds']:>8.3f} {best['allocate_seconds']:>8.3f} "
+                f"{best['write_seconds']:>8.3f} {best['seconds']:>8.3f} {total / best['seconds']:>10,.0f}"
+            )
@@ -0,0 +1,38 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rmsapp.benchmarks import rolled_back, timed
+from rmsapp.models import Landlord, Property, Tenant
+from rmsapp.serializer import PropertySerializer, TenantSerializer, property_list_encoder, tenant_list_encoder
+
+
+class Command(BaseCommand):
+    help = 'Compare rows/sec of the ModelSerializers against the read-only list encoders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000], help='Table sizes to benchmark.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the best one is reported.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>8}  {'model':<9} {'serializer rows/s':>18} {'encoder rows/s':>15} {'speedup':>8}")
+        for rows in options['rows']:
+            with rolled_back():
+                self.seed(rows)
+                for name, serializer, encoder, queryset in [
+                    ('property', PropertySerializer, property_list_encoder, Property.objects.order_by('id')),
+                    ('tenant', TenantSerializer, tenant_list_encoder, Tenant.objects.prefetch_related('groups', 'user_permissions').order_by('id')),
+                ]:
+                    slow = timed(lambda: serializer(queryset.all(), many=True).data, repeat=options['repeat'])
+                    fast = timed(lambda: encoder.encode(queryset.all()), repeat=options['repeat'])
+                    self.stdout.write(f'{rows:>8}  {name:<9} {rows / slow:>18,.0f} {rows / fast:>15,.0f} {slow / fast:>7.1f}x')
+
+    def seed(self, rows):
+        landlord = Landlord.objects.create(username='bench-serializers', email='bench-serializers@example.com')
+        properties = Property.objects.bulk_create([
+            Property(landlord=landlord, property_name=f'Unit {number}', address='1 Main St', bedrooms=2, rent_amount=Decimal('1250.00'))
+            for number in range(rows)
+        ], batch_size=5000)
+        Tenant.objects.bulk_create([
+            Tenant(username=f'bench-tenant-{number}', email=f'tenant{number}@example.com', phone_number='555-0100', city='Quebec', leased_property=property)
+            for number, property in enumerate(properties)
+        ], batch_size=5000)
@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rmsapp.benchmarks import measure_import_time
+
+
+class Command(BaseCommand):
+    help = 'Measure the cold import time of the WSGI and ASGI entry points with python -X importtime.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Write the measurements to this JSON file.')
+        parser.add_argument('--budget-ms', type=float, help='Fail if any entry point takes longer than this to import.')
+
+    def handle(self, *args, **options):
+        results = [measure_import_time(module) for module in ('myproject.wsgi', 'myproject.asgi')]
+
+        for result in results:
+            self.stdout.write(f"{result['module']}: {result['total_ms']} ms")
+            for entry in result['slowest']:
+                self.stdout.write(f"    {entry['package']:<30} {entry['self_ms']} ms")
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+        failures = [
+            f"{result['module']} imports {', '.join(result['heavy_modules'])}" for result in results if result['heavy_modules']
+        ]
+        if options['budget_ms'] is not None:
+            failures += [
+                f"{result['module']} took {result['total_ms']} ms (budget {options['budget_ms']} ms)"
+                for result in results if result['total_ms'] > options['budget_ms']
+            ]
+        if failures:
+            raise CommandError('; '.join(failures))
@@ -0,0 +1,65 @@
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rmsapp.benchmarks import rolled_back
+from rmsapp.bulk import set_created_keys
+from rmsapp.invitations import queue_invitations
+from rmsapp.models import Tenant
+from rmsapp.passwords import hash_passwords
+
+PATHS = ('single', 'bulk', 'bulk_pool', 'invite')
+
+
+class Command(BaseCommand):
+    help = 'Measure users/s of creating tenants one by one, in bulk, in bulk with a hashing process pool and by invitation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Tenants created per path.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Hashing processes of the bulk_pool path.')
+        parser.add_argument('--only', nargs='+', choices=PATHS, help='Run only these paths.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1')
+        hasher = get_hasher()
+        self.stdout.write(f"Hasher {hasher.algorithm}, {getattr(hasher, 'iterations', '-')} iterations, {options['workers']} pool workers")
+        self.stdout.write(f"{'path':<10} {'users':>7} {'seconds':>9} {'users/s':>10}")
+        for path in options['only'] or PATHS:
+            with rolled_back():
+                started = time.perf_counter()
+                getattr(self, path)(self.tenants(path, options['users']), options)
+                seconds = time.perf_counter() - started
+            self.stdout.write(f"{path:<10} {options['users']:>7} {seconds:>9.3f} {options['users'] / seconds:>10,.1f}")
+
+    def tenants(self, path, count):
+        return [
+            Tenant(username=f'bench-{path}-{number}', email=f'bench-{path}-{number}@example.com', phone_number='555-0100', city='Quebec')
+            for number in range(count)
+        ]
+
+    def single(self, tenants, options):
+        # What create_user and the registration view do: hash, then insert, one tenant at a time
+        for tenant in tenants:
+            tenant.set_password('bench-password')
+            tenant.save()
+
+    def bulk(self, tenants, options, workers=1):
+        for tenant, encoded in zip(tenants, hash_passwords(['bench-password'] * len(tenants), workers=workers)):
+            tenant.password = encoded
+        Tenant.objects.bulk_create(tenants)
+
+    def bulk_pool(self, tenants, options):
+        self.bulk(tenants, options, workers=options['workers'])
+
+    def invite(self, tenants, options):
+        for tenant, encoded in zip(tenants, hash_passwords([None] * len(tenants))):
+            tenant.password = encoded
+        Tenant.objects.bulk_create(tenants)
+        set_created_keys(tenants)
+        # The emails are rolled back with the tenants, so any absolute link will do
+        with override_settings(RMS_INVITE_URL=settings.RMS_INVITE_URL or 'https://bench.example.com/invite/{uid}/{token}/'):
+            queue_invitations(tenants)
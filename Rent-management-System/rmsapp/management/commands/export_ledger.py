@@ -0,0 +1,44 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rmsapp import exports
+from rmsapp.models import Landlord
+
+
+class Command(BaseCommand):
+    help = "Stream a landlord's revenue or payment ledger to CSV or Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('ledger', choices=sorted(exports.LEDGERS))
+        parser.add_argument('--landlord', type=int, required=True, help='Landlord id to export.')
+        parser.add_argument('--start', type=datetime.date.fromisoformat, help='First payment date (YYYY-MM-DD).')
+        parser.add_argument('--end', type=datetime.date.fromisoformat, help='Last payment date (YYYY-MM-DD).')
+        parser.add_argument('--file-format', choices=['csv', 'parquet'], default='csv')
+        parser.add_argument('--output', help='File to write; defaults to stdout for CSV.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round-trip.')
+
+    def handle(self, *args, **options):
+        try:
+            landlord = Landlord.objects.get(pk=options['landlord'])
+        except Landlord.DoesNotExist:
+            raise CommandError(f"Landlord {options['landlord']} does not exist")
+
+        columns, types, rows = exports.ledger_rows(options['ledger'], landlord, options['start'], options['end'], chunk_size=options['chunk_size'])
+        if options['file_format'] == 'parquet':
+            if not exports.parquet_available():
+                raise CommandError('Parquet export needs pyarrow to be installed')
+            if not options['output']:
+                raise CommandError('Parquet export needs --output')
+            with open(options['output'], 'wb') as output:
+                for chunk in exports.iter_parquet(columns, types, rows):
+                    output.write(chunk)
+            return
+
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            for chunk in exports.iter_csv(columns, rows, chunk_size=options['chunk_size']):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
@@ -0,0 +1,30 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from rmsapp.billing import generate_rent_dues, next_billing_date
+
+
+class Command(BaseCommand):
+    help = "Generate the next billing cycle's RentDue rows for every leased property."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--due-date', help='Due date of the cycle (YYYY-MM-DD); defaults to the first of next month.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Tenants read and inserted per transaction.')
+        parser.add_argument('--start-after', type=int, default=0, help='Resume after this tenant id.')
+
+    def handle(self, *args, **options):
+        try:
+            due_date = datetime.date.fromisoformat(options['due_date']) if options['due_date'] else next_billing_date()
+        except ValueError:
+            raise CommandError('--due-date must be formatted as YYYY-MM-DD')
+
+        def progress(stats):
+            self.stdout.write(
+                f"{stats['tenants']} tenants, last id {stats['last_tenant_id']}, {stats['tenants_per_second']:,.0f} tenants/s"
+            )
+
+        stats = generate_rent_dues(due_date, chunk_size=options['chunk_size'], start_after=options['start_after'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated rent due on {due_date} for {stats['tenants']} tenants in {stats['seconds']:.1f}s "
+            f"({stats['tenants_per_second']:,.0f} tenants/s)."
+        ))
@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from rmsapp.importer import IMPORTERS, import_file
+from rmsapp.models import Landlord
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV or JSONL file of properties, tenants or revenue into the database in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS), help='What the file contains.')
+        parser.add_argument('path', help='CSV or JSONL file to import.')
+        parser.add_argument('--landlord', type=int, required=True, help='Landlord id the rows belong to.')
+        parser.add_argument('--file-format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows validated and inserted per transaction.')
+        parser.add_argument('--invite', action='store_true', help='Email imported tenants a link to choose their password.')
+
+    def handle(self, *args, **options):
+        try:
+            landlord = Landlord.objects.get(pk=options['landlord'])
+        except Landlord.DoesNotExist:
+            raise CommandError(f"Landlord {options['landlord']} does not exist")
+
+        if options['invite'] and options['kind'] != 'tenants':
+            raise CommandError('--invite only applies to tenants')
+
+        file_format = options['file_format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError('Use --file-format to choose csv or jsonl')
+
+        def progress(report):
+            self.stdout.write(f'{report.rows} rows read, {report.created} created, {report.error_count} errors')
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            report = import_file(
+                options['kind'], stream, file_format, landlord, batch_size=options['batch_size'], progress=progress,
+                **({'invite': True} if options['invite'] else {}),
+            )
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.created} of {report.rows} rows with {report.error_count} errors '
+            f'in {report.seconds:.1f}s ({report.rows_per_second:,.0f} rows/s).'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from rmsapp.models import Landlord, rebuild_revenue_rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly revenue rollup tables from the Revenue table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--landlord', type=int, help='Only rebuild the rollup for this landlord id.')
+
+    def handle(self, *args, **options):
+        landlord = None
+        if options['landlord'] is not None:
+            try:
+                landlord = Landlord.objects.get(pk=options['landlord'])
+            except Landlord.DoesNotExist:
+                raise CommandError(f"Landlord {options['landlord']} does not exist")
+
+        property_rows, landlord_rows = rebuild_revenue_rollup(landlord)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {property_rows} property-month and {landlord_rows} landlord-month rollup rows.'
+        ))
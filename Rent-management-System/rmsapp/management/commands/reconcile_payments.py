@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from rmsapp.reconciliation import reconcile_month
+
+
+class Command(BaseCommand):
+    help = 'Match payments made up to the end of a month against open rent dues.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to reconcile (YYYY-MM); defaults to the current month.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk_update statement.')
+
+    def handle(self, *args, **options):
+        try:
+            month = datetime.datetime.strptime(options['month'], '%Y-%m').date() if options['month'] else datetime.date.today()
+        except ValueError:
+            raise CommandError('--month must be formatted as YYYY-MM')
+
+        summary = reconcile_month(month.year, month.month, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Matched {summary['payments']} payments against {summary['dues']} open dues in {summary['seconds']:.2f}s: "
+            f"{summary['dues_paid']} paid, {summary['dues_partially_paid']} partially paid, "
+            f"{summary['applied']} applied, {summary['outstanding']} outstanding, {summary['unapplied_credit']} credit carried over."
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from rmsapp.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = 'Load a deterministic synthetic portfolio (landlords, properties, tenants and their rent history) for performance testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--landlords', type=int, default=1000)
+        parser.add_argument('--properties', type=int, default=100, help='Properties per landlord.')
+        parser.add_argument('--tenants', type=int, default=90, help='Leased properties per landlord.')
+        parser.add_argument('--months', type=int, default=12, help='Months of Revenue, Payment and RentDue history per lease.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same options always produce the same data.')
+        parser.add_argument('--prefix', default='seed', help='Username prefix, so several datasets can coexist.')
+        parser.add_argument('--password', default='password', help='Password shared by every seeded user.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Properties (whole landlords) generated per transaction.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT.')
+
+    def handle(self, *args, **options):
+        seeder = Seeder(
+            options['landlords'], options['properties'], options['tenants'], options['months'], seed=options['seed'],
+            prefix=options['prefix'], password=options['password'], chunk_size=options['chunk_size'], batch_size=options['batch_size'],
+        )
+
+        def progress(stats):
+            self.stdout.write(f"{stats['landlords']} landlords, {stats['tenants']} tenants, {stats['tenants_per_second']:,.0f} tenants/s")
+
+        stats = seeder.run(progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {stats.get('landlords', 0)} landlords, {stats.get('properties', 0)} properties, {stats.get('tenants', 0)} tenants, "
+            f"{stats.get('revenue', 0)} revenue, {stats.get('payments', 0)} payments and {stats.get('rent_dues', 0)} rent dues "
+            f"in {stats.get('seconds', 0):.1f}s ({stats.get('tenants_per_second', 0):,.0f} tenants/s)."
+        ))
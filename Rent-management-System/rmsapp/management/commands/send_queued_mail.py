@@ -0,0 +1,31 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from rmsapp.mail import dispatch_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails in batches from a thread pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Messages claimed per batch.')
+        parser.add_argument('--workers', type=int, default=4, help='Sending threads, each with its own SMTP connection.')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Give up on a message after this many failures.')
+        parser.add_argument('--backoff', type=float, default=30, help='Seconds before the first retry; doubled on every failure.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep between polls with --loop.')
+
+    def handle(self, *args, **options):
+        backoff = datetime.timedelta(seconds=options['backoff'])
+        while True:
+            sent, failed = dispatch_outbox(
+                batch_size=options['batch_size'], workers=options['workers'],
+                max_attempts=options['max_attempts'], backoff=backoff,
+            )
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} emails, {failed} failed.')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,140 @@
+"""
+Per-view request metrics.
+
+PerformanceMiddleware times every request, counts the queries it ran and the
+time spent in them through a database execute wrapper, and measures the
+response body. The numbers go back to the client as a ``Server-Timing`` header
+and into an in-process registry that keeps the latest samples of each view for
+percentile reports. The registry is per process, so each worker reports only
+the requests it served. Under ASGI only wall time and size are recorded.
+With ``RMS_PERFORMANCE_METRICS = False`` the middleware removes itself at
+startup and costs nothing.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+METRICS = ('wall_ms', 'db_ms', 'queries', 'bytes')
+PERCENTILES = (50, 95, 99)
+
+
+class QueryCounter:
+    """
+    Execute wrapper that counts queries and adds up the time spent in them.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - start
+
+
+class MetricsRegistry:
+    """
+    Keeps the latest ``max_samples`` measurements of every view.
+    """
+
+    def __init__(self, max_samples=5000):
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self.counts = defaultdict(int)
+
+    def record(self, view_name, wall_ms, db_ms, queries, size):
+        with self.lock:
+            self.samples[view_name].append((wall_ms, db_ms, queries, size))
+            self.counts[view_name] += 1
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+
+    def report(self):
+        """
+        Return, per view, the request count and p50/p95/p99 of every metric.
+        """
+        with self.lock:
+            snapshot = {name: list(samples) for name, samples in self.samples.items()}
+            counts = dict(self.counts)
+
+        report = {}
+        for name, samples in sorted(snapshot.items()):
+            columns = zip(*samples)
+            report[name] = {'requests': counts[name], 'sampled': len(samples)}
+            for metric, values in zip(METRICS, columns):
+                values = sorted(value for value in values if value is not None)
+                report[name][metric] = {f'p{p}': percentile(values, p) for p in PERCENTILES} if values else None
+        return report
+
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return round(sorted_values[rank - 1], 3)
+
+
+registry = MetricsRegistry()
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'RMS_PERFORMANCE_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        registry.max_samples = getattr(settings, 'RMS_PERFORMANCE_SAMPLES', registry.max_samples)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = counter.seconds * 1000
+
+        self.record(request, response, wall_ms, db_ms, counter.queries)
+        response['Server-Timing'] = (
+            f'app;dur={wall_ms:.1f}, db;dur={db_ms:.1f};desc="{counter.queries} queries"'
+        )
+        return response
+
+    async def __acall__(self, request):
+        # Under ASGI the ORM runs on another thread, whose connections this wrapper cannot see,
+        # so only wall time and payload size are recorded
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+        self.record(request, response, wall_ms, None, None)
+        response['Server-Timing'] = f'app;dur={wall_ms:.1f}'
+        return response
+
+    def record(self, request, response, wall_ms, db_ms, queries):
+        # Streaming bodies are produced after the view returns and are not measured
+        size = None if response.streaming else len(response.content)
+        match = request.resolver_match
+        registry.record(match.view_name if match else 'unresolved', wall_ms, db_ms, queries, size)
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.2 on 2026-10-18 13:50
+
+import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_rollup(apps, schema_editor):
+    Revenue = apps.get_model('rmsapp', 'Revenue')
+    PropertyMonthlyRevenue = apps.get_model('rmsapp', 'PropertyMonthlyRevenue')
+    LandlordMonthlyRevenue = apps.get_model('rmsapp', 'LandlordMonthlyRevenue')
+
+    property_totals = {}
+    landlord_totals = {}
+    for revenue in Revenue.objects.values('landlord_id', 'property_id', 'amount', 'payment_date').iterator(chunk_size=2000):
+        month = revenue['payment_date'].astimezone(datetime.timezone.utc).date().replace(day=1)
+        for totals, key in ((property_totals, (revenue['landlord_id'], revenue['property_id'], month)),
+                            (landlord_totals, (revenue['landlord_id'], month))):
+            total, payments = totals.get(key, (0, 0))
+            totals[key] = (total + revenue['amount'], payments + 1)
+
+    PropertyMonthlyRevenue.objects.bulk_create([
+        PropertyMonthlyRevenue(landlord_id=landlord_id, property_id=property_id, month=month, total=total, payments=payments)
+        for (landlord_id, property_id, month), (total, payments) in property_totals.items()
+    ], batch_size=1000)
+    LandlordMonthlyRevenue.objects.bulk_create([
+        LandlordMonthlyRevenue(landlord_id=landlord_id, month=month, total=total, payments=payments)
+        for (landlord_id, month), (total, payments) in landlord_totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rmsapp', '0005_alter_property_lease_end_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LandlordMonthlyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payments', models.PositiveIntegerField(default=0)),
+                ('landlord', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rmsapp.landlord')),
+            ],
+            options={
+                'verbose_name_plural': 'Landlord monthly revenues',
+            },
+        ),
+        migrations.CreateModel(
+            name='PropertyMonthlyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payments', models.PositiveIntegerField(default=0)),
+                ('landlord', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rmsapp.landlord')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rmsapp.property')),
+            ],
+            options={
+                'verbose_name_plural': 'Property monthly revenues',
+                'indexes': [models.Index(fields=['landlord', 'month'], name='rms_prop_rev_landlord_month')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='propertymonthlyrevenue',
+            constraint=models.UniqueConstraint(fields=('property', 'month'), name='unique_property_month_revenue'),
+        ),
+        migrations.AddConstraint(
+            model_name='landlordmonthlyrevenue',
+            constraint=models.UniqueConstraint(fields=('landlord', 'month'), name='unique_landlord_month_revenue'),
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.2 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rmsapp', '0006_monthly_revenue_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['tenant', 'payment_date'], name='rms_payment_tenant_date'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['landlord', 'status'], name='rms_property_landlord_status'),
+        ),
+        migrations.AddIndex(
+            model_name='rentdue',
+            index=models.Index(fields=['tenant', 'due_date', 'is_paid'], name='rms_rentdue_tenant_due_paid'),
+        ),
+        migrations.AddIndex(
+            model_name='revenue',
+            index=models.Index(fields=['landlord', 'payment_date'], name='rms_revenue_landlord_date'),
+        ),
+        migrations.AddIndex(
+            model_name='revenue',
+            index=models.Index(fields=['property', 'payment_date'], name='rms_revenue_property_date'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.2 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+def backfill_occupied(apps, schema_editor):
+    Property = apps.get_model('rmsapp', 'Property')
+    Tenant = apps.get_model('rmsapp', 'Tenant')
+    Property.objects.filter(
+        pk__in=Tenant.objects.filter(leased_property__isnull=False).values('leased_property_id')
+    ).update(occupied=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rmsapp', '0008_outbox_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='occupied',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(backfill_occupied, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.2 on 2026-10-18 14:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rmsapp', '0009_property_occupied'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentdue',
+            name='property',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='rmsapp.property'),
+        ),
+        migrations.AddConstraint(
+            model_name='rentdue',
+            constraint=models.UniqueConstraint(fields=('tenant', 'due_date'), name='unique_tenant_rent_due'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.2 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rmsapp', '0010_rentdue_property_and_unique_cycle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='applied_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='rentdue',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.2.2 on 2026-10-18 14:28
+
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BUCKET_LIMITS = (30, 60, 90)
+
+
+def backfill_arrears(apps, schema_editor):
+    RentDue = apps.get_model('rmsapp', 'RentDue')
+    Payment = apps.get_model('rmsapp', 'Payment')
+    ArrearsSnapshot = apps.get_model('rmsapp', 'ArrearsSnapshot')
+    as_of = datetime.date.today()
+
+    # Open balance per (tenant, property) and aging bucket; dues without a property fall back to the tenant's lease
+    owed = defaultdict(lambda: [Decimal('0')] * (len(BUCKET_LIMITS) + 1))
+    landlords = {}
+    for tenant_id, property_id, landlord_id, leased_property_id, leased_landlord_id, due_date, rent_amount, amount_paid in (
+        RentDue.objects.filter(is_paid=False, due_date__lte=as_of).values_list(
+            'tenant_id', 'property_id', 'property__landlord_id', 'tenant__leased_property_id', 'tenant__leased_property__landlord_id',
+            'due_date', 'rent_amount', 'amount_paid',
+        ).iterator(chunk_size=2000)
+    ):
+        if property_id is None:
+            property_id, landlord_id = leased_property_id, leased_landlord_id
+        if property_id is None:
+            continue
+        age = (as_of - due_date).days
+        bucket = next((index for index, limit in enumerate(BUCKET_LIMITS) if age <= limit), len(BUCKET_LIMITS))
+        owed[(tenant_id, property_id)][bucket] += rent_amount - amount_paid
+        landlords[(tenant_id, property_id)] = landlord_id
+
+    credit = defaultdict(Decimal)
+    for tenant_id, property_id, amount, applied_amount in Payment.objects.filter(
+        payment_date__lte=as_of, applied_amount__lt=models.F('amount')
+    ).values_list('tenant_id', 'property_id', 'amount', 'applied_amount').iterator(chunk_size=2000):
+        credit[(tenant_id, property_id)] += amount - applied_amount
+
+    # Unreconciled credit pays the oldest bucket first, as refresh_arrears does
+    rows = []
+    for key, buckets in owed.items():
+        left = credit.get(key, Decimal('0'))
+        buckets = [max(balance, Decimal('0')) for balance in buckets]
+        for index in reversed(range(len(buckets))):
+            paid = min(left, buckets[index])
+            buckets[index] -= paid
+            left -= paid
+        if sum(buckets) > 0:
+            rows.append(ArrearsSnapshot(
+                landlord_id=landlords[key], tenant_id=key[0], property_id=key[1], as_of=as_of,
+                days_0_30=buckets[0], days_31_60=buckets[1], days_61_90=buckets[2], days_over_90=buckets[3], total=sum(buckets),
+            ))
+    ArrearsSnapshot.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rmsapp', '0011_reconciliation_amounts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArrearsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('days_0_30', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('days_31_60', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('days_61_90', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('days_over_90', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('landlord', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rmsapp.landlord')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rmsapp.property')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rmsapp.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['landlord', 'as_of'], name='rms_arrears_landlord_as_of')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='arrearssnapshot',
+            constraint=models.UniqueConstraint(fields=('tenant', 'property'), name='unique_tenant_property_arrears'),
+        ),
+        migrations.RunPython(backfill_arrears, migrations.RunPython.noop),
+    ]
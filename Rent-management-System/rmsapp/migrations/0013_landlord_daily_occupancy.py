@@ -0,0 +1,68 @@
+# Generated by Django 4.2.2 on 2026-10-18 14:31
+
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def utc_day(value):
+    return value.astimezone(datetime.timezone.utc).date()
+
+def backfill_occupancy(apps, schema_editor):
+    Property = apps.get_model('rmsapp', 'Property')
+    LandlordDailyOccupancy = apps.get_model('rmsapp', 'LandlordDailyOccupancy')
+    end = datetime.date.today() + datetime.timedelta(days=getattr(settings, 'RMS_OCCUPANCY_HORIZON_DAYS', 365))
+
+    # Per landlord and day, the change in property and occupied counts
+    changes = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for landlord_id, start, stop, occupied in Property.objects.filter(status=True).values_list(
+        'landlord_id', 'lease_start_date', 'lease_end_date', 'occupied'
+    ).iterator(chunk_size=2000):
+        start, stop = utc_day(start), utc_day(stop)
+        changes[landlord_id][start][0] += 1
+        if occupied and stop > start:
+            changes[landlord_id][start][1] += 1
+            changes[landlord_id][stop][1] -= 1
+
+    # Like rebuild_occupancy, store the days from each landlord's first lease through the horizon
+    for landlord_id, days in changes.items():
+        rows = []
+        properties = occupied = 0
+        day = min(days)
+        while day <= end:
+            properties += days[day][0] if day in days else 0
+            occupied += days[day][1] if day in days else 0
+            rows.append(LandlordDailyOccupancy(landlord_id=landlord_id, day=day, properties=properties, occupied=occupied))
+            day += datetime.timedelta(days=1)
+        LandlordDailyOccupancy.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rmsapp', '0012_arrears_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LandlordDailyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('properties', models.PositiveIntegerField(default=0)),
+                ('occupied', models.PositiveIntegerField(default=0)),
+                ('landlord', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rmsapp.landlord')),
+            ],
+            options={
+                'verbose_name_plural': 'Landlord daily occupancy',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='landlorddailyoccupancy',
+            constraint=models.UniqueConstraint(fields=('landlord', 'day'), name='unique_landlord_day_occupancy'),
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -2,11 +2,15 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, pre_save, post_delete, pre_delete
 import datetime
+from collections import defaultdict
 from django.contrib.auth.models import AbstractUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
+from decimal import Decimal
+from .cache import invalidate_all, invalidate_landlord
 
 # Create your models here.
 
@@ -27,53 +31,81 @@ class Landlord(AbstractUser):
     address = models.TextField(blank=True)
     objects = CustomUserManager()
 
-    #Calculate the total earnings per month 
-    def total_earnings_for_month(self, year, month):
-        """
-        Calculate the total earnings for a specific month across all properties and tenants.
-        """
-        start_date = timezone.datetime(year, month, 1, tzinfo=timezone.utc)
-        end_date = start_date.replace(month=start_date.month + 1) if start_date.month < 12 else start_date.replace(year=start_date.year + 1, month=1)
-        
-        total_earnings = Revenue.objects.filter(
-            landlord=self,
-            payment_date__gte=start_date,
-            payment_date__lt=end_date
-        ).aggregate(models.Sum('amount'))['amount__sum'] or 0
-
-        return total_earnings
-    
     #Total earnings per month
     def total_earnings_for_month(self, year, month):
         """
         Calculate the total earnings for a specific month across all properties and tenants.
         """
-        start_date = timezone.datetime(year, month, 1, tzinfo=timezone.utc)
-        end_date = start_date.replace(month=start_date.month + 1) if start_date.month < 12 else start_date.replace(year=start_date.year + 1, month=1)
-        
-        total_earnings = Revenue.objects.filter(
-            landlord=self,
-            payment_date__gte=start_date,
-            payment_date__lt=end_date
-        ).aggregate(models.Sum('amount'))['amount__sum'] or 0
+        return self.earnings_between(datetime.date(year, month, 1), datetime.date(year, month, 1)).aggregate(models.Sum('total'))['total__sum'] or 0
 
-        return total_earnings
+    async def atotal_earnings_for_month(self, year, month):
+        return (await self.earnings_between(datetime.date(year, month, 1), datetime.date(year, month, 1)).aaggregate(models.Sum('total')))['total__sum'] or 0
 
     #Total earnings per year
     def total_earnings_for_year(self, year):
         """
         Calculate the total earnings for a specific year across all properties and tenants.
         """
-        start_date = timezone.datetime(year, 1, 1, tzinfo=timezone.utc)
-        end_date = start_date.replace(year=start_date.year + 1)
+        return self.earnings_between(datetime.date(year, 1, 1), datetime.date(year, 12, 1)).aggregate(models.Sum('total'))['total__sum'] or 0
+
+    async def atotal_earnings_for_year(self, year):
+        return (await self.earnings_between(datetime.date(year, 1, 1), datetime.date(year, 12, 1)).aaggregate(models.Sum('total')))['total__sum'] or 0
+
+    def earnings_between(self, start_month, end_month):
+        """
+        The landlord's monthly revenue rollup rows from ``start_month`` to ``end_month`` (inclusive).
+        """
+        return LandlordMonthlyRevenue.objects.filter(landlord=self, month__gte=start_month, month__lte=end_month)
+
+    #Earnings for every month in a range
+    def earnings_series(self, start_month, end_month, by_property=False):
+        """
+        Return the earnings for each month from ``start_month`` to ``end_month`` (inclusive),
+        with months that have no revenue filled with zero.
+        """
+        months = month_range(start_month, end_month)
+        if not months:
+            return [], []
+        return months, self.assemble_earnings_series(months, self.earnings_series_rows(months, by_property), by_property)
+
+    async def aearnings_series(self, start_month, end_month, by_property=False):
+        """
+        Async version of ``earnings_series``.
+        """
+        months = month_range(start_month, end_month)
+        if not months:
+            return [], []
+        rows = [row async for row in self.earnings_series_rows(months, by_property)]
+        return months, self.assemble_earnings_series(months, rows, by_property)
 
-        total_earnings = Revenue.objects.filter(
+    def earnings_series_rows(self, months, by_property):
+        if by_property:
+            return PropertyMonthlyRevenue.objects.filter(
+                landlord=self,
+                month__gte=months[0],
+                month__lte=months[-1]
+            ).values_list('property_id', 'property__property_name', 'month', 'total')
+        return LandlordMonthlyRevenue.objects.filter(
             landlord=self,
-            payment_date__gte=start_date,
-            payment_date__lt=end_date
-        ).aggregate(models.Sum('amount'))['amount__sum'] or 0
+            month__gte=months[0],
+            month__lte=months[-1]
+        ).values_list('month', 'total')
 
-        return total_earnings
+    @staticmethod
+    def assemble_earnings_series(months, rows, by_property):
+        if by_property:
+            series = {}
+            for property_id, property_name, month, total in rows:
+                entry = series.setdefault(property_id, {'property': property_id, 'property_name': property_name, 'totals': dict.fromkeys(months, Decimal('0.00'))})
+                entry['totals'][month] = total
+            return [
+                {'property': entry['property'], 'property_name': entry['property_name'], 'totals': list(entry['totals'].values())}
+                for _, entry in sorted(series.items())
+            ]
+
+        totals = dict.fromkeys(months, Decimal('0.00'))
+        totals.update(rows)
+        return list(totals.values())
 
     #Permissions allowed to the landlord
     class Meta:
@@ -106,6 +138,25 @@ class Landlord(AbstractUser):
     def __str__(self):
         return self.email
 
+class PropertyQuerySet(models.QuerySet):
+    def with_tenant(self):
+        """
+        Annotate each property with whether a tenant currently leases it.
+        """
+        return self.annotate(has_tenant=models.Exists(Tenant.objects.filter(leased_property=models.OuterRef('pk'))))
+
+    def available_on(self, day):
+        """
+        Properties that could be leased on ``day``: open for leasing, lease started and no tenant.
+        """
+        return self.with_tenant().filter(status=True, lease_start_date__lte=day, has_tenant=False)
+
+def available_property_ids(landlord, property_ids, day):
+    """
+    Return the subset of ``property_ids`` that belongs to ``landlord`` and is free on ``day``, in a single query.
+    """
+    return set(Property.objects.filter(landlord=landlord, pk__in=property_ids).available_on(day).values_list('pk', flat=True))
+
 class Property(models.Model):
     landlord = models.ForeignKey(Landlord, on_delete=models.CASCADE, default=True)
     property_name = models.CharField(max_length=100)
@@ -115,21 +166,28 @@ class Property(models.Model):
     lease_start_date = models.DateTimeField(default='2023-01-01T00:00:00Z')
     lease_end_date = models.DateTimeField(default='2023-01-01T00:00:00Z')
     status = models.BooleanField(default=True)
+    # Denormalized "has a tenant" flag, kept in sync by the Tenant signals below; saving a Property keeps the stored value
+    occupied = models.BooleanField(default=False)
+    objects = PropertyQuerySet.as_manager()
 
     #Check whether the property is occupied
     def is_occupied(self):
         """
         Check if the property is currently occupied.
         """
-        today = datetime.today().date()
         return (
             self.status and  # Property is marked as available
-            today >= self.lease_start_date and  # Lease start date has started
-            Tenant.objects.filter(property=self).exists()  # Property has a tenant
+            timezone.now() >= self.lease_start_date and  # Lease start date has started
+            self.occupied  # Property has a tenant
         )
 
     def __str__(self):
         return self.property_name
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['landlord', 'status'], name='rms_property_landlord_status'),
+        ]
     
     
     
@@ -174,22 +232,449 @@ class Revenue(models.Model):
 
     class Meta:
         verbose_name_plural = "Revenues"
+        indexes = [
+            models.Index(fields=['landlord', 'payment_date'], name='rms_revenue_landlord_date'),
+            models.Index(fields=['property', 'payment_date'], name='rms_revenue_property_date'),
+        ]
 
 class RentDue(models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, null=True, blank=True)
     property_name = models.CharField(max_length=100)
     due_date = models.DateField()
     rent_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     is_paid = models.BooleanField(default=False)
 
     def __str__(self):
         return f"Rent Due for {self.property_name} - {self.due_date}"
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'due_date'], name='unique_tenant_rent_due'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'due_date', 'is_paid'], name='rms_rentdue_tenant_due_paid'),
+        ]
+
 class Payment(models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, default=True)
     property = models.ForeignKey(Property, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # Part of the amount already allocated to RentDue rows by the reconciliation engine
+    applied_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     payment_date = models.DateField()
 
     def __str__(self):
-        return f"Payment from {self.tenant} for {self.property} - {self.payment_date}"
\ No newline at end of file
+        return f"Payment from {self.tenant} for {self.property} - {self.payment_date}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'payment_date'], name='rms_payment_tenant_date'),
+        ]
+
+
+#Rent owed per tenant and property, bucketed by how long it has been overdue
+class ArrearsSnapshot(models.Model):
+    landlord = models.ForeignKey(Landlord, on_delete=models.CASCADE)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE)
+    as_of = models.DateField()
+    days_0_30 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    days_31_60 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    days_61_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    days_over_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.tenant} owes ${self.total} for {self.property} as of {self.as_of}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'property'], name='unique_tenant_property_arrears'),
+        ]
+        indexes = [
+            models.Index(fields=['landlord', 'as_of'], name='rms_arrears_landlord_as_of'),
+        ]
+
+
+#Keep Property.occupied in step with tenant leases
+@receiver(pre_save, sender=Tenant)
+def remember_previous_lease(sender, instance, **kwargs):
+    instance._previous_leased_property_id = None
+    if instance.pk:
+        instance._previous_leased_property_id = sender.objects.filter(pk=instance.pk).values_list(
+            'leased_property_id', flat=True
+        ).first()
+
+@receiver(post_save, sender=Tenant)
+def update_occupancy_on_lease_change(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_leased_property_id', None)
+    if previous == instance.leased_property_id:
+        return
+    if previous is not None:
+        set_occupied(previous, False)
+    if instance.leased_property_id is not None:
+        set_occupied(instance.leased_property_id, True)
+
+@receiver(post_delete, sender=Tenant)
+def release_property_on_tenant_delete(sender, instance, **kwargs):
+    if instance.leased_property_id is not None:
+        set_occupied(instance.leased_property_id, False)
+
+#Emails waiting to be delivered by the send_queued_mail worker
+class OutboxEmail(models.Model):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='rms_outbox_status_next'),
+        ]
+
+#Monthly revenue rollups, maintained from Revenue rows
+class PropertyMonthlyRevenue(models.Model):
+    landlord = models.ForeignKey(Landlord, on_delete=models.CASCADE)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE)
+    month = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payments = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.property} - {self.month.strftime('%B %Y')} - ${self.total}"
+
+    class Meta:
+        verbose_name_plural = "Property monthly revenues"
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'month'], name='unique_property_month_revenue'),
+        ]
+        indexes = [
+            models.Index(fields=['landlord', 'month'], name='rms_prop_rev_landlord_month'),
+        ]
+
+class LandlordMonthlyRevenue(models.Model):
+    landlord = models.ForeignKey(Landlord, on_delete=models.CASCADE)
+    month = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payments = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.landlord} - {self.month.strftime('%B %Y')} - ${self.total}"
+
+    class Meta:
+        verbose_name_plural = "Landlord monthly revenues"
+        constraints = [
+            models.UniqueConstraint(fields=['landlord', 'month'], name='unique_landlord_month_revenue'),
+        ]
+
+#Daily property counts per landlord, maintained from Property and Tenant changes
+class LandlordDailyOccupancy(models.Model):
+    landlord = models.ForeignKey(Landlord, on_delete=models.CASCADE)
+    day = models.DateField()
+    # Properties open for leasing whose lease had started, and those of them leased to a tenant
+    properties = models.PositiveIntegerField(default=0)
+    occupied = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.landlord} - {self.day} - {self.occupied}/{self.properties} occupied"
+
+    class Meta:
+        verbose_name_plural = "Landlord daily occupancy"
+        constraints = [
+            models.UniqueConstraint(fields=['landlord', 'day'], name='unique_landlord_day_occupancy'),
+        ]
+
+def month_range(start_month, end_month):
+    """
+    Return the first day of every month between two dates, both months included.
+    """
+    month = start_month.replace(day=1)
+    months = []
+    while month <= end_month:
+        months.append(month)
+        month = month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+    return months
+
+def revenue_month(payment_date):
+    """
+    Return the first day of the (UTC) month a payment falls into.
+    """
+    if timezone.is_aware(payment_date):
+        payment_date = payment_date.astimezone(datetime.timezone.utc)
+    return payment_date.date().replace(day=1)
+
+def apply_revenue_to_rollup(landlord_id, property_id, month, amount, payments):
+    """
+    Add ``amount`` and ``payments`` (both may be negative) to the rollup rows for a month.
+    """
+    buckets = [
+        (PropertyMonthlyRevenue, {'property_id': property_id, 'month': month}),
+        (LandlordMonthlyRevenue, {'landlord_id': landlord_id, 'month': month}),
+    ]
+    with transaction.atomic():
+        for model, lookup in buckets:
+            row, _ = model.objects.select_for_update().get_or_create(
+                defaults={'landlord_id': landlord_id}, **lookup
+            )
+            model.objects.filter(pk=row.pk).update(
+                total=models.F('total') + amount,
+                payments=models.F('payments') + payments,
+            )
+
+@receiver(pre_save, sender=Revenue)
+def remember_previous_revenue(sender, instance, **kwargs):
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = sender.objects.filter(pk=instance.pk).values(
+            'landlord_id', 'property_id', 'amount', 'payment_date'
+        ).first()
+
+@receiver(post_save, sender=Revenue)
+def add_revenue_to_rollup(sender, instance, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        apply_revenue_to_rollup(
+            previous['landlord_id'], previous['property_id'],
+            revenue_month(previous['payment_date']), -previous['amount'], -1
+        )
+    apply_revenue_to_rollup(
+        instance.landlord_id, instance.property_id,
+        revenue_month(instance.payment_date), Decimal(str(instance.amount)), 1
+    )
+
+@receiver(post_delete, sender=Revenue)
+def remove_revenue_from_rollup(sender, instance, **kwargs):
+    apply_revenue_to_rollup(
+        instance.landlord_id, instance.property_id,
+        revenue_month(instance.payment_date), -Decimal(str(instance.amount)), -1
+    )
+
+def rebuild_revenue_rollup(landlord=None):
+    """
+    Recompute the monthly rollups from the Revenue table, optionally for a single landlord.
+    """
+    revenues = Revenue.objects.all()
+    if landlord is not None:
+        revenues = revenues.filter(landlord=landlord)
+
+    monthly = revenues.annotate(
+        month=TruncMonth('payment_date', tzinfo=datetime.timezone.utc)
+    ).values('landlord_id', 'property_id', 'month').annotate(
+        total=models.Sum('amount'), payments=models.Count('id')
+    ).order_by()
+
+    property_rows = []
+    landlord_totals = {}
+    for row in monthly:
+        month = revenue_month(row['month']) if isinstance(row['month'], datetime.datetime) else row['month']
+        property_rows.append(PropertyMonthlyRevenue(
+            landlord_id=row['landlord_id'], property_id=row['property_id'],
+            month=month, total=row['total'], payments=row['payments'],
+        ))
+        key = (row['landlord_id'], month)
+        total, payments = landlord_totals.get(key, (0, 0))
+        landlord_totals[key] = (total + row['total'], payments + row['payments'])
+
+    landlord_rows = [
+        LandlordMonthlyRevenue(landlord_id=landlord_id, month=month, total=total, payments=payments)
+        for (landlord_id, month), (total, payments) in landlord_totals.items()
+    ]
+
+    with transaction.atomic():
+        property_rollup = PropertyMonthlyRevenue.objects.all()
+        landlord_rollup = LandlordMonthlyRevenue.objects.all()
+        if landlord is not None:
+            property_rollup = property_rollup.filter(landlord=landlord)
+            landlord_rollup = landlord_rollup.filter(landlord=landlord)
+        property_rollup.delete()
+        landlord_rollup.delete()
+        PropertyMonthlyRevenue.objects.bulk_create(property_rows, batch_size=1000)
+        LandlordMonthlyRevenue.objects.bulk_create(landlord_rows, batch_size=1000)
+
+    if landlord is not None:
+        invalidate_landlord(landlord.pk)
+    else:
+        invalidate_all()
+    return len(property_rows), len(landlord_rows)
+
+def lease_day(value):
+    """
+    Return the (UTC) day of a lease date, which may still be the string default on a new Property.
+    """
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timezone.is_aware(value):
+        value = value.astimezone(datetime.timezone.utc)
+    return value.date()
+
+def occupancy_intervals(lease_start_date, lease_end_date, status, occupied):
+    """
+    Return the ``(field, first_day, stop_day)`` day ranges a property counts towards;
+    ``stop_day`` is exclusive and None means open-ended.
+    """
+    if not status:
+        return []
+    start, end = lease_day(lease_start_date), lease_day(lease_end_date)
+    intervals = [('properties', start, None)]
+    if occupied and end > start:
+        intervals.append(('occupied', start, end))
+    return intervals
+
+def property_intervals(row):
+    return occupancy_intervals(row['lease_start_date'], row['lease_end_date'], row['status'], row['occupied'])
+
+def apply_occupancy_change(landlord_id, before, after):
+    """
+    Move a property's days in its landlord's occupancy series from the ``before`` to the ``after`` intervals.
+
+    Days not in the series yet are filled in by rebuilding the landlord's series.
+    """
+    apply_occupancy_changes(landlord_id, [(before, after)])
+
+def apply_occupancy_changes(landlord_id, changes):
+    """
+    Apply ``(before, after)`` interval changes of many of a landlord's properties at once.
+
+    Properties moving the same days share one UPDATE, so a batch costs one
+    query per distinct lease rather than per property.
+    """
+    net = defaultdict(int)
+    added = []
+    for before, after in changes:
+        for interval in before:
+            if interval not in after:
+                net[interval] -= 1
+        for interval in after:
+            if interval not in before:
+                net[interval] += 1
+                added.append(interval)
+    net = {interval: change for interval, change in net.items() if change}
+    if not net:
+        return
+
+    series = LandlordDailyOccupancy.objects.filter(landlord_id=landlord_id)
+    if added:
+        first_day = series.order_by('day').values_list('day', flat=True).first()
+        if first_day is None or min(start for _, start, _ in added) < first_day:
+            from .occupancy import rebuild_occupancy
+            rebuild_occupancy(landlord_ids=[landlord_id])
+            return
+
+    for (field, start, stop), change in net.items():
+        days = series.filter(day__gte=start)
+        if stop is not None:
+            days = days.filter(day__lt=stop)
+        days.update(**{field: models.F(field) + change})
+    # A rebuild only stores days on which the landlord has properties
+    if any(field == 'properties' and change < 0 for (field, _, _), change in net.items()):
+        series.filter(properties=0).delete()
+
+LEASE_FIELDS = ('landlord_id', 'lease_start_date', 'lease_end_date', 'status', 'occupied')
+
+def set_occupied(property_id, occupied):
+    """
+    Set a property's occupied flag and move its days in the occupancy series accordingly.
+    """
+    row = Property.objects.filter(pk=property_id).values(*LEASE_FIELDS).first()
+    if row is None:
+        return
+    Property.objects.filter(pk=property_id).update(occupied=occupied)
+    apply_occupancy_change(row['landlord_id'], property_intervals(row), property_intervals({**row, 'occupied': occupied}))
+
+@receiver(pre_save, sender=Property)
+def remember_previous_occupancy(sender, instance, **kwargs):
+    instance._occupancy_previous = None
+    if instance.pk:
+        instance._occupancy_previous = sender.objects.filter(pk=instance.pk).values(*LEASE_FIELDS).first()
+    # Only the Tenant signals set the flag; an instance loaded before a tenant moved in or out must not write it back
+    instance.occupied = instance._occupancy_previous['occupied'] if instance._occupancy_previous else False
+
+@receiver(post_save, sender=Property)
+def update_occupancy_series(sender, instance, **kwargs):
+    previous = getattr(instance, '_occupancy_previous', None)
+    current = {field: getattr(instance, field) for field in LEASE_FIELDS}
+    if previous and previous['landlord_id'] != instance.landlord_id:
+        apply_occupancy_change(previous['landlord_id'], property_intervals(previous), [])
+        previous = None
+    apply_occupancy_change(instance.landlord_id, property_intervals(previous) if previous else [], property_intervals(current))
+
+@receiver(pre_delete, sender=Property)
+def remember_deleted_occupancy(sender, instance, **kwargs):
+    # The instance may predate a tenant moving in or out, so remove the days the series actually counts
+    instance._occupancy_previous = sender.objects.filter(pk=instance.pk).values(*LEASE_FIELDS).first()
+
+@receiver(post_delete, sender=Property)
+def remove_from_occupancy_series(sender, instance, **kwargs):
+    previous = getattr(instance, '_occupancy_previous', None) or {field: getattr(instance, field) for field in LEASE_FIELDS}
+    apply_occupancy_change(previous['landlord_id'], property_intervals(previous), [])
+
+#Drop cached responses of the landlords whose data changed
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_landlord(sender, instance, **kwargs):
+    invalidate_landlord(instance.landlord_id)
+
+@receiver(post_save, sender=Revenue)
+@receiver(post_delete, sender=Revenue)
+def invalidate_revenue_landlord(sender, instance, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous and previous['landlord_id'] != instance.landlord_id:
+        invalidate_landlord(previous['landlord_id'])
+    invalidate_landlord(instance.landlord_id)
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_landlord(sender, instance, **kwargs):
+    property_ids = {getattr(instance, '_previous_leased_property_id', None), instance.leased_property_id} - {None}
+    if property_ids:
+        for landlord_id in set(Property.objects.filter(pk__in=property_ids).values_list('landlord_id', flat=True)):
+            invalidate_landlord(landlord_id)
+
+@receiver(m2m_changed, sender=Tenant.groups.through)
+@receiver(m2m_changed, sender=Tenant.user_permissions.through)
+def invalidate_tenant_relations_landlord(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        tenant_ids = [instance.pk]
+    elif pk_set is None:
+        # A group or permission was cleared of all its tenants, whoever they were
+        invalidate_all()
+        return
+    else:
+        tenant_ids = pk_set
+    for landlord_id in set(Property.objects.filter(tenant__pk__in=tenant_ids).values_list('landlord_id', flat=True)):
+        invalidate_landlord(landlord_id)
+
+#Keep the arrears snapshot of a tenant current as payments and dues change
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_save, sender=RentDue)
+@receiver(post_delete, sender=RentDue)
+def refresh_tenant_arrears(sender, instance, origin=None, **kwargs):
+    # Rows removed by deleting their tenant, property or landlord take the snapshot with them
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    if origin is not None and origin_model not in (Payment, RentDue):
+        return
+    from .arrears import schedule_refresh
+    schedule_refresh(instance.tenant_id)
@@ -0,0 +1,130 @@
+"""
+Daily occupancy series and vacancy rates.
+
+LandlordDailyOccupancy holds, for every landlord and day, how many of their
+properties were open for leasing and how many of those were leased. It is
+rebuilt here with an interval sweep: each property adds +1 to its landlord's
+property count at its lease start, and +1 at its lease start and -1 at its
+lease end to the occupied count when it has a tenant. A cumulative sum over
+the days turns those boundaries into daily counts for a chunk of landlords at
+a time. Between rebuilds the signal handlers in models.py move a property's
+days as its lease fields or tenant change. Days up to
+``RMS_OCCUPANCY_HORIZON_DAYS`` after the rebuild are stored, so the rebuild
+should run daily to keep the horizon ahead. Like the rebuild, those updates
+follow the lease as it stands now: a property counts as occupied over its
+whole lease while it has a tenant, and not at all once the tenant leaves, so
+past vacancy rates change with today's tenancy rather than recording it.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from .bulk import BATCH_SIZE, insert_rows
+from .cache import invalidate_landlord
+from .models import LandlordDailyOccupancy, Property, lease_day
+
+
+def horizon():
+    """
+    Last day the series is built up to.
+    """
+    return datetime.date.today() + datetime.timedelta(days=getattr(settings, 'RMS_OCCUPANCY_HORIZON_DAYS', 365))
+
+def rebuild_occupancy(landlord_ids=None, start=None, end=None, chunk_size=500, batch_size=BATCH_SIZE):
+    """
+    Recompute the series from ``start`` (default: each landlord's first lease) through
+    ``end`` (default: the horizon) and return the row count and elapsed time.
+    """
+    started = time.perf_counter()
+    end = end or horizon()
+    if landlord_ids is None:
+        landlord_ids = list(Property.objects.order_by('landlord_id').values_list('landlord_id', flat=True).distinct())
+
+    rows = 0
+    for first in range(0, len(landlord_ids), chunk_size):
+        chunk = landlord_ids[first:first + chunk_size]
+        with transaction.atomic():
+            rows += rebuild_chunk(chunk, start, end, batch_size)
+        for landlord_id in chunk:
+            invalidate_landlord(landlord_id)
+    return {'rows': rows, 'landlords': len(landlord_ids), 'seconds': time.perf_counter() - started}
+
+def rebuild_chunk(landlord_ids, start, end, batch_size):
+    import numpy as np
+
+    series = LandlordDailyOccupancy.objects.filter(landlord_id__in=landlord_ids, day__lte=end)
+    if start is not None:
+        series = series.filter(day__gte=start)
+    series.delete()
+
+    leases = list(Property.objects.filter(landlord_id__in=landlord_ids, status=True).values_list(
+        'landlord_id', 'lease_start_date', 'lease_end_date', 'occupied'
+    ))
+    if not leases:
+        return 0
+    first = start or min(lease_day(lease[1]) for lease in leases)
+    days = (end - first).days + 1
+    if days <= 0:
+        return 0
+
+    count = len(leases)
+    landlords, index = np.unique(np.fromiter((lease[0] for lease in leases), dtype=np.int64, count=count), return_inverse=True)
+    starts = np.fromiter((lease_day(lease[1]).toordinal() for lease in leases), dtype=np.int64, count=count) - first.toordinal()
+    ends = np.fromiter((lease_day(lease[2]).toordinal() for lease in leases), dtype=np.int64, count=count) - first.toordinal()
+    leased = np.fromiter((lease[3] for lease in leases), dtype=bool, count=count)
+    # Column ``days`` collects boundaries past the end and is dropped before summing
+    starts, ends = np.clip(starts, 0, days), np.clip(ends, 0, days)
+    leased &= ends > starts
+
+    property_changes = np.zeros((len(landlords), days + 1), dtype=np.int64)
+    occupied_changes = np.zeros((len(landlords), days + 1), dtype=np.int64)
+    np.add.at(property_changes, (index, starts), 1)
+    np.add.at(occupied_changes, (index[leased], starts[leased]), 1)
+    np.add.at(occupied_changes, (index[leased], ends[leased]), -1)
+    property_counts = np.cumsum(property_changes[:, :days], axis=1)
+    occupied_counts = np.cumsum(occupied_changes[:, :days], axis=1)
+
+    # Days before a landlord's first lease are not stored
+    landlord_rows, day_columns = np.nonzero(property_counts)
+    origin = first.toordinal()
+    return insert_rows(LandlordDailyOccupancy, ['landlord', 'day', 'properties', 'occupied'], (
+        (int(landlords[row]), datetime.date.fromordinal(origin + int(column)), int(property_counts[row, column]), int(occupied_counts[row, column]))
+        for row, column in zip(landlord_rows, day_columns)
+    ), batch_size)
+
+def vacancy_rate(property_days, occupied_days):
+    return round((property_days - occupied_days) / property_days, 4) if property_days else None
+
+def vacancy_report(landlord, start, end):
+    """
+    Return a landlord's property-days, occupied and vacant days and vacancy rate
+    between ``start`` and ``end`` (inclusive), in total and per month.
+    """
+    monthly = (
+        LandlordDailyOccupancy.objects.filter(landlord=landlord, day__gte=start, day__lte=end)
+        .annotate(month=TruncMonth('day')).values('month')
+        .annotate(property_days=Sum('properties'), occupied_days=Sum('occupied')).order_by('month')
+    )
+    months = [{
+        'month': row['month'].strftime('%Y-%m'),
+        'property_days': row['property_days'],
+        'occupied_days': row['occupied_days'],
+        'vacant_days': row['property_days'] - row['occupied_days'],
+        'vacancy_rate': vacancy_rate(row['property_days'], row['occupied_days']),
+    } for row in monthly]
+
+    property_days = sum(month['property_days'] for month in months)
+    occupied_days = sum(month['occupied_days'] for month in months)
+    return {
+        'start': start,
+        'end': end,
+        'property_days': property_days,
+        'occupied_days': occupied_days,
+        'vacant_days': property_days - occupied_days,
+        'vacancy_rate': vacancy_rate(property_days, occupied_days),
+        'months': months,
+    }
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TenantCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the tenant id, so every page is an indexed range read
+    no matter how deep the client has paged.
+    """
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,52 @@
+"""
+Password hashing for bulk user creation.
+
+``set_password`` runs the preferred hasher once per user, and with Django's
+default PBKDF2 iteration count that is a few hundred milliseconds of CPU each.
+hash_passwords encodes a whole batch instead. Batches of at least
+``RMS_PASSWORD_HASH_MIN_BATCH`` passwords are spread over
+``RMS_PASSWORD_HASH_WORKERS`` processes; a single password stays in-process.
+A missing password becomes an unusable hash, which costs nothing. Tenants
+created that way pick their own password through an invitation (see
+invitations.py), so the hashing happens once, when they accept.
+
+The hasher is the first entry of ``PASSWORD_HASHERS``. settings.py lets the
+environment put a fast one first for tests and local seeding.
+"""
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+
+
+def encode(hasher, password):
+    # Runs in the worker processes, which may not have Django configured, so the hasher is passed in
+    return hasher.encode(password, hasher.salt())
+
+def hash_workers():
+    return getattr(settings, 'RMS_PASSWORD_HASH_WORKERS', 1)
+
+def hash_passwords(passwords, workers=None):
+    """
+    Return the encoded hash of every password in ``passwords``, or an unusable one where it is None.
+    """
+    workers = hash_workers() if workers is None else workers
+    hashed = [make_password(None) if password is None else None for password in passwords]
+    pending = [index for index, password in enumerate(passwords) if password is not None]
+    if not pending:
+        return hashed
+
+    hasher = get_hasher()
+    if workers > 1 and len(pending) >= getattr(settings, 'RMS_PASSWORD_HASH_MIN_BATCH', 8):
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            encoded = list(pool.map(
+                functools.partial(encode, hasher), [passwords[index] for index in pending],
+                chunksize=-(-len(pending) // workers),
+            ))
+    else:
+        encoded = [encode(hasher, passwords[index]) for index in pending]
+
+    for index, value in zip(pending, encoded):
+        hashed[index] = value
+    return hashed
@@ -0,0 +1,130 @@
+"""
+Bulk tenant registration.
+
+A batch is validated item by item without touching the database, then checked
+against it with two queries: the landlord's properties come from one
+``in_bulk`` lookup and taken usernames from one ``IN`` query. The valid
+tenants are inserted with ``bulk_create`` with their property already set.
+In the same transaction their properties are marked occupied, their leased
+days added to the occupancy series with one UPDATE per distinct lease, and
+their emails queued. That transaction first locks the chosen properties and
+re-checks that they are still vacant, so concurrent batches cannot lease the
+same one. Should a username be taken concurrently, the insert falls back to
+one savepoint per tenant and reports the losers as item errors. Passwords are
+hashed as one batch before it starts (see passwords.py). Tenants sent without
+a password get an unusable one and an invitation to choose it instead of the
+welcome email. Invalid items are reported with their position and never block
+the rest of the batch.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .invitations import invitation_emails, invitation_url
+from .mail import queue_mass_mail
+from .bulk import set_created_keys
+from .cache import invalidate_landlord
+from .models import LEASE_FIELDS, Property, Tenant, apply_occupancy_changes, property_intervals
+from .passwords import hash_passwords
+from .serializer import TenantRegistrationSerializer
+
+MAX_BULK_TENANTS = 500
+WELCOME_SUBJECT = 'Welcome to Quebec Homes LTD'
+
+
+def welcome_message(first_name):
+    return f'Thank you for registering, {first_name}! Your account has been created successfully.'
+
+def insert_tenants(tenants, results):
+    """
+    Insert ``(index, tenant)`` pairs and return those inserted, recording an error for the others.
+    """
+    try:
+        with transaction.atomic():
+            Tenant.objects.bulk_create([tenant for _, tenant in tenants])
+        return tenants
+    except IntegrityError:
+        pass
+
+    # A username was taken since it was checked; find out which one by inserting tenants one at a time
+    inserted = []
+    for index, tenant in tenants:
+        try:
+            with transaction.atomic():
+                Tenant.objects.bulk_create([tenant])
+        except IntegrityError:
+            results[index] = {'index': index, 'status': 'error', 'errors': {'username': [f'A tenant with username {tenant.username} already exists']}}
+        else:
+            inserted.append((index, tenant))
+    return inserted
+
+def register_tenants(landlord, items):
+    """
+    Register every valid item for properties of ``landlord`` and return one result per item.
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = TenantRegistrationSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+
+    properties = Property.objects.filter(landlord=landlord).in_bulk({data['property_id'] for _, data in valid})
+    taken = set(Tenant.objects.filter(username__in={data['username'] for _, data in valid}).values_list('username', flat=True))
+
+    tenants = []
+    passwords = []
+    for index, data in valid:
+        property = properties.get(data['property_id'])
+        if property is None:
+            error = {'property_id': ['Property not found']}
+        elif not property.status:
+            error = {'property_id': ['Property is not available for leasing']}
+        elif property.occupied:
+            error = {'property_id': ['Property is currently occupied']}
+        elif data['username'] in taken:
+            error = {'username': [f"A tenant with username {data['username']} already exists"]}
+        else:
+            error = None
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'errors': error}
+            continue
+
+        # Later items cannot lease the same property or reuse the username
+        property.occupied = True
+        taken.add(data['username'])
+        passwords.append(data.pop('password', None))
+        tenants.append((index, Tenant(leased_property=property, **{key: value for key, value in data.items() if key != 'property_id'})))
+
+    if tenants:
+        if None in passwords:
+            # Fail before writing anything rather than create tenants whose invitation cannot be sent
+            invitation_url()
+        for (_, tenant), encoded in zip(tenants, hash_passwords(passwords)):
+            tenant.password = encoded
+        with transaction.atomic():
+            # Another batch may have leased some of the properties since they were read
+            vacant = {row.pop('pk'): row for row in Property.objects.select_for_update().filter(
+                pk__in=[tenant.leased_property_id for _, tenant in tenants], occupied=False
+            ).values('pk', *LEASE_FIELDS)}
+            for index, tenant in tenants:
+                if tenant.leased_property_id not in vacant:
+                    results[index] = {'index': index, 'status': 'error', 'errors': {'property_id': ['Property is currently occupied']}}
+            tenants = insert_tenants([(index, tenant) for index, tenant in tenants if tenant.leased_property_id in vacant], results)
+
+            Property.objects.filter(pk__in=[tenant.leased_property_id for _, tenant in tenants]).update(occupied=True)
+            apply_occupancy_changes(landlord.pk, [
+                (property_intervals(vacant[tenant.leased_property_id]), property_intervals({**vacant[tenant.leased_property_id], 'occupied': True}))
+                for _, tenant in tenants
+            ])
+            # Invitation links need the keys
+            set_created_keys([tenant for _, tenant in tenants])
+            queue_mass_mail([
+                (WELCOME_SUBJECT, welcome_message(tenant.first_name), settings.DEFAULT_FROM_EMAIL, [tenant.email])
+                for _, tenant in tenants if tenant.has_usable_password()
+            ] + invitation_emails([tenant for _, tenant in tenants if not tenant.has_usable_password()]))
+        for index, tenant in tenants:
+            results[index] = {'index': index, 'status': 'created', 'id': tenant.pk, 'username': tenant.username}
+        invalidate_landlord(landlord.pk)
+    return results
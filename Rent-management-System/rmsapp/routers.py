@@ -0,0 +1,81 @@
+"""
+Read-replica routing for the read-only endpoints.
+
+Views wrapped in ``read_from_replica`` set a context variable, and while it is
+set ``ReadReplicaRouter`` sends reads to the ``RMS_READ_REPLICA`` database
+alias when that alias is configured. Everything else, including writes made
+during those views, keeps using ``default``. ``primary_reads`` overrides it for
+a block that must see the latest writes, such as rebuilding a cached response
+right after the data changed (see cache.py). A context variable follows the
+request into ``sync_to_async`` threads, so async views are routed too.
+"""
+import asyncio
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_use_replica = ContextVar('rms_use_replica', default=False)
+_force_primary = ContextVar('rms_force_primary', default=False)
+
+
+def replica_alias():
+    alias = getattr(settings, 'RMS_READ_REPLICA', None)
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def replica_reads():
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+@contextmanager
+def primary_reads():
+    """
+    Read from ``default`` inside the block, even in views wrapped in ``read_from_replica``.
+    """
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+def read_from_replica(view):
+    """
+    Route the view's reads to the read replica.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _force_primary.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Rows read from the replica must still be saved to default
+        return DEFAULT_DB_ALIAS if replica_alias() else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != replica_alias()
@@ -0,0 +1,165 @@
+"""
+Synthetic portfolios for benchmarks and load tests.
+
+Landlords are generated a chunk at a time. Each chunk's properties, tenants
+and monthly Revenue, Payment and RentDue rows are inserted with
+``executemany`` in fixed-size batches (mysqlclient turns those into
+multi-row INSERTs), so memory stays bounded by the chunk and batch sizes
+whatever the total. Every user gets the same password hash,
+computed once, instead of paying for a hash per row. Amounts and payment
+dates come from a seeded ``random.Random``, so the same options always
+produce the same data. The occupancy flag and the monthly revenue rollups are
+written directly, and the daily occupancy series and the arrears snapshot
+rebuilt, since raw inserts send no signals.
+"""
+import datetime
+import random
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .arrears import refresh_arrears
+from .bulk import BATCH_SIZE, created_ids, insert_rows, last_id
+from .cache import invalidate_landlord
+from .models import (
+    Landlord, LandlordMonthlyRevenue, Payment, Property, PropertyMonthlyRevenue, RentDue, Revenue, Tenant,
+)
+from .occupancy import rebuild_occupancy
+
+
+class Seeder:
+    """
+    Generates ``landlords`` landlords, each with ``properties`` properties of
+    which the first ``tenants`` are leased, and ``months`` months of rent
+    history (ending with the current month) for every lease.
+    """
+
+    def __init__(self, landlords=1, properties=100, tenants=80, months=12, seed=42, prefix='seed',
+                 password='password', chunk_size=5000, batch_size=BATCH_SIZE):
+        self.landlords = landlords
+        self.properties = properties
+        self.tenants = min(tenants, properties)
+        self.prefix = prefix
+        self.seed = seed
+        self.batch_size = batch_size
+        # Whole landlords per chunk, about chunk_size properties each
+        self.landlords_per_chunk = max(1, chunk_size // max(properties, 1))
+        self.password_hash = make_password(password)
+
+        today = datetime.date.today()
+        first = today.year * 12 + today.month - months
+        self.months = [datetime.date(index // 12, index % 12 + 1, 1) for index in range(first, first + months)]
+        self.lease_start = datetime.datetime.combine(self.months[0] if self.months else today, datetime.time.min, tzinfo=datetime.timezone.utc)
+        self.lease_end = datetime.datetime(today.year + 1, 12, 31, tzinfo=datetime.timezone.utc)
+
+    def run(self, progress=None):
+        """
+        Write everything and return the row counts, elapsed time and tenants per second.
+        """
+        stats = defaultdict(int)
+        started = time.perf_counter()
+        for first in range(0, self.landlords, self.landlords_per_chunk):
+            numbers = range(first, min(first + self.landlords_per_chunk, self.landlords))
+            with transaction.atomic():
+                self.seed_chunk(numbers, stats)
+            stats['seconds'] = time.perf_counter() - started
+            stats['tenants_per_second'] = stats['tenants'] / stats['seconds'] if stats['seconds'] else 0.0
+            if progress:
+                progress(dict(stats))
+        return dict(stats)
+
+    def seed_chunk(self, numbers, stats):
+        # One generator per chunk, so a chunk's data does not depend on how many chunks came before
+        rng = random.Random(f'{self.seed}-{numbers.start}')
+
+        after = last_id(Landlord)
+        insert_rows(Landlord, ['username', 'email', 'first_name', 'last_name', 'password'], (
+            (f'{self.prefix}-landlord-{number}', f'{self.prefix}-landlord-{number}@example.com', 'Landlord', str(number), self.password_hash)
+            for number in numbers
+        ), self.batch_size)
+        landlord_ids = created_ids(Landlord, after, len(numbers))
+
+        after = last_id(Property)
+        rents = [Decimal(rng.randrange(700, 2500, 25)) for _ in range(len(landlord_ids) * self.properties)]
+        insert_rows(Property, ['landlord', 'property_name', 'address', 'bedrooms', 'rent_amount', 'lease_start_date', 'lease_end_date', 'occupied'], (
+            (landlord_id, f'Unit {number}', f'{number} Main St', 1 + number % 4, rents[index * self.properties + number],
+             self.lease_start, self.lease_end, number < self.tenants)
+            for index, landlord_id in enumerate(landlord_ids)
+            for number in range(self.properties)
+        ), self.batch_size)
+        property_ids = created_ids(Property, after, len(rents))
+
+        leases = [
+            (landlord_id, property_ids[index * self.properties + number], rents[index * self.properties + number],
+             f'Unit {number}', f'{self.prefix}-{numbers[index]}-tenant-{number}')
+            for index, landlord_id in enumerate(landlord_ids)
+            for number in range(self.tenants)
+        ]
+        after = last_id(Tenant)
+        insert_rows(Tenant, ['username', 'email', 'first_name', 'phone_number', 'city', 'leased_property', 'password'], (
+            (username, f'{username}@example.com', 'Tenant', '555-0100', 'Quebec', property_id, self.password_hash)
+            for _, property_id, _, _, username in leases
+        ), self.batch_size)
+        tenant_ids = created_ids(Tenant, after, len(leases))
+
+        # Most tenants pay each month in full, a few pay late or short, a few skip a month
+        payments = []
+        for (landlord_id, property_id, rent, _, _), tenant_id in zip(leases, tenant_ids):
+            for month in self.months:
+                roll = rng.random()
+                if roll < 0.03:
+                    continue
+                amount = rent if roll > 0.08 else (rent * Decimal(rng.randrange(40, 95)) / 100).quantize(Decimal('0.01'))
+                payments.append((landlord_id, property_id, tenant_id, month + datetime.timedelta(days=rng.randrange(0, 10)), amount))
+
+        stats['revenue'] += insert_rows(Revenue, ['landlord', 'property', 'tenant', 'amount', 'payment_date'], (
+            (landlord_id, property_id, tenant_id, amount, datetime.datetime.combine(day, datetime.time(12), tzinfo=datetime.timezone.utc))
+            for landlord_id, property_id, tenant_id, day, amount in payments
+        ), self.batch_size)
+        stats['payments'] += insert_rows(Payment, ['property', 'tenant', 'amount', 'payment_date'], (
+            (property_id, tenant_id, amount, day)
+            for _, property_id, tenant_id, day, amount in payments
+        ), self.batch_size)
+        stats['rent_dues'] += insert_rows(RentDue, ['tenant', 'property', 'property_name', 'due_date', 'rent_amount'], (
+            (tenant_id, property_id, property_name, month, rent)
+            for (_, property_id, rent, property_name, _), tenant_id in zip(leases, tenant_ids)
+            for month in self.months
+        ), self.batch_size)
+        self.write_rollups(payments)
+        rebuild_occupancy(landlord_ids, batch_size=self.batch_size)
+        refresh_arrears(tenant_ids=tenant_ids, batch_size=self.batch_size)
+
+        stats['landlords'] += len(landlord_ids)
+        stats['properties'] += len(property_ids)
+        stats['tenants'] += len(tenant_ids)
+        for landlord_id in landlord_ids:
+            invalidate_landlord(landlord_id)
+
+    def write_rollups(self, payments):
+        by_property = defaultdict(lambda: [Decimal('0'), 0])
+        by_landlord = defaultdict(lambda: [Decimal('0'), 0])
+        for landlord_id, property_id, _, day, amount in payments:
+            month = day.replace(day=1)
+            for bucket in (by_property[(landlord_id, property_id, month)], by_landlord[(landlord_id, month)]):
+                bucket[0] += amount
+                bucket[1] += 1
+        insert_rows(PropertyMonthlyRevenue, ['landlord', 'property', 'month', 'total', 'payments'], (
+            (landlord_id, property_id, month, total, count)
+            for (landlord_id, property_id, month), (total, count) in by_property.items()
+        ), self.batch_size)
+        insert_rows(LandlordMonthlyRevenue, ['landlord', 'month', 'total', 'payments'], (
+            (landlord_id, month, total, count)
+            for (landlord_id, month), (total, count) in by_landlord.items()
+        ), self.batch_size)
+
+
+def seed_dataset(landlords=1, properties=100, tenants=80, years=1, prefix='bench', seed=42):
+    """
+    Create a synthetic portfolio with ``years`` of history and return its landlords.
+    """
+    after = last_id(Landlord)
+    Seeder(landlords, properties, tenants, months=years * 12, seed=seed, prefix=prefix).run()
+    return list(Landlord.objects.filter(pk__gt=after).order_by('pk'))
@@ -1,5 +1,12 @@
 from rest_framework import serializers
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from decimal import Decimal
+from django.db import models
+from django.utils import timezone
 from .models import *
+from .bulk import keyset_chunks
 
 class RentSerializer(serializers.ModelSerializer):
     class Meta: 
@@ -40,6 +47,70 @@ class TenantSerializer(serializers.ModelSerializer):
             'user_permissions',
         ]
 
+def new_tenant_data(data):
+    """
+    Default ``username`` to the email and check that it fits, then run the password validators.
+
+    Raises a serializers.ValidationError keyed by field. No queries are run.
+    """
+    data.setdefault('username', data['email'])
+    max_length = Tenant._meta.get_field('username').max_length
+    if len(data['username']) > max_length:
+        raise serializers.ValidationError({'username': [f'Ensure this field has no more than {max_length} characters.']})
+    if data.get('password') is not None:
+        try:
+            validate_password(data['password'], user=Tenant(**{key: value for key, value in data.items() if key in ('username', 'first_name', 'last_name', 'email')}))
+        except ValidationError as error:
+            raise serializers.ValidationError({'password': error.messages})
+    return data
+
+class TenantSignupSerializer(TenantSerializer):
+    """
+    A tenant registering themselves. The view sets the lease once it has
+    checked the property, and the account gets no staff flags or permissions.
+    Without a password the account gets an unusable one.
+    """
+    username = serializers.CharField(required=False, max_length=150, validators=[UnicodeUsernameValidator()])
+    password = serializers.CharField(write_only=True, required=False, trim_whitespace=False)
+
+    class Meta(TenantSerializer.Meta):
+        fields = TenantSerializer.Meta.fields + ['username', 'password']
+        read_only_fields = ['leased_property', 'is_staff', 'is_superuser', 'groups', 'user_permissions']
+        extra_kwargs = {'email': {'required': True, 'allow_blank': False}}
+
+    def validate(self, data):
+        data = new_tenant_data(data)
+        if Tenant.objects.filter(username=data['username']).exists():
+            raise serializers.ValidationError({'username': [f"A tenant with username {data['username']} already exists"]})
+        return data
+
+    def create(self, validated_data):
+        password = validated_data.pop('password', None)
+        tenant = Tenant(**validated_data)
+        tenant.set_password(password)
+        tenant.save()
+        return tenant
+
+class TenantRegistrationSerializer(serializers.ModelSerializer):
+    """
+    One item of a bulk registration, held to the same username and password
+    checks as a single registration. Username uniqueness and the property are
+    checked for the whole batch at once, so validating an item runs no queries.
+    """
+    property_id = serializers.IntegerField()
+    password = serializers.CharField(write_only=True, required=False, trim_whitespace=False)
+
+    class Meta:
+        model = Tenant
+        fields = ['username', 'first_name', 'last_name', 'email', 'phone_number', 'address', 'city', 'property_id', 'password']
+        extra_kwargs = {
+            'username': {'required': False, 'validators': [UnicodeUsernameValidator()]},
+            'email': {'required': True, 'allow_blank': False},
+        }
+
+    def validate(self, data):
+        return new_tenant_data(data)
+
 class PropertySerializer(serializers.ModelSerializer):
     class Meta:
         model = Property
@@ -54,3 +125,122 @@ class PropertySerializer(serializers.ModelSerializer):
             'lease_end_date',
             'status',
         ]
+
+
+class ListEncoder:
+    """
+    Read-only fast path for large list responses.
+
+    Produces the same JSON-ready dicts as ``serializer_class(queryset, many=True).data``
+    but reads plain ``.values()`` rows and formats Decimal/datetime columns directly,
+    skipping DRF's per-field machinery. Many-to-many fields are loaded with one
+    query each through their join tables.
+    """
+
+    def __init__(self, serializer_class):
+        meta = serializer_class.Meta
+        self.model = meta.model
+        self.columns = []
+        self.output = []
+        self.many_to_many = {}
+        for name in meta.fields:
+            field = self.model._meta.get_field(name)
+            if field.many_to_many:
+                self.many_to_many[name] = field
+                self.output.append((name, None, None))
+                continue
+            formatter = None
+            if isinstance(field, models.DecimalField):
+                formatter = self.decimal_formatter(field.decimal_places)
+            elif isinstance(field, models.DateTimeField):
+                formatter = self.datetime_formatter
+            elif isinstance(field, models.DateField):
+                formatter = self.format_date
+            self.columns.append(field.attname)
+            self.output.append((name, field.attname, formatter))
+
+    @staticmethod
+    def decimal_formatter(decimal_places):
+        quantum = Decimal(1).scaleb(-decimal_places)
+        return lambda value: '{:f}'.format(Decimal(value).quantize(quantum))
+
+    @staticmethod
+    def datetime_formatter(current_timezone):
+        def format_datetime(value):
+            if value.tzinfo is not None:
+                value = value.astimezone(current_timezone)
+            value = value.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return format_datetime
+
+    @staticmethod
+    def format_date(value):
+        return value.isoformat()
+
+    def encode(self, queryset):
+        """
+        Encode a whole queryset in ``1 + number of many-to-many fields`` queries.
+        """
+        rows = list(queryset.values(*self.columns))
+        keys = [row['id'] for row in rows] if queryset.query.is_sliced else queryset.values('pk')
+        return self.format_rows(rows, keys)
+
+    def iter_encode(self, queryset, chunk_size=2000):
+        """
+        Yield encoded rows in primary key order, reading rows and many-to-many fields one chunk at a time.
+        """
+        for chunk in keyset_chunks(queryset.values(*self.columns), ('id',), lambda row: (row['id'],), chunk_size):
+            yield from self.format_rows(chunk, [row['id'] for row in chunk])
+
+    async def aencode(self, queryset):
+        """
+        Async version of ``encode``, reading rows through the async ORM.
+        """
+        rows = [row async for row in queryset.values(*self.columns)]
+        keys = [row['id'] for row in rows] if queryset.query.is_sliced else queryset.values('pk')
+        related = {name: await self.arelated_ids(field, keys) for name, field in self.many_to_many.items()}
+        return self.format(rows, related)
+
+    def format_rows(self, rows, keys):
+        return self.format(rows, {name: self.related_ids(field, keys) for name, field in self.many_to_many.items()})
+
+    def format(self, rows, related):
+        # Resolve the active timezone once per batch rather than once per value
+        current_timezone = timezone.get_current_timezone()
+        output = [
+            (name, column, formatter(current_timezone) if formatter == self.datetime_formatter else formatter)
+            for name, column, formatter in self.output
+        ]
+        encoded = []
+        for row in rows:
+            item = {}
+            for name, column, formatter in output:
+                if column is None:
+                    item[name] = related[name].get(row['id'], [])
+                    continue
+                value = row[column]
+                item[name] = value if value is None or formatter is None else formatter(value)
+            encoded.append(item)
+        return encoded
+
+    def related_pairs(self, field, keys):
+        through = field.remote_field.through
+        source = field.m2m_field_name() + '_id'
+        target = field.m2m_reverse_field_name() + '_id'
+        return through.objects.filter(**{f'{source}__in': keys}).order_by(source, target).values_list(source, target)
+
+    def related_ids(self, field, keys):
+        ids = {}
+        for source_id, target_id in self.related_pairs(field, keys):
+            ids.setdefault(source_id, []).append(target_id)
+        return ids
+
+    async def arelated_ids(self, field, keys):
+        ids = {}
+        async for source_id, target_id in self.related_pairs(field, keys):
+            ids.setdefault(source_id, []).append(target_id)
+        return ids
+
+
+property_list_encoder = ListEncoder(PropertySerializer)
+tenant_list_encoder = ListEncoder(TenantSerializer)
@@ -1,3 +1,1630 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import tempfile
+import warnings
+from io import StringIO
+from unittest import mock
+from decimal import Decimal
+from importlib import import_module
+
+import numpy as np
+
+from django.apps import apps
+from django.contrib.auth.hashers import check_password, is_password_usable
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .arrears import BUCKETS, aging_report, refresh_arrears
+from .benchmarks import ForceAuthAsyncClient, compare_with_baseline, latency_summary, measure_import_time
+from .billing import generate_rent_dues, next_billing_date
+from .bulk import set_created_keys
+from .exports import iter_parquet, ledger_rows
+from .forecast import rent_roll_forecast
+from .importer import TenantImporter, import_file
+from .invitations import INVITE_SUBJECT
+from .management.commands.bench_endpoints import Command as BenchEndpointsCommand
+from .occupancy import rebuild_occupancy
+from .passwords import hash_passwords
+from .registration import register_tenants
+from .reconciliation import allocate, reconcile_month
+from .routers import ReadReplicaRouter, replica_reads
+from .seeding import Seeder
+from .metrics import PerformanceMiddleware, percentile, registry
+from .mail import dispatch_outbox, queue_mail, queue_mass_mail
+from .models import *
+from .serializer import PropertySerializer, TenantSerializer, property_list_encoder, tenant_list_encoder
 
 # Create your tests here.
+
+INVITE_URL = 'https://rms.example.com/invite/{uid}/{token}/'
+
+def make_landlord(username='landlord'):
+    return Landlord.objects.create(username=username, email=f'{username}@example.com')
+
+def make_property(landlord, name='Unit 1', rent='1000.00'):
+    return Property.objects.create(
+        landlord=landlord, property_name=name, address='1 Main St', bedrooms=2, rent_amount=Decimal(rent)
+    )
+
+def make_tenant(username='tenant', leased_property=None):
+    return Tenant.objects.create(
+        username=username, email=f'{username}@example.com', phone_number='555-0100',
+        city='Quebec', leased_property=leased_property
+    )
+
+def paid_on(year, month, day=1):
+    return timezone.datetime(year, month, day, 12, tzinfo=datetime.timezone.utc)
+
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.property = make_property(self.landlord)
+        self.tenant = make_tenant(leased_property=self.property)
+
+    def add_revenue(self, amount, payment_date, property=None):
+        return Revenue.objects.create(
+            landlord=self.landlord, property=property or self.property, tenant=self.tenant,
+            amount=Decimal(amount), payment_date=payment_date
+        )
+
+    def test_totals_follow_revenue_changes(self):
+        self.add_revenue('100.00', paid_on(2023, 1, 5))
+        self.add_revenue('50.00', paid_on(2023, 1, 20), property=make_property(self.landlord, 'Unit 2'))
+        moved = self.add_revenue('25.00', paid_on(2023, 2, 3))
+
+        self.assertEqual(self.landlord.total_earnings_for_month(2023, 1), Decimal('150.00'))
+        self.assertEqual(self.landlord.total_earnings_for_month(2023, 2), Decimal('25.00'))
+
+        moved.payment_date = paid_on(2023, 3, 1)
+        moved.amount = Decimal('30.00')
+        moved.save()
+        self.assertEqual(self.landlord.total_earnings_for_month(2023, 2), 0)
+        self.assertEqual(self.landlord.total_earnings_for_month(2023, 3), Decimal('30.00'))
+
+        moved.delete()
+        self.assertEqual(self.landlord.total_earnings_for_year(2023), Decimal('150.00'))
+
+    def test_year_total_reads_only_the_rollup(self):
+        for month in range(1, 13):
+            self.add_revenue('10.00', paid_on(2023, month))
+        self.add_revenue('10.00', paid_on(2024, 1))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.landlord.total_earnings_for_year(2023), Decimal('120.00'))
+
+    def test_rebuild_matches_incremental_rollup(self):
+        self.add_revenue('100.00', paid_on(2023, 12, 31))
+        self.add_revenue('40.00', paid_on(2024, 1, 1))
+        expected = list(PropertyMonthlyRevenue.objects.order_by('month').values_list('month', 'total', 'payments'))
+
+        PropertyMonthlyRevenue.objects.all().delete()
+        LandlordMonthlyRevenue.objects.all().delete()
+        call_command('rebuild_revenue_rollup', stdout=StringIO())
+
+        self.assertEqual(
+            list(PropertyMonthlyRevenue.objects.order_by('month').values_list('month', 'total', 'payments')), expected
+        )
+        self.assertEqual(self.landlord.total_earnings_for_year(2023), Decimal('100.00'))
+        self.assertEqual(self.landlord.total_earnings_for_year(2024), Decimal('40.00'))
+
+
+class EarningsSeriesTests(TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.first = make_property(self.landlord, 'Unit 1')
+        self.second = make_property(self.landlord, 'Unit 2')
+        tenant = make_tenant(leased_property=self.first)
+        for property, amount, payment_date in [
+            (self.first, '100.00', paid_on(2023, 1, 3)),
+            (self.second, '70.00', paid_on(2023, 1, 9)),
+            (self.first, '100.00', paid_on(2023, 3, 2)),
+        ]:
+            Revenue.objects.create(landlord=self.landlord, property=property, tenant=tenant, amount=Decimal(amount), payment_date=payment_date)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+
+    def test_months_without_revenue_are_zero(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/earnings/series/', {'start': '2022-12', 'end': '2023-04'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'months': ['2022-12', '2023-01', '2023-02', '2023-03', '2023-04'],
+            'totals': ['0.00', '170.00', '0.00', '100.00', '0.00'],
+        })
+
+    def test_series_split_per_property(self):
+        response = self.client.get('/earnings/series/', {'start': '2023-01', 'end': '2023-03', 'by_property': 'true'})
+
+        self.assertEqual(response.json()['properties'], [
+            {'property': self.first.pk, 'property_name': 'Unit 1', 'totals': ['100.00', '0.00', '100.00']},
+            {'property': self.second.pk, 'property_name': 'Unit 2', 'totals': ['70.00', '0.00', '0.00']},
+        ])
+
+    def test_rejects_bad_ranges(self):
+        self.assertEqual(self.client.get('/earnings/series/', {'start': '2023-13'}).status_code, 400)
+        self.assertEqual(self.client.get('/earnings/series/', {'start': '2023-05', 'end': '2023-01'}).status_code, 400)
+
+
+def query_plan(sql):
+    """
+    Return the query plan rows for a captured SQL statement on the current backend.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}')
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def full_scans(sql, tables):
+    """
+    Return the plan steps that read every row of one of ``tables``.
+    """
+    scans = []
+    for step in query_plan(sql):
+        if connection.vendor == 'sqlite':
+            words = step.split()
+            if words[:1] == ['SCAN'] and words[1] in tables and 'USING' not in words:
+                scans.append(step)
+        elif step.get('table') in tables and step.get('type') == 'ALL':
+            scans.append(step)
+    return scans
+
+
+class QueryPlanTests(TestCase):
+    """
+    Run the hot endpoints, capture the SQL they issue and fail if any of it
+    falls back to a full scan of the large rmsapp tables.
+    """
+    large_tables = {
+        Revenue._meta.db_table,
+        Property._meta.db_table,
+        Tenant._meta.db_table,
+        RentDue._meta.db_table,
+        Payment._meta.db_table,
+        PropertyMonthlyRevenue._meta.db_table,
+        LandlordMonthlyRevenue._meta.db_table,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = make_landlord()
+        other = make_landlord('other')
+        for owner in (cls.landlord, other):
+            for number in range(20):
+                property = make_property(owner, f'{owner.username} unit {number}')
+                tenant = make_tenant(f'{owner.username}-tenant-{number}', leased_property=property)
+                for month in range(1, 13):
+                    Revenue.objects.create(landlord=owner, property=property, tenant=tenant, amount=Decimal('500.00'), payment_date=paid_on(2023, month))
+                    RentDue.objects.create(tenant=tenant, property_name=property.property_name, due_date=datetime.date(2023, month, 1), rent_amount=Decimal('500.00'))
+                    Payment.objects.create(tenant=tenant, property=property, amount=Decimal('500.00'), payment_date=datetime.date(2023, month, 2))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+
+    def assertNoFullScans(self, url, **params):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertTrue(captured.captured_queries, url)
+        for query in captured.captured_queries:
+            self.assertEqual(full_scans(query['sql'], self.large_tables), [], query['sql'])
+
+    def test_earnings_queries_use_indexes(self):
+        self.assertNoFullScans('/earnings/2023/')
+        self.assertNoFullScans('/earnings/2023/6/')
+        self.assertNoFullScans('/earnings/series/', start='2023-01', end='2023-12', by_property='true')
+
+    def test_graph_queries_use_indexes(self):
+        self.assertNoFullScans('/graphs/monthly/2023/6/')
+        self.assertNoFullScans('/graphs/yearly/2023/')
+
+    def test_dashboard_queries_use_indexes(self):
+        self.assertNoFullScans('/dashboard/')
+
+    def test_ledger_lookups_use_indexes(self):
+        tenant = Tenant.objects.filter(leased_property__landlord=self.landlord).first()
+        due = RentDue.objects.filter(tenant=tenant, due_date__lte=datetime.date(2023, 6, 1), is_paid=False)
+        paid = Payment.objects.filter(tenant=tenant, payment_date__range=(datetime.date(2023, 1, 1), datetime.date(2023, 6, 30)))
+        for queryset in (due, paid):
+            self.assertEqual(full_scans(str(queryset.query), self.large_tables), [], str(queryset.query))
+
+
+class IncomeGraphTests(TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        first = make_property(self.landlord, 'Unit 1')
+        second = make_property(self.landlord, 'Unit 2')
+        tenant = make_tenant(leased_property=first)
+        for property, amount, payment_date in [
+            (first, '100.00', paid_on(2023, 2, 3)),
+            (first, '100.00', paid_on(2023, 3, 3)),
+            (second, '80.00', paid_on(2023, 3, 9)),
+        ]:
+            Revenue.objects.create(landlord=self.landlord, property=property, tenant=tenant, amount=Decimal(amount), payment_date=payment_date)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+
+    def test_monthly_graph_returns_series(self):
+        response = self.client.get('/graphs/monthly/2023/2/')
+
+        self.assertEqual(response.json(), {
+            'title': 'Monthly Income - 2023-02-01 to 2023-02-28',
+            'labels': ['Unit 1'],
+            'totals': ['100.00'],
+        })
+
+    def test_yearly_graph_returns_series(self):
+        response = self.client.get('/graphs/yearly/2023/')
+
+        self.assertEqual(response.json()['labels'], ['Unit 1', 'Unit 2'])
+        self.assertEqual(response.json()['totals'], ['200.00', '80.00'])
+
+    def test_plotly_figure_is_opt_in(self):
+        try:
+            import plotly  # noqa: F401
+        except ImportError:
+            self.skipTest('plotly is not installed')
+
+        response = self.client.get('/graphs/yearly/2023/', {'chart': 'plotly'})
+
+        self.assertIn('graph', response.json())
+
+
+class StartupImportTests(SimpleTestCase):
+    # Generous enough for a cold CI runner; override with RMS_IMPORT_BUDGET_MS.
+    budget_ms = float(os.environ.get('RMS_IMPORT_BUDGET_MS', 3000))
+
+    def test_entry_points_import_without_chart_dependencies(self):
+        for module in ('myproject.wsgi', 'myproject.asgi'):
+            with self.subTest(module=module):
+                result = measure_import_time(module)
+                self.assertEqual(result['heavy_modules'], [])
+                self.assertLess(result['total_ms'], self.budget_ms)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('SMTP server unavailable')
+
+
+class OutboxTests(TestCase):
+    def test_dispatch_sends_queued_mail_in_batches(self):
+        queue_mass_mail([('Welcome', f'Hello {number}', None, [f'user{number}@example.com']) for number in range(7)])
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(dispatch_outbox(batch_size=5, workers=2), (5, 0))
+        call_command('send_queued_mail', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.SENT).count(), 7)
+
+    @override_settings(EMAIL_BACKEND='rmsapp.tests.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        email = queue_mail('Welcome', 'Hello', None, ['user@example.com'])
+
+        self.assertEqual(dispatch_outbox(max_attempts=2), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.PENDING, 1))
+        self.assertIn('SMTP server unavailable', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(dispatch_outbox(max_attempts=2), (0, 0))
+
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(dispatch_outbox(max_attempts=2), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.FAILED, 2))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class RegistrationViewTests(TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.property = make_property(self.landlord)
+        self.client = APIClient()
+
+    def register_tenant(self, property, username='new-tenant', **fields):
+        return self.client.post('/register/tenant/', {
+            'property_id': property.pk, 'username': username, 'email': f'{username}@example.com', 'first_name': 'New',
+            'phone_number': '555-0100', 'city': 'Quebec', 'password': 'long-enough-secret', **fields,
+        }, format='json')
+
+    def test_landlord_registration_only_queues_the_email(self):
+        response = self.client.post('/register/landlord/', {
+            'first_name': 'Ann', 'second_name': 'Lee', 'email': 'ann@example.com', 'phone_number': '555-0100', 'address': '1 Main St',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Landlord.objects.filter(username='ann@example.com', last_name='Lee').count(), 1)
+        self.assertEqual(list(OutboxEmail.objects.values_list('recipients', flat=True)), [['ann@example.com']])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(self.client.post('/register/landlord/', {'email': 'ann@example.com', 'phone_number': '555-0100'}, format='json').status_code, 400)
+
+    def test_tenant_registration_only_queues_the_email(self):
+        response = self.register_tenant(self.property, is_superuser=True)
+
+        self.assertEqual(response.status_code, 201)
+        tenant = Tenant.objects.get(username='new-tenant')
+        self.assertEqual((tenant.leased_property, tenant.is_superuser, tenant.check_password('long-enough-secret')), (self.property, False, True))
+        self.assertEqual(list(OutboxEmail.objects.values_list('recipients', flat=True)), [['new-tenant@example.com']])
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_tenant_registration_leases_only_a_vacant_property(self):
+        Property.objects.filter(pk=self.property.pk).update(lease_start_date=paid_on(2023, 1, 1), lease_end_date=paid_on(2023, 12, 31))
+        rebuild_occupancy()
+        day = LandlordDailyOccupancy.objects.filter(landlord=self.landlord, day=datetime.date(2023, 6, 1))
+        self.assertEqual(list(day.values_list('properties', 'occupied')), [(1, 0)])
+
+        self.assertEqual(self.register_tenant(self.property).status_code, 201)
+
+        self.property.refresh_from_db()
+        self.assertTrue(self.property.occupied)
+        self.assertEqual(list(day.values_list('properties', 'occupied')), [(1, 1)])
+
+        response = self.register_tenant(self.property, username='second-tenant')
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'Property is currently occupied'}))
+        self.assertFalse(Tenant.objects.filter(username='second-tenant').exists())
+
+    def test_tenant_registration_validates_the_username_and_password(self):
+        self.assertEqual(self.register_tenant(self.property, password='123').status_code, 400)
+        # The username defaults to the email, which may be longer than a username can be
+        response = self.client.post('/register/tenant/', {
+            'property_id': self.property.pk, 'email': f"{'a' * 150}@example.com", 'phone_number': '555-0100', 'city': 'Quebec',
+        }, format='json')
+        self.assertEqual((response.status_code, list(response.json())), (400, ['username']))
+        self.assertFalse(Tenant.objects.exists())
+
+
+class QueryBudgetTests(TestCase):
+    """
+    The dashboard and tenant listing must issue the same number of queries
+    however many tenants a landlord has.
+    """
+    def seed_tenants(self, landlord, count):
+        properties = Property.objects.bulk_create([
+            Property(landlord=landlord, property_name=f'Unit {number}', address='1 Main St', bedrooms=1, rent_amount=Decimal('900.00'))
+            for number in range(count)
+        ])
+        tenants = Tenant.objects.bulk_create([
+            Tenant(username=f'{landlord.username}-tenant-{number}', email=f'tenant{number}@example.com', phone_number='555-0100', city='Quebec', leased_property=property)
+            for number, property in enumerate(properties)
+        ])
+        group = Group.objects.create(name=f'{landlord.username} tenants')
+        Tenant.groups.through.objects.bulk_create([
+            Tenant.groups.through(tenant_id=tenant.pk, group_id=group.pk) for tenant in tenants
+        ])
+
+    def assertBudget(self, url, queries, tenants, page_size=None):
+        for count in (1, 100, 10000):
+            with self.subTest(tenants=count):
+                Tenant.objects.all().delete()
+                cache.clear()
+                landlord = make_landlord(f'landlord-{count}')
+                self.seed_tenants(landlord, count)
+                client = APIClient()
+                client.force_authenticate(user=landlord)
+
+                with self.assertNumQueries(queries):
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(tenants(response.json())), min(count, page_size or count))
+
+    def test_dashboard_query_budget(self):
+        # properties, tenants, tenant groups, tenant permissions
+        self.assertBudget('/dashboard/', 4, lambda data: data['tenants'])
+
+    def test_tenant_list_query_budget(self):
+        # one page of tenants, tenant groups, tenant permissions
+        self.assertBudget('/tenants/?page_size=1000', 3, lambda data: data['results'], page_size=1000)
+
+
+class TenantListTests(TestCase):
+    def setUp(self):
+        landlord = make_landlord()
+        self.tenants = [make_tenant(f'tenant-{number}', leased_property=make_property(landlord, f'Unit {number}')) for number in range(5)]
+        self.client = APIClient()
+
+    def test_cursor_pages_cover_every_tenant_once(self):
+        seen = []
+        url = '/tenants/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            seen += [tenant['id'] for tenant in page['results']]
+            url = page['next']
+
+        self.assertEqual(seen, [tenant.pk for tenant in self.tenants])
+
+    def test_stream_matches_serializer_output(self):
+        response = self.client.get('/tenants/', {'stream': 'true'})
+
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body, json.loads(json.dumps(TenantSerializer(self.tenants, many=True).data)))
+
+    def test_stream_of_empty_table(self):
+        Tenant.objects.all().delete()
+
+        response = self.client.get('/tenants/', {'stream': 'true'})
+
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+
+class ListEncoderTests(TestCase):
+    def test_encoders_match_model_serializers(self):
+        landlord = make_landlord()
+        properties = [make_property(landlord, f'Unit {number}', rent=f'{number}99.5') for number in range(3)]
+        Property.objects.filter(pk=properties[0].pk).update(lease_end_date=paid_on(2024, 6, 30))
+        tenants = [make_tenant(f'tenant-{number}', leased_property=property) for number, property in enumerate(properties)]
+        make_tenant('homeless')
+        tenants[0].groups.add(Group.objects.create(name='late payers'), Group.objects.create(name='pets'))
+        tenants[1].user_permissions.add(Permission.objects.first())
+
+        for encoder, serializer, queryset in [
+            (property_list_encoder, PropertySerializer, Property.objects.order_by('id')),
+            (tenant_list_encoder, TenantSerializer, Tenant.objects.order_by('id')),
+        ]:
+            with self.subTest(serializer=serializer.__name__):
+                expected = json.loads(json.dumps(serializer(queryset, many=True).data))
+                self.assertEqual(encoder.encode(queryset), expected)
+                self.assertEqual(encoder.encode(queryset.all()[:2]), expected[:2])
+                self.assertEqual(list(encoder.iter_encode(queryset, chunk_size=2)), expected)
+
+
+class OccupancyTests(TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.first = make_property(self.landlord, 'Unit 1')
+        self.second = make_property(self.landlord, 'Unit 2')
+
+    def occupied(self):
+        return dict(Property.objects.values_list('property_name', 'occupied'))
+
+    def test_flag_follows_tenant_leases(self):
+        tenant = make_tenant(leased_property=self.first)
+        self.assertEqual(self.occupied(), {'Unit 1': True, 'Unit 2': False})
+
+        tenant.leased_property = self.second
+        tenant.save()
+        self.assertEqual(self.occupied(), {'Unit 1': False, 'Unit 2': True})
+
+        tenant.delete()
+        self.assertEqual(self.occupied(), {'Unit 1': False, 'Unit 2': False})
+
+    def test_saving_a_stale_instance_keeps_the_flag(self):
+        # self.first was loaded before the tenant moved in, so it still holds occupied=False
+        make_tenant(leased_property=self.first)
+        self.first.rent_amount = Decimal('1200.00')
+        self.first.save()
+
+        self.assertEqual(self.occupied(), {'Unit 1': True, 'Unit 2': False})
+        self.assertTrue(self.first.occupied)
+
+        client = APIClient()
+        client.force_authenticate(user=self.landlord)
+        response = client.post('/register/tenant/', {
+            'property_id': self.first.pk, 'username': 'second', 'email': 'second@example.com',
+            'phone_number': '555-0100', 'city': 'Quebec', 'password': 'long-enough-secret',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_is_occupied_does_not_query(self):
+        make_tenant(leased_property=self.first)
+        property = Property.objects.get(pk=self.first.pk)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(property.is_occupied())
+
+    def test_bulk_availability_is_one_query(self):
+        make_tenant(leased_property=self.first)
+        closed = make_property(self.landlord, 'Closed')
+        Property.objects.filter(pk=closed.pk).update(status=False)
+        future = make_property(self.landlord, 'Future')
+        Property.objects.filter(pk=future.pk).update(lease_start_date=paid_on(2030, 1, 1))
+        foreign = make_property(make_landlord('other'), 'Foreign')
+        ids = [self.first.pk, self.second.pk, closed.pk, future.pk, foreign.pk]
+
+        with self.assertNumQueries(1):
+            self.assertEqual(available_property_ids(self.landlord, ids, paid_on(2024, 1, 1)), {self.second.pk})
+
+        client = APIClient()
+        client.force_authenticate(user=self.landlord)
+        response = client.get('/properties/availability/', {'ids': ','.join(map(str, ids)), 'date': '2031-01-01'})
+        self.assertEqual(response.json(), {'available': [self.second.pk, future.pk], 'unavailable': [self.first.pk, closed.pk, foreign.pk]})
+
+
+class OccupancySeriesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = make_landlord()
+        self.unit = Property.objects.create(
+            landlord=self.landlord, property_name='Unit 1', address='1 Main St', bedrooms=2, rent_amount=Decimal('1000.00'),
+            lease_start_date=paid_on(2023, 1, 1), lease_end_date=paid_on(2024, 1, 1),
+        )
+        self.other = make_property(self.landlord, 'Unit 2')
+        self.other.lease_start_date, self.other.lease_end_date = paid_on(2023, 7, 1), paid_on(2025, 1, 1)
+        self.other.save()
+        self.tenant = make_tenant(leased_property=self.unit)
+
+    def on(self, year, month, day):
+        row = LandlordDailyOccupancy.objects.get(landlord=self.landlord, day=datetime.date(year, month, day))
+        return row.properties, row.occupied
+
+    def series(self):
+        return list(LandlordDailyOccupancy.objects.order_by('landlord_id', 'day').values_list('landlord_id', 'day', 'properties', 'occupied'))
+
+    def test_series_follows_leases_and_tenants(self):
+        self.assertEqual(LandlordDailyOccupancy.objects.earliest('day').day, datetime.date(2023, 1, 1))
+        self.assertEqual([self.on(2023, 3, 1), self.on(2023, 8, 1), self.on(2024, 2, 1)], [(1, 1), (2, 1), (2, 0)])
+
+        self.tenant.leased_property = self.other
+        self.tenant.save()
+        self.assertEqual([self.on(2023, 3, 1), self.on(2023, 8, 1), self.on(2024, 2, 1)], [(1, 0), (2, 1), (2, 1)])
+
+    def test_incremental_updates_match_a_rebuild(self):
+        self.tenant.leased_property = self.other
+        self.tenant.save()
+        self.unit.status = False
+        self.unit.save()
+        # Earlier than the series starts, so the landlord's series is rebuilt
+        self.other.refresh_from_db()
+        self.other.lease_start_date = paid_on(2022, 6, 1)
+        self.other.save()
+        extra = make_property(self.landlord, 'Unit 3')
+        make_tenant('second', leased_property=extra)
+        extra.delete()
+
+        incremental = self.series()
+        rebuild_occupancy()
+
+        self.assertEqual(incremental, self.series())
+        self.assertEqual(self.on(2022, 6, 1), (1, 1))
+
+    def test_migration_backfill_matches_a_rebuild(self):
+        backfill_occupancy = import_module('rmsapp.migrations.0013_landlord_daily_occupancy').backfill_occupancy
+        rebuild_occupancy()
+        rebuilt = self.series()
+        LandlordDailyOccupancy.objects.all().delete()
+
+        backfill_occupancy(apps, None)
+
+        self.assertEqual(self.series(), rebuilt)
+
+    def test_days_left_without_properties_are_dropped_like_a_rebuild(self):
+        self.unit.delete()
+
+        incremental = self.series()
+        rebuild_occupancy()
+
+        self.assertEqual(incremental, self.series())
+        self.assertEqual(LandlordDailyOccupancy.objects.earliest('day').day, datetime.date(2023, 7, 1))
+
+    def test_endpoint_reports_vacancy_over_a_range(self):
+        client = APIClient()
+        client.force_authenticate(user=self.landlord)
+
+        data = client.get('/occupancy/', {'start': '2023-06-01', 'end': '2023-07-31'}).json()
+
+        self.assertEqual((data['property_days'], data['occupied_days'], data['vacant_days']), (30 + 62, 61, 31))
+        self.assertEqual([(month['month'], month['vacancy_rate']) for month in data['months']], [('2023-06', 0.0), ('2023-07', 0.5)])
+        self.assertEqual(client.get('/occupancy/', {'start': '2023-07-31', 'end': '2023-06-01'}).status_code, 400)
+
+
+class RentDueGenerationTests(TestCase):
+    def setUp(self):
+        landlord = make_landlord()
+        self.tenants = []
+        for number, (start, end) in enumerate([
+            (paid_on(2023, 1, 1), paid_on(2024, 1, 1)),
+            (paid_on(2023, 6, 1), paid_on(2025, 1, 1)),
+            (paid_on(2024, 3, 1), paid_on(2025, 1, 1)),
+        ]):
+            property = make_property(landlord, f'Unit {number}', rent=f'{number + 1}000.00')
+            Property.objects.filter(pk=property.pk).update(lease_start_date=start, lease_end_date=end)
+            self.tenants.append(make_tenant(f'tenant-{number}', leased_property=property))
+        make_tenant('no-lease')
+
+    def test_generates_one_row_per_active_lease(self):
+        stats = generate_rent_dues(datetime.date(2023, 7, 1), chunk_size=1)
+
+        self.assertEqual(stats['tenants'], 2)
+        self.assertEqual(
+            list(RentDue.objects.order_by('tenant_id').values_list('tenant_id', 'property_name', 'rent_amount', 'is_paid')),
+            [(self.tenants[0].pk, 'Unit 0', Decimal('1000.00'), False), (self.tenants[1].pk, 'Unit 1', Decimal('2000.00'), False)],
+        )
+
+    def test_rerun_and_resume_are_idempotent(self):
+        generate_rent_dues(datetime.date(2024, 6, 1), start_after=self.tenants[1].pk)
+        call_command('generate_rent_dues', due_date='2024-06-01', chunk_size=1, stdout=StringIO())
+        call_command('generate_rent_dues', due_date='2024-06-01', stdout=StringIO())
+
+        self.assertEqual(
+            sorted(RentDue.objects.values_list('tenant_id', flat=True)), [self.tenants[1].pk, self.tenants[2].pk]
+        )
+
+    def test_next_billing_date(self):
+        self.assertEqual(next_billing_date(datetime.date(2023, 12, 15)), datetime.date(2024, 1, 1))
+        self.assertEqual(next_billing_date(datetime.date(2024, 1, 31)), datetime.date(2024, 2, 1))
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        landlord = make_landlord()
+        self.property = make_property(landlord, rent='1000.00')
+        self.tenant = make_tenant(leased_property=self.property)
+        self.january = self.due(datetime.date(2023, 1, 1))
+        self.february = self.due(datetime.date(2023, 2, 1))
+
+    def due(self, due_date, property=None):
+        property = property or self.property
+        return RentDue.objects.create(tenant=self.tenant, property=property, property_name=property.property_name, due_date=due_date, rent_amount=property.rent_amount)
+
+    def pay(self, amount, payment_date, property=None):
+        return Payment.objects.create(tenant=self.tenant, property=property or self.property, amount=Decimal(amount), payment_date=payment_date)
+
+    def state(self, *objects):
+        for obj in objects:
+            obj.refresh_from_db()
+        return [(obj.amount_paid, obj.is_paid) if isinstance(obj, RentDue) else obj.applied_amount for obj in objects]
+
+    def test_overpayment_carries_over_to_the_next_due(self):
+        payment = self.pay('1500.00', datetime.date(2023, 1, 15))
+
+        summary = reconcile_month(2023, 1)
+        self.assertEqual(summary['unapplied_credit'], Decimal('500.00'))
+        self.assertEqual(self.state(self.january, self.february, payment), [(Decimal('1000.00'), True), (Decimal('0.00'), False), Decimal('1000.00')])
+
+        reconcile_month(2023, 2)
+        self.assertEqual(self.state(self.february, payment), [(Decimal('500.00'), False), Decimal('1500.00')])
+
+        later = self.pay('600.00', datetime.date(2023, 2, 20))
+        summary = reconcile_month(2023, 2)
+        self.assertEqual(self.state(self.february, later), [(Decimal('1000.00'), True), Decimal('500.00')])
+        self.assertEqual(summary['unapplied_credit'], Decimal('100.00'))
+
+    def test_underpayment_leaves_the_oldest_due_partially_paid(self):
+        self.pay('400.00', datetime.date(2023, 2, 3))
+        self.pay('250.50', datetime.date(2023, 2, 10))
+
+        summary = reconcile_month(2023, 2)
+
+        self.assertEqual(summary['dues_partially_paid'], 1)
+        self.assertEqual(summary['outstanding'], Decimal('1349.50'))
+        self.assertEqual(self.state(self.january, self.february), [(Decimal('650.50'), False), (Decimal('0.00'), False)])
+
+    def test_payments_only_match_their_own_property(self):
+        other = make_property(self.property.landlord, 'Unit 2', rent='700.00')
+        other_due = self.due(datetime.date(2023, 1, 5), property=other)
+        payment = self.pay('700.00', datetime.date(2023, 1, 6), property=other)
+
+        reconcile_month(2023, 1)
+
+        self.assertEqual(self.state(self.january, other_due, payment), [(Decimal('0.00'), False), (Decimal('700.00'), True), Decimal('700.00')])
+
+    def test_rerunning_a_month_changes_nothing(self):
+        self.pay('1200.00', datetime.date(2023, 1, 15))
+        reconcile_month(2023, 1)
+        before = self.state(self.january, self.february)
+
+        summary = reconcile_month(2023, 1)
+
+        self.assertEqual(summary['applied'], Decimal('0.00'))
+        self.assertEqual(self.state(self.january, self.february), before)
+
+    def test_benchmark_reconciles_seeded_rows_and_rolls_them_back(self):
+        output = StringIO()
+        call_command('bench_reconciliation', rows=[24], months=3, properties=4, stdout=output)
+
+        # The two dues of setUp are open too
+        dues, payments = output.getvalue().splitlines()[1].split()[:2]
+        self.assertEqual(int(dues), 24 + 2)
+        self.assertGreater(int(payments), 0)
+        self.assertEqual(RentDue.objects.count(), 2)
+        self.assertFalse(Tenant.objects.filter(username__startswith='bench-reconcile-').exists())
+
+    def test_allocate_is_oldest_first_within_each_key(self):
+        applied, taken = allocate(
+            np.array([1, 1, 2, 3]), np.array([100, 100, 50, 80]),
+            np.array([1, 1, 3]), np.array([30, 120, 200]),
+        )
+
+        self.assertEqual(applied.tolist(), [100, 50, 0, 80])
+        self.assertEqual(taken.tolist(), [30, 120, 80])
+
+    def test_ids_past_32_bits_do_not_share_a_key(self):
+        # Packing both ids into one int64 would give this pair the same key as (tenant, self.property)
+        far = Property.objects.create(
+            pk=2 ** 32 + self.property.pk, landlord=self.property.landlord, property_name='Far', address='9 Main St',
+            bedrooms=1, rent_amount=Decimal('1000.00'),
+        )
+        payment = self.pay('1000.00', datetime.date(2023, 1, 15), property=far)
+
+        summary = reconcile_month(2023, 1)
+        self.assertEqual(summary['applied'], Decimal('0.00'))
+        self.assertEqual(self.state(self.january, payment), [(Decimal('0.00'), False), Decimal('0.00')])
+
+
+class ArrearsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = make_landlord()
+        self.property = make_property(self.landlord, rent='1000.00')
+        self.tenant = make_tenant(leased_property=self.property)
+        self.today = datetime.date.today()
+        for days_ago in (100, 70, 40, 5):
+            RentDue.objects.create(
+                tenant=self.tenant, property=self.property, property_name=self.property.property_name,
+                due_date=self.today - datetime.timedelta(days=days_ago), rent_amount=Decimal('1000.00'),
+            )
+
+    def pay(self, amount):
+        return Payment.objects.create(tenant=self.tenant, property=self.property, amount=Decimal(amount), payment_date=self.today)
+
+    def buckets(self):
+        row = ArrearsSnapshot.objects.get(tenant=self.tenant)
+        return [row.days_0_30, row.days_31_60, row.days_61_90, row.days_over_90, row.total]
+
+    def test_unreconciled_payments_pay_the_oldest_dues_first(self):
+        self.pay('1500.00')
+
+        refresh_arrears()
+
+        self.assertEqual(self.buckets(), [Decimal('1000.00'), Decimal('1000.00'), Decimal('500.00'), Decimal('0.00'), Decimal('2500.00')])
+
+    def test_payments_refresh_the_tenant_snapshot(self):
+        refresh_arrears()
+        self.assertEqual(self.buckets()[-1], Decimal('4000.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pay('3000.00')
+        self.assertEqual(self.buckets(), [Decimal('1000.00'), Decimal('0.00'), Decimal('0.00'), Decimal('0.00'), Decimal('1000.00')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pay('1000.00')
+        self.assertFalse(ArrearsSnapshot.objects.exists())
+
+    def test_a_transaction_refreshes_each_tenant_once_after_commit(self):
+        second = make_tenant('second', leased_property=make_property(self.landlord, 'Unit 2'))
+        with mock.patch('rmsapp.arrears.refresh_arrears') as refresh, self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.pay('100.00')
+                self.pay('200.00')
+                Payment.objects.create(tenant=second, property=second.leased_property, amount=Decimal('300.00'), payment_date=self.today)
+                refresh.assert_not_called()
+        refresh.assert_called_once_with(tenant_ids=sorted([self.tenant.pk, second.pk]))
+
+    def test_migration_backfill_matches_a_refresh(self):
+        backfill_arrears = import_module('rmsapp.migrations.0012_arrears_snapshot').backfill_arrears
+        self.pay('1500.00')
+        make_tenant('second', leased_property=make_property(self.landlord, 'Unit 2'))
+        refresh_arrears()
+        refreshed = list(ArrearsSnapshot.objects.order_by('tenant_id', 'property_id').values_list('landlord_id', 'tenant_id', 'property_id', *BUCKETS, 'total'))
+        ArrearsSnapshot.objects.all().delete()
+
+        backfill_arrears(apps, None)
+
+        self.assertEqual(list(ArrearsSnapshot.objects.order_by('tenant_id', 'property_id').values_list('landlord_id', 'tenant_id', 'property_id', *BUCKETS, 'total')), refreshed)
+
+    def test_reconciling_does_not_change_the_report(self):
+        self.pay('1500.00')
+        refresh_arrears()
+        before = aging_report(self.landlord)
+
+        reconcile_month(self.today.year, self.today.month)
+        refresh_arrears()
+
+        self.assertEqual(aging_report(self.landlord), before)
+
+    def test_endpoint_reports_only_the_landlords_own_tenants(self):
+        other = make_landlord('other')
+        make_tenant('other-tenant', leased_property=make_property(other, 'Unit 9'))
+        client = APIClient()
+        client.force_authenticate(user=other)
+        self.assertEqual(client.get('/arrears/').json()['arrears'], [])
+
+        # The report only reads the snapshot, which the daily command builds
+        client.force_authenticate(user=self.landlord)
+        self.assertEqual(client.get('/arrears/').json(), {'as_of': None, 'totals': dict.fromkeys(BUCKETS + ('total',), '0.00'), 'arrears': []})
+        refresh_arrears(self.today - datetime.timedelta(days=1))
+        with self.assertNumQueries(2):
+            data = client.get('/arrears/').json()
+        self.assertEqual(data['as_of'], (self.today - datetime.timedelta(days=1)).isoformat())
+        self.assertEqual(Decimal(data['totals']['total']), Decimal('4000.00'))
+        self.assertEqual(Decimal(data['totals']['days_over_90']), Decimal('1000.00'))
+        self.assertEqual([(row['tenant'], row['property_name']) for row in data['arrears']], [('tenant', 'Unit 1')])
+
+
+@override_settings(RMS_INVITE_URL=INVITE_URL)
+class BulkTenantRegistrationTests(TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+
+    def item(self, number, property, **fields):
+        return {'email': f'new-{number}@example.com', 'first_name': f'New {number}', 'phone_number': '555-0100', 'city': 'Quebec', 'property_id': property.pk, **fields}
+
+    def test_valid_items_are_created_and_invalid_ones_reported(self):
+        free, other_free, spare = (make_property(self.landlord, name) for name in ('Free', 'Other free', 'Spare'))
+        closed = make_property(self.landlord, 'Closed')
+        Property.objects.filter(pk=closed.pk).update(status=False)
+        leased = make_property(self.landlord, 'Leased')
+        make_tenant('existing', leased_property=leased)
+        foreign = make_property(make_landlord('other'), 'Foreign')
+
+        response = self.client.post('/register/tenants/', {'tenants': [
+            self.item(0, free, password='s3cret-pass'),
+            self.item(1, other_free),
+            self.item(2, free),
+            self.item(3, closed),
+            self.item(4, leased),
+            self.item(5, foreign),
+            self.item(6, other_free, phone_number=''),
+            {**self.item(7, spare), 'username': 'existing'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['created'], data['errors']), (2, 6))
+        self.assertEqual([result['status'] for result in data['results']], ['created', 'created'] + ['error'] * 6)
+        self.assertEqual(
+            [list(result['errors']) for result in data['results'][2:]],
+            [['property_id'], ['property_id'], ['property_id'], ['property_id'], ['phone_number'], ['username']],
+        )
+
+        first, second = Tenant.objects.get(username='new-0@example.com'), Tenant.objects.get(username='new-1@example.com')
+        self.assertEqual((first.leased_property, second.leased_property), (free, other_free))
+        self.assertTrue(first.check_password('s3cret-pass'))
+        self.assertFalse(second.has_usable_password())
+        self.assertTrue(Property.objects.get(pk=free.pk).occupied)
+        self.assertEqual(sorted(email.recipients[0] for email in OutboxEmail.objects.all()), ['new-0@example.com', 'new-1@example.com'])
+
+    def test_properties_and_usernames_taken_meanwhile_are_reported_per_item(self):
+        first, second, third = (make_property(self.landlord, name) for name in ('First', 'Second', 'Third'))
+
+        def hash_during_a_concurrent_registration(passwords):
+            Property.objects.filter(pk=first.pk).update(occupied=True)
+            make_tenant('late')
+            return hash_passwords(passwords)
+
+        with mock.patch('rmsapp.registration.hash_passwords', hash_during_a_concurrent_registration):
+            response = self.client.post('/register/tenants/', {'tenants': [
+                self.item(0, first), self.item(1, second, username='late'), self.item(2, third),
+            ]}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['error', 'error', 'created'])
+        self.assertEqual([list(result.get('errors', {})) for result in results], [['property_id'], ['username'], []])
+        self.assertEqual(Tenant.objects.filter(leased_property__in=[first, second, third]).count(), 1)
+        self.assertFalse(Property.objects.get(pk=second.pk).occupied)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_items_get_the_single_registration_username_and_password_checks(self):
+        free, spare = make_property(self.landlord, 'Free'), make_property(self.landlord, 'Spare')
+        response = self.client.post('/register/tenants/', {'tenants': [
+            self.item(0, free, password='1'),
+            {**self.item(1, free), 'email': f"{'a' * 150}@example.com"},
+            self.item(2, spare, password='long-enough-secret'),
+        ]}, format='json')
+
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['error', 'error', 'created'])
+        self.assertEqual([list(result['errors']) for result in results[:2]], [['password'], ['username']])
+        self.assertEqual(list(Tenant.objects.values_list('username', flat=True)), ['new-2@example.com'])
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        leased = 0
+        for count in (2, 50):
+            with self.subTest(tenants=count):
+                # Two distinct leases, so the occupancy series takes two UPDATEs whatever the batch size
+                properties = Property.objects.bulk_create([
+                    Property(
+                        landlord=self.landlord, property_name=f'Unit {count}-{number}', address='1 Main St', bedrooms=1, rent_amount=Decimal('900.00'),
+                        lease_start_date=today - datetime.timedelta(days=30), lease_end_date=today + datetime.timedelta(days=30 + number % 2),
+                    )
+                    for number in range(count)
+                ])
+                rebuild_occupancy(landlord_ids=[self.landlord.pk])
+                # Properties and usernames, then locking the properties, insert, occupied flags, the series' first day
+                # and its two UPDATEs, ids and outbox; savepoints counted
+                with self.assertNumQueries(14):
+                    response = self.client.post('/register/tenants/', {'tenants': [
+                        self.item(f'{count}-{number}', property) for number, property in enumerate(properties)
+                    ]}, format='json')
+                self.assertEqual(response.json()['created'], count)
+                leased += count
+                self.assertEqual(LandlordDailyOccupancy.objects.get(landlord=self.landlord, day=today.date()).occupied, leased)
+
+    def test_keys_missing_after_bulk_create_are_read_back(self):
+        tenants = Tenant.objects.bulk_create([Tenant(username=f'bulk-{number}', email=f'bulk-{number}@example.com', phone_number='555-0100') for number in range(3)])
+        expected = [tenant.pk for tenant in Tenant.objects.order_by('username')]
+        # As on MySQL, where bulk_create does not set them
+        for tenant in tenants:
+            tenant.pk = None
+
+        with self.assertNumQueries(1):
+            set_created_keys(tenants)
+        self.assertEqual([tenant.pk for tenant in tenants], expected)
+        with self.assertNumQueries(0):
+            set_created_keys(tenants)
+
+    def test_batch_size_is_limited(self):
+        self.assertEqual(self.client.post('/register/tenants/', {'tenants': []}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/register/tenants/', [], format='json').status_code, 400)
+
+
+class PasswordHashingTests(SimpleTestCase):
+    def test_missing_passwords_are_unusable(self):
+        hashed = hash_passwords(['first', None, 'second'])
+        self.assertTrue(check_password('first', hashed[0]))
+        self.assertFalse(is_password_usable(hashed[1]))
+        self.assertTrue(check_password('second', hashed[2]))
+
+    @override_settings(RMS_PASSWORD_HASH_MIN_BATCH=2)
+    def test_process_pool_gives_the_same_hashes(self):
+        passwords = [f'password-{number}' for number in range(4)]
+        hashed = hash_passwords(passwords, workers=2)
+        self.assertEqual(len(set(hashed)), 4)
+        self.assertTrue(all(check_password(password, encoded) for password, encoded in zip(passwords, hashed)))
+
+
+@override_settings(RMS_INVITE_URL=INVITE_URL)
+class InvitationTests(TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.client = APIClient()
+
+    def invitation(self, email):
+        message = OutboxEmail.objects.get(subject=INVITE_SUBJECT, recipients=[email]).message
+        return re.search(r'/invite/(?P<uid>[^/]+)/(?P<token>[^/]+)/', message).groupdict()
+
+    def test_tenants_registered_without_a_password_choose_it_once(self):
+        self.client.force_authenticate(user=self.landlord)
+        response = self.client.post('/register/tenants/', {'tenants': [
+            {'email': 'ann@example.com', 'phone_number': '555-0100', 'city': 'Quebec', 'property_id': make_property(self.landlord).pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.client.force_authenticate(user=None)
+
+        invitation = self.invitation('ann@example.com')
+        weak = self.client.post('/invite/accept/', {**invitation, 'password': '123'}, format='json')
+        self.assertEqual(weak.status_code, 400)
+        accepted = self.client.post('/invite/accept/', {**invitation, 'password': 'long-enough-secret'}, format='json')
+        self.assertEqual(accepted.status_code, 200)
+        self.assertTrue(Tenant.objects.get(email='ann@example.com').check_password('long-enough-secret'))
+
+        reused = self.client.post('/invite/accept/', {**invitation, 'password': 'another-long-secret'}, format='json')
+        self.assertEqual(reused.status_code, 400)
+        forged = self.client.post('/invite/accept/', {'uid': invitation['uid'], 'token': 'abc-123', 'password': 'long-enough-secret'}, format='json')
+        self.assertEqual(forged.status_code, 400)
+
+    def test_inviting_without_an_absolute_invite_url_fails_before_writing(self):
+        property = make_property(self.landlord)
+        for url in (None, '/invite/{uid}/{token}/'):
+            with self.subTest(url=url), self.settings(RMS_INVITE_URL=url):
+                with self.assertRaises(ImproperlyConfigured):
+                    register_tenants(self.landlord, [{'email': 'ann@example.com', 'phone_number': '555-0100', 'city': 'Quebec', 'property_id': property.pk}])
+                with self.assertRaises(ImproperlyConfigured):
+                    import_file('tenants', StringIO('email,phone_number\n'), 'csv', self.landlord, invite=True)
+        self.assertFalse(Tenant.objects.exists())
+
+    @override_settings(RMS_INVITE_URL=None)
+    def test_views_report_unconfigured_invitations(self):
+        self.client.force_authenticate(user=self.landlord)
+        property = make_property(self.landlord)
+        registered = self.client.post('/register/tenants/', {'tenants': [
+            {'email': 'ann@example.com', 'phone_number': '555-0100', 'city': 'Quebec', 'property_id': property.pk},
+        ]}, format='json')
+        upload = SimpleUploadedFile('tenants.csv', b'email,phone_number,city\nann@example.com,555-0100,Quebec\n')
+        imported = self.client.post('/import/', {'kind': 'tenants', 'file': upload, 'invite': 'true'})
+
+        for response in (registered, imported):
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('RMS_INVITE_URL', response.json()['error'])
+        self.assertFalse(Tenant.objects.exists())
+
+    def test_imported_tenants_are_invited_on_request(self):
+        make_property(self.landlord)
+        report = import_file('tenants', StringIO(
+            'email,phone_number,city,property_name\n'
+            'ann@example.com,555-0100,Quebec,Unit 1\n'
+            'bob@example.com,555-0101,Quebec,\n'
+        ), 'csv', self.landlord, invite=True)
+        self.assertEqual(report.created, 2)
+
+        bob = Tenant.objects.get(email='bob@example.com')
+        self.assertFalse(bob.has_usable_password())
+        response = self.client.post('/invite/accept/', {**self.invitation('bob@example.com'), 'password': 'long-enough-secret'}, format='json')
+        self.assertEqual(response.json()['username'], 'bob@example.com')
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+
+    def import_csv(self, kind, text, batch_size=2):
+        return import_file(kind, StringIO(text), 'csv', self.landlord, batch_size=batch_size)
+
+    def test_full_onboarding_with_per_row_errors(self):
+        properties = self.import_csv('properties', (
+            'property_name,address,bedrooms,rent_amount,lease_start_date,lease_end_date\n'
+            'Unit 1,1 Main St,2,1000.00,2023-01-01T00:00:00Z,2024-01-01T00:00:00Z\n'
+            'Unit 2,2 Main St,two,900.00,,\n'
+            'Unit 3,3 Main St,1,850.00,,\n'
+        ))
+        self.assertEqual((properties.rows, properties.created, properties.error_count), (3, 2, 1))
+        self.assertEqual(properties.errors[0]['line'], 3)
+
+        tenants = self.import_csv('tenants', (
+            'email,phone_number,city,property_name\n'
+            'ann@example.com,555-0100,Quebec,Unit 1\n'
+            'bob@example.com,555-0101,Quebec,Unit 1\n'
+            'cy@example.com,555-0102,Quebec,Unit 9\n'
+            'dee@example.com,555-0103,Quebec,\n'
+        ))
+        self.assertEqual((tenants.created, [error['line'] for error in tenants.errors]), (2, [3, 4]))
+        ann = Tenant.objects.get(email='ann@example.com')
+        self.assertFalse(ann.has_usable_password())
+        self.assertTrue(ann.leased_property.occupied)
+
+        revenue = self.import_csv('revenue', (
+            'tenant_email,property_name,amount,payment_date\n'
+            'ann@example.com,Unit 1,1000.00,2023-01-03\n'
+            'ann@example.com,Unit 1,1000.00,2023-02-03\n'
+            'ann@example.com,Unit 1,lots,2023-03-03\n'
+            'nobody@example.com,Unit 1,1000.00,2023-03-03\n'
+        ))
+        self.assertEqual((revenue.created, revenue.error_count), (2, 2))
+        self.assertEqual(self.landlord.total_earnings_for_year(2023), Decimal('2000.00'))
+        self.assertEqual(len(mail.outbox) + OutboxEmail.objects.count(), 0)
+
+    def test_usernames_are_validated(self):
+        tenants = self.import_csv('tenants', (
+            'username,email,phone_number\n'
+            f"{'a' * 151},ann@example.com,555-0100\n"
+            'bad name!!,bob@example.com,555-0101\n'
+            f",{'c' * 150}@example.com,555-0102\n"
+            ',dee@example.com,555-0103\n'
+        ))
+        self.assertEqual((tenants.created, [error['line'] for error in tenants.errors]), (1, [2, 3, 4]))
+        self.assertEqual(list(Tenant.objects.values_list('username', flat=True)), ['dee@example.com'])
+
+    def test_rows_the_database_rejects_fail_alone(self):
+        prepare = TenantImporter.prepare
+
+        def prepare_during_a_concurrent_registration(importer, batch):
+            prepare(importer, batch)
+            make_tenant('late@example.com')
+
+        with mock.patch.object(TenantImporter, 'prepare', prepare_during_a_concurrent_registration):
+            tenants = self.import_csv('tenants', (
+                'email,phone_number\n'
+                'ann@example.com,555-0100\n'
+                'late@example.com,555-0101\n'
+                'bob@example.com,555-0102\n'
+            ), batch_size=3)
+        self.assertEqual((tenants.created, [error['line'] for error in tenants.errors]), (2, [3]))
+        self.assertEqual(Tenant.objects.filter(email__in=['ann@example.com', 'bob@example.com']).count(), 2)
+
+    def test_imports_move_only_the_new_leases_in_the_occupancy_series(self):
+        start, end = datetime.date.today() - datetime.timedelta(days=10), datetime.date.today() + datetime.timedelta(days=10)
+        self.import_csv('properties', 'property_name,address,bedrooms,rent_amount,lease_start_date,lease_end_date\n' + ''.join(
+            f'Unit {number},1 Main St,1,900.00,{start}T00:00:00Z,{end}T00:00:00Z\n' for number in range(4)
+        ))
+        self.import_csv('tenants', 'email,phone_number,city,property_name\nann@example.com,555-0100,Quebec,Unit 1\nbob@example.com,555-0101,Quebec,Unit 2\n')
+
+        series = list(LandlordDailyOccupancy.objects.filter(landlord=self.landlord).order_by('day').values_list('day', 'properties', 'occupied'))
+        self.assertIn((datetime.date.today(), 4, 2), series)
+        rebuild_occupancy(landlord_ids=[self.landlord.pk])
+        self.assertEqual(list(LandlordDailyOccupancy.objects.filter(landlord=self.landlord).order_by('day').values_list('day', 'properties', 'occupied')), series)
+
+    def test_revenue_only_matches_the_landlords_own_tenants(self):
+        unit = make_property(self.landlord)
+        other_landlord = make_landlord('other')
+        Tenant.objects.create(username='outsider', email='shared@example.com', phone_number='555-0100', city='Quebec', leased_property=make_property(other_landlord))
+        Tenant.objects.create(username='twin-1', email='twin@example.com', phone_number='555-0100', city='Quebec', leased_property=unit)
+        Tenant.objects.create(username='twin-2', email='twin@example.com', phone_number='555-0100', city='Quebec', leased_property=make_property(self.landlord, 'Unit 2'))
+
+        revenue = self.import_csv('revenue', (
+            'tenant_email,property_name,amount,payment_date\n'
+            'shared@example.com,Unit 1,1000.00,2023-01-03\n'
+            'twin@example.com,Unit 1,1000.00,2023-01-03\n'
+        ))
+        self.assertEqual(revenue.created, 0)
+        self.assertEqual([error['error'] for error in revenue.errors], [
+            'Unknown tenant: shared@example.com', 'More than one of your tenants has the email twin@example.com',
+        ])
+
+    def test_a_property_name_shared_by_two_properties_is_reported(self):
+        make_property(self.landlord, 'Twin')
+        make_property(self.landlord, 'Twin')
+        make_property(self.landlord, 'Unit 1')
+        Tenant.objects.create(username='payer', email='payer@example.com', phone_number='555-0100', city='Quebec', leased_property=make_property(self.landlord, 'Unit 2'))
+
+        tenants = self.import_csv('tenants', (
+            'email,phone_number,property_name\n'
+            'ann@example.com,555-0100,Twin\n'
+            'bob@example.com,555-0100,Unit 1\n'
+        ))
+        revenue = self.import_csv('revenue', (
+            'tenant_email,property_name,amount,payment_date\n'
+            'payer@example.com,Twin,1000.00,2023-01-03\n'
+        ))
+
+        self.assertEqual(tenants.created, 1)
+        self.assertEqual([error['error'] for error in tenants.errors + revenue.errors], ['More than one of your properties is named Twin'] * 2)
+        self.assertEqual(list(Property.objects.filter(property_name='Twin').values_list('occupied', flat=True)), [False, False])
+        self.assertFalse(Revenue.objects.exists())
+
+    def test_upload_jsonl_through_the_api(self):
+        client = APIClient()
+        client.force_authenticate(user=self.landlord)
+        upload = SimpleUploadedFile('properties.jsonl', (
+            b'{"property_name": "Unit 1", "address": "1 Main St", "bedrooms": 2, "rent_amount": "1000.00"}\n'
+            b'not json\n'
+            b'[1]\n'
+            b'"x"\n'
+        ))
+
+        response = client.post('/import/', {'kind': 'properties', 'file': upload})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['created'], response.json()['errors']), (1, 3))
+        self.assertEqual([error['line'] for error in response.json()['error_details']], [2, 3, 4])
+        self.assertEqual(Property.objects.get().landlord, self.landlord)
+
+
+class LedgerExportTests(TestCase):
+    def setUp(self):
+        self.landlord = make_landlord()
+        property = make_property(self.landlord)
+        tenant = make_tenant(leased_property=property)
+        for day in (1, 15, 28):
+            Revenue.objects.create(landlord=self.landlord, property=property, tenant=tenant, amount=Decimal('100.00'), payment_date=paid_on(2023, 2, day))
+            Payment.objects.create(tenant=tenant, property=property, amount=Decimal('100.00'), payment_date=datetime.date(2023, 2, day))
+        other = make_landlord('other')
+        Revenue.objects.create(landlord=other, property=make_property(other), tenant=tenant, amount=Decimal('5.00'), payment_date=paid_on(2023, 2, 2))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+
+    def test_csv_export_streams_the_date_range(self):
+        response = self.client.get('/export/revenue/', {'start': '2023-02-01', 'end': '2023-02-15'})
+
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['id', 'payment_date', 'property', 'tenant_email', 'amount'])
+        self.assertEqual([row[-1] for row in rows[1:]], ['100.00', '100.00'])
+
+    def test_parquet_export(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+
+        response = self.client.get('/export/payments/', {'export': 'parquet'})
+
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column('amount').to_pylist(), [Decimal('100.00')] * 3)
+
+    def test_rows_are_read_in_keyset_chunks(self):
+        Payment.objects.create(tenant=Tenant.objects.get(), property=Property.objects.filter(landlord=self.landlord).get(), amount=Decimal('50.00'), payment_date=datetime.date(2023, 2, 15))
+        expected = list(Payment.objects.order_by('payment_date', 'id').values_list('id', flat=True))
+
+        # Two full chunks, the second straddling 2023-02-15, then an empty one
+        with self.assertNumQueries(3):
+            columns, types, rows = ledger_rows('payments', self.landlord, chunk_size=2)
+            rows = list(rows)
+
+        self.assertEqual([row[0] for row in rows], expected)
+
+    def test_parquet_export_of_empty_range_is_readable(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+
+        columns, types, rows = ledger_rows('revenue', self.landlord, datetime.date(2020, 1, 1), datetime.date(2020, 1, 31))
+
+        self.assertEqual(pq.read_table(io.BytesIO(b''.join(iter_parquet(columns, types, rows)))).num_rows, 0)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = make_landlord()
+        self.property = make_property(self.landlord)
+        self.tenant = make_tenant(leased_property=self.property)
+        Revenue.objects.create(landlord=self.landlord, property=self.property, tenant=self.tenant, amount=Decimal('100.00'), payment_date=paid_on(2023, 5))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get('/earnings/2023/5/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/earnings/2023/5/')
+
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.client.get('/dashboard/cache-stats/').json()['total_earnings_for_month'], {'hit': 1, 'miss': 1, 'not_modified': 0})
+
+    def test_revenue_change_invalidates(self):
+        self.assertEqual(Decimal(self.client.get('/earnings/2023/5/').json()['total_earnings']), Decimal('100.00'))
+        Revenue.objects.create(landlord=self.landlord, property=self.property, tenant=self.tenant, amount=Decimal('50.00'), payment_date=paid_on(2023, 5, 2))
+
+        self.assertEqual(Decimal(self.client.get('/earnings/2023/5/').json()['total_earnings']), Decimal('150.00'))
+
+    def test_first_miss_after_a_write_does_not_cache_a_lagging_replica(self):
+        real_total = Landlord.total_earnings_for_month
+
+        def replica_total(landlord, year, month):
+            # The replica has not applied the latest payment yet
+            if ReadReplicaRouter().db_for_read(Revenue) == 'replica':
+                return Decimal('100.00')
+            return real_total(landlord, year, month)
+
+        with mock.patch('rmsapp.routers.replica_alias', return_value='replica'), \
+                mock.patch.object(Landlord, 'total_earnings_for_month', replica_total):
+            self.client.get('/earnings/2023/5/')
+            Revenue.objects.create(landlord=self.landlord, property=self.property, tenant=self.tenant, amount=Decimal('50.00'), payment_date=paid_on(2023, 5, 2))
+            self.assertEqual(Decimal(self.client.get('/earnings/2023/5/').json()['total_earnings']), Decimal('150.00'))
+            self.assertEqual(Decimal(self.client.get('/earnings/2023/5/').json()['total_earnings']), Decimal('150.00'))
+
+            # Long after the last write, misses are served by the replica again
+            cache.clear()
+            with self.settings(RMS_REPLICA_MAX_LAG=-1):
+                self.assertEqual(Decimal(self.client.get('/earnings/2023/5/').json()['total_earnings']), Decimal('100.00'))
+
+    def test_responses_cached_before_the_commit_are_dropped_at_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Revenue.objects.create(landlord=self.landlord, property=self.property, tenant=self.tenant, amount=Decimal('50.00'), payment_date=paid_on(2023, 5, 2))
+            during = self.client.get('/earnings/2023/5/')
+        after = self.client.get('/earnings/2023/5/')
+
+        self.assertNotEqual(after['ETag'], during['ETag'])
+        self.assertEqual(self.client.get('/dashboard/cache-stats/').json()['total_earnings_for_month']['miss'], 2)
+
+    def test_group_and_permission_changes_invalidate_dashboard(self):
+        before = self.client.get('/dashboard/')['ETag']
+        self.tenant.groups.add(Group.objects.create(name='Late payers'))
+        after_group = self.client.get('/dashboard/')['ETag']
+        self.tenant.user_permissions.add(Permission.objects.first())
+
+        self.assertNotEqual(after_group, before)
+        self.assertNotEqual(self.client.get('/dashboard/')['ETag'], after_group)
+
+    def test_tenant_and_property_changes_invalidate_dashboard(self):
+        self.assertEqual(len(self.client.get('/dashboard/').json()['tenants']), 1)
+        self.tenant.delete()
+        self.assertEqual(len(self.client.get('/dashboard/').json()['tenants']), 0)
+
+        make_property(self.landlord, 'Unit 2')
+        self.assertEqual(len(self.client.get('/dashboard/').json()['properties']), 2)
+
+    def test_conditional_requests_get_not_modified(self):
+        response = self.client.get('/graphs/yearly/2023/')
+
+        with self.assertNumQueries(0):
+            by_etag = self.client.get('/graphs/yearly/2023/', HTTP_IF_NONE_MATCH=response['ETag'])
+            by_date = self.client.get('/graphs/yearly/2023/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(by_etag.status_code, 304)
+        self.assertEqual(by_date.status_code, 304)
+
+        make_property(self.landlord, 'Unit 2')
+        self.assertEqual(self.client.get('/graphs/yearly/2023/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_entries_are_per_landlord(self):
+        other = make_landlord('other')
+        self.client.get('/earnings/2023/')
+        self.client.force_authenticate(user=other)
+
+        self.assertEqual(self.client.get('/earnings/2023/').json()['total_earnings'], 0)
+
+
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+        self.landlord = make_landlord()
+        make_property(self.landlord)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/dashboard/')
+
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="4 queries"$')
+
+    def test_report_percentiles_per_view(self):
+        for _ in range(3):
+            self.client.get('/earnings/2023/')
+        staff = make_landlord('staff')
+        staff.is_staff = True
+        staff.save()
+        self.client.force_authenticate(user=staff)
+
+        report = self.client.get('/metrics/').json()['check total income for year']
+
+        self.assertEqual(report['requests'], 3)
+        self.assertEqual(set(report['wall_ms']), {'p50', 'p95', 'p99'})
+        self.assertEqual(report['bytes']['p99'], len(b'{"total_earnings": 0}'))
+        self.assertEqual(report['queries']['p50'], 0)
+
+    def test_report_needs_staff(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+
+    def test_disabled_middleware_is_not_used(self):
+        with self.settings(RMS_PERFORMANCE_METRICS=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                PerformanceMiddleware(lambda request: None)
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, p) for p in (50, 95, 99)], [50, 95, 99])
+        self.assertEqual(percentile([7], 99), 7)
+
+
+class EndpointBenchmarkTests(TestCase):
+    def test_summary_and_baseline_comparison(self):
+        summary = latency_summary([0.01] * 99 + [0.5])
+        self.assertEqual((summary['requests'], summary['p50_ms'], summary['p99_ms'], summary['max_ms']), (100, 10.0, 10.0, 500.0))
+
+        baseline = {'dashboard': {'p95_ms': 10.0, 'requests_per_second': 100.0}}
+        self.assertEqual(compare_with_baseline({'dashboard': {'p95_ms': 11.0, 'requests_per_second': 90.0}}, baseline), [])
+        self.assertEqual(len(compare_with_baseline({'dashboard': {'p95_ms': 20.0, 'requests_per_second': 50.0}}, baseline)), 2)
+
+    def test_command_writes_a_baseline(self):
+        options = dict(landlords=1, properties=3, tenants=2, years=1, requests=3, warmup=0, only=['dashboard', 'earnings_year'], stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            call_command('bench_endpoints', output=path, **options)
+            call_command('bench_endpoints', baseline=path, tolerance=100, fail_on_regression=True, **options)
+
+            with open(path) as baseline:
+                scenarios = json.load(baseline)['scenarios']
+        self.assertEqual(set(scenarios), {'dashboard', 'earnings_year'})
+        self.assertEqual(scenarios['dashboard']['errors'], 0)
+        self.assertFalse(Landlord.objects.exists())
+
+    def test_registration_scenarios_run_without_errors(self):
+        output = StringIO()
+        call_command(
+            'bench_endpoints', landlords=1, properties=6, tenants=2, years=1, requests=3, warmup=1,
+            only=['register_landlord', 'register_tenant'], stdout=output,
+        )
+        self.assertIn('register_tenant', output.getvalue())
+        self.assertFalse(Landlord.objects.exists())
+
+        with self.assertRaisesMessage(CommandError, 'register_tenant needs 4 vacant properties'):
+            call_command('bench_endpoints', landlords=1, properties=3, tenants=2, years=1, requests=3, warmup=1, only=['register_tenant'], stdout=StringIO())
+
+    def test_failed_requests_fail_the_run(self):
+        scenarios = {'missing': ('get', lambda number: ('/no-such-page/', None))}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            with mock.patch.object(BenchEndpointsCommand, 'scenarios', return_value=scenarios):
+                with self.assertRaisesMessage(CommandError, 'missing (3)'):
+                    call_command('bench_endpoints', output=path, landlords=1, properties=3, tenants=2, years=1, requests=3, warmup=0, stdout=StringIO())
+            self.assertFalse(os.path.exists(path))
+
+
+class SeedingTests(TestCase):
+    def seed(self, prefix, seed=7):
+        return Seeder(landlords=3, properties=4, tenants=3, months=5, seed=seed, prefix=prefix, chunk_size=8, batch_size=10).run()
+
+    def amounts(self, prefix):
+        return list(Revenue.objects.filter(tenant__username__startswith=f'{prefix}-').order_by('pk').values_list('amount', 'payment_date__day'))
+
+    def test_row_counts_and_denormalized_state(self):
+        stats = self.seed('a')
+
+        self.assertEqual((stats['landlords'], stats['properties'], stats['tenants'], stats['rent_dues']), (3, 12, 9, 45))
+        self.assertEqual(Property.objects.filter(occupied=True).count(), 9)
+        self.assertEqual(set(Property.objects.filter(occupied=True).values_list('pk', flat=True)), set(Tenant.objects.values_list('leased_property_id', flat=True)))
+        self.assertEqual(Revenue.objects.count(), Payment.objects.count())
+        for landlord in Landlord.objects.all():
+            expected = Revenue.objects.filter(landlord=landlord).aggregate(total=models.Sum('amount'))['total']
+            self.assertEqual(LandlordMonthlyRevenue.objects.filter(landlord=landlord).aggregate(total=models.Sum('total'))['total'], expected)
+
+        # The arrears snapshot is already what the daily refresh would write
+        snapshot = list(ArrearsSnapshot.objects.order_by('tenant_id').values_list('tenant_id', 'total'))
+        refresh_arrears()
+        self.assertEqual(list(ArrearsSnapshot.objects.order_by('tenant_id').values_list('tenant_id', 'total')), snapshot)
+
+    def test_generation_is_deterministic(self):
+        self.seed('a')
+        self.seed('b')
+        self.seed('c', seed=8)
+
+        self.assertEqual(self.amounts('a'), self.amounts('b'))
+        self.assertNotEqual(self.amounts('a'), self.amounts('c'))
+
+    def test_users_share_one_precomputed_password_hash(self):
+        self.seed('a')
+
+        self.assertEqual(Tenant.objects.values('password').distinct().count(), 1)
+        self.assertTrue(Tenant.objects.first().check_password('password'))
+        self.assertTrue(Landlord.objects.first().check_password('password'))
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = make_landlord()
+        self.property = make_property(self.landlord)
+        tenant = make_tenant(leased_property=self.property)
+        tenant.groups.add(Group.objects.create(name='tenants'))
+        for month in (1, 2, 2):
+            Revenue.objects.create(landlord=self.landlord, property=self.property, tenant=tenant, amount=Decimal('100.00'), payment_date=paid_on(2023, month))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+
+    def test_async_views_match_sync_views(self):
+        for path in ['dashboard/', 'earnings/2023/', 'earnings/2023/2/', 'earnings/series/?start=2023-01&end=2023-03&by_property=true',
+                     'graphs/monthly/2023/2/', 'graphs/yearly/2023/']:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(f'/async/{path}').json(), self.client.get(f'/{path}').json())
+
+    def test_async_views_need_authentication(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get('/async/dashboard/').status_code, 403)
+
+    def test_async_views_reject_bad_credentials_like_sync_views(self):
+        self.client.force_authenticate(user=None)
+        credentials = 'Basic ' + base64.b64encode(b'nobody:wrong-password').decode()
+        for path in ['dashboard/', 'earnings/2023/']:
+            with self.subTest(path=path):
+                expected = self.client.get(f'/{path}', HTTP_AUTHORIZATION=credentials)
+                response = self.client.get(f'/async/{path}', HTTP_AUTHORIZATION=credentials)
+                self.assertEqual((response.status_code, response.json()), (expected.status_code, expected.json()))
+                self.assertIn(response.status_code, (401, 403))
+
+    def test_async_views_validate_and_cache(self):
+        self.assertEqual(self.client.get('/async/earnings/series/', {'start': '2023-05', 'end': '2023-01'}).status_code, 400)
+        self.assertEqual(self.client.post('/async/dashboard/').status_code, 405)
+
+        first = self.client.get('/async/earnings/2023/')
+        self.assertEqual(self.client.get('/async/earnings/2023/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    async def test_served_through_the_asgi_handler(self):
+        client = ForceAuthAsyncClient()
+        client.force_authenticate(self.landlord)
+
+        response = await client.get('/async/earnings/2023/2/')
+
+        self.assertEqual(Decimal(response.json()['total_earnings']), Decimal('200.00'))
+        self.assertTrue(response['Server-Timing'].startswith('app;dur='))
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.databases_settings = {'default': {
+            'ENGINE': 'myproject.backends.sqlite3', 'NAME': os.path.join(directory.name, 'pool.sqlite3'),
+            'CONN_HEALTH_CHECKS': True, 'POOL': {'SIZE': 1, 'MAX_OVERFLOW': 1, 'TIMEOUT': 0.1},
+        }}
+
+    def wrapper(self):
+        wrapper = ConnectionHandler(self.databases_settings)['default']
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_closed_connections_are_reused(self):
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        self.assertEqual(wrapper.pool.stats(), {'size': 1, 'idle': 1, 'in_use': 0})
+
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw)
+        self.assertEqual(wrapper.pool.stats(), {'size': 1, 'idle': 0, 'in_use': 1})
+
+    def test_unhealthy_connections_are_replaced(self):
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        raw.close()
+
+        wrapper.ensure_connection()
+        self.assertIsNot(wrapper.connection, raw)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def test_pool_size_plus_overflow_bounds_open_connections(self):
+        first, second, third = self.wrapper(), self.wrapper(), self.wrapper()
+        first.ensure_connection()
+        second.ensure_connection()
+
+        with self.assertRaises(TimeoutError):
+            third.ensure_connection()
+        first.close()
+        third.ensure_connection()
+        self.assertEqual(third.pool.stats()['in_use'], 2)
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    def test_reads_go_to_the_replica_only_inside_read_only_views(self):
+        router = ReadReplicaRouter()
+        with warnings.catch_warnings(), self.settings(DATABASES={'default': {}, 'replica': {}}):
+            warnings.simplefilter('ignore')  # Overriding DATABASES warns; only the router reads it here
+            self.assertIsNone(router.db_for_read(Property))
+            with replica_reads():
+                self.assertEqual(router.db_for_read(Property), 'replica')
+                self.assertEqual(router.db_for_write(Property), 'default')
+            self.assertFalse(router.allow_migrate('replica', 'rmsapp'))
+
+    def test_without_a_replica_everything_uses_default(self):
+        router = ReadReplicaRouter()
+        with replica_reads():
+            self.assertIsNone(router.db_for_read(Property))
+            self.assertIsNone(router.db_for_write(Property))
+
+
+class ForecastTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = make_landlord()
+        self.leases = []
+        for name, rent, start, end in [
+            ('Unit 1', '1000.00', paid_on(2023, 1, 15), paid_on(2023, 6, 1)),
+            ('Unit 2', '500.00', paid_on(2023, 3, 1), paid_on(2024, 1, 1)),
+        ]:
+            property = make_property(self.landlord, name, rent=rent)
+            Property.objects.filter(pk=property.pk).update(lease_start_date=start.replace(hour=0), lease_end_date=end.replace(hour=0))
+            self.leases.append((property, make_tenant(name.replace(' ', '-').lower(), leased_property=property)))
+        make_property(self.landlord, 'Vacant', rent='700.00')
+
+    def test_expected_income_follows_lease_months(self):
+        for property, tenant in self.leases:
+            Revenue.objects.create(landlord=self.landlord, property=property, tenant=tenant, amount=property.rent_amount, payment_date=paid_on(2023, 3, 2))
+
+        forecast = rent_roll_forecast(self.landlord, ahead=2, history=3, today=datetime.date(2023, 5, 20))
+
+        self.assertEqual(forecast['months'], ['2023-02', '2023-03', '2023-04', '2023-05', '2023-06', '2023-07'])
+        self.assertEqual(forecast['expected'], [Decimal(amount) for amount in ('1000', '1500', '1500', '1500', '500', '500')])
+        self.assertEqual(forecast['actual'], [0, 1500, 0, 0, None, None])
+        self.assertEqual(forecast['collection_rate'], [0.0, 1.0, 0.0, 0.0, None, None])
+        self.assertEqual((forecast['expected_to_date'], forecast['collected_to_date']), (Decimal('5500'), Decimal('1500')))
+        self.assertEqual((forecast['collection_rate_to_date'], forecast['expected_ahead']), (0.2727, Decimal('1000')))
+
+    def test_forecast_bills_the_same_months_as_rent_dues(self):
+        forecast = rent_roll_forecast(self.landlord, ahead=11, history=0, today=datetime.date(2023, 1, 1))
+
+        for month, expected in zip(forecast['months'], forecast['expected']):
+            due_date = datetime.datetime.strptime(month, '%Y-%m').date()
+            generate_rent_dues(due_date)
+            with self.subTest(month=month):
+                self.assertEqual(RentDue.objects.filter(due_date=due_date).aggregate(total=models.Sum('rent_amount'))['total'] or 0, expected)
+
+    def test_endpoint_validates_the_horizon(self):
+        client = APIClient()
+        client.force_authenticate(user=self.landlord)
+
+        self.assertEqual(len(client.get('/earnings/forecast/').json()['months']), 25)
+        self.assertEqual(client.get('/earnings/forecast/', {'months': 'soon'}).status_code, 400)
+        self.assertEqual(client.get('/earnings/forecast/', {'history': '-1'}).status_code, 400)
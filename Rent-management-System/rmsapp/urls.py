@@ -1,16 +1,32 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 urlpatterns = [
      path('', views.index, name='index'),
-     path('', views.RentView, name='tenant'), 
-     path('', views.register_landlord, name='register landlord'),
-     path('', views.TenantRegistrationView, name='register tenant'),
-     path('', views.is_property_available, name='check property'),
-     path('', views.add_tenant, name='add tenant'),
-     path('', views.AddPropertyView, NAME='add property'),
-     path('', views.view_property_and_tenants, name='view properties and tenants'),
-     path('', views.total_earnings_for_month, name='check total income for month'),
-     path('', views.total_earnings_for_year, name='check total income for year'),
-     path('', views.monthly_income_graph, name='create monthly income graph'),
-     path('', views.yearly_income_graph, name='create yearly income graph')
-]
\ No newline at end of file
+     path('register/landlord/', views.register_landlord, name='register landlord'),
+     path('register/tenant/', views.TenantRegistrationView.as_view(), name='register tenant'),
+     path('register/tenants/', views.register_tenants_bulk, name='register tenants'),
+     path('invite/accept/', views.accept_invite, name='accept invite'),
+     path('tenants/', views.ListView.as_view(), name='tenant'),
+     path('properties/add/', views.AddPropertyView.as_view(), name='add property'),
+     path('properties/availability/', views.property_availability, name='check property'),
+     path('occupancy/', views.vacancy_rate, name='vacancy rate'),
+     path('dashboard/', views.dashboard, name='dashboard'),
+     path('dashboard/cache-stats/', views.response_cache_stats, name='response_cache_stats'),
+     path('metrics/', views.performance_metrics, name='performance metrics'),
+     path('import/', views.ImportView.as_view(), name='bulk import'),
+     path('export/<str:ledger>/', views.export_ledger, name='export ledger'),
+     path('arrears/', views.arrears_report, name='arrears report'),
+     path('earnings/<int:year>/<int:month>/', views.total_earnings_for_month, name='check total income for month'),
+     path('earnings/<int:year>/', views.total_earnings_for_year, name='check total income for year'),
+     path('earnings/series/', views.earnings_series, name='earnings series'),
+     path('earnings/forecast/', views.earnings_forecast, name='earnings forecast'),
+     path('graphs/monthly/<int:year>/<int:month>/', views.monthly_income_graph, name='create monthly income graph'),
+     path('graphs/yearly/<int:year>/', views.yearly_income_graph, name='create yearly income graph'),
+     # Async versions of the read-heavy endpoints, for ASGI deployments
+     path('async/dashboard/', async_views.dashboard, name='async dashboard'),
+     path('async/earnings/<int:year>/<int:month>/', async_views.total_earnings_for_month, name='async check total income for month'),
+     path('async/earnings/<int:year>/', async_views.total_earnings_for_year, name='async check total income for year'),
+     path('async/earnings/series/', async_views.earnings_series, name='async earnings series'),
+     path('async/graphs/monthly/<int:year>/<int:month>/', async_views.monthly_income_graph, name='async create monthly income graph'),
+     path('async/graphs/yearly/<int:year>/', async_views.yearly_income_graph, name='async create yearly income graph'),
+]
@@ -4,17 +4,45 @@ from .models import *
 from rest_framework.response import Response
 from .serializer import *
 from rest_framework.generics import ListCreateAPIView, CreateAPIView
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.core.mail import send_mail
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from .mail import queue_mail
+from .cache import CACHED_VIEWS, cache_per_landlord, cache_stats
+from .metrics import registry
+from .routers import read_from_replica
 from django.conf import settings
-from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.db import transaction
 from rest_framework.views import APIView
-import plotly.express as px
+from rest_framework.parsers import MultiPartParser
+from .pagination import TenantCursorPagination
+from .importer import IMPORTERS, import_file, text_stream
+from .arrears import aging_report
+from .occupancy import vacancy_report
+from .forecast import rent_roll_forecast
+from .registration import MAX_BULK_TENANTS, register_tenants
+from .invitations import accept_invitation
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from . import charts, exports
+import calendar
+import datetime
+import json
+from decimal import Decimal
 
 # Create your views here.
+MAX_SERIES_MONTHS = 120
+
+def parse_month(value, default):
+    """
+    Parse a ``YYYY-MM`` query parameter into the first day of that month.
+    """
+    if not value:
+        return default
+    return datetime.datetime.strptime(value, '%Y-%m').date()
+
+
 def index(request):
     context = {'message': 'Hello world!'}
     return render(request, 'index.html', context)
@@ -33,86 +61,168 @@ def register_landlord(request):
     if not email or not phone_number:
         return JsonResponse({'error': 'Email and phone number are required'}, status=400)
 
+    # Landlords sign in with their email as username
+    if len(email) > Landlord._meta.get_field('username').max_length:
+        return JsonResponse({'error': 'Email is too long'}, status=400)
+    if Landlord.objects.filter(username=email).exists():
+        return JsonResponse({'error': 'A landlord with this email already exists'}, status=400)
+
     # Create a new landlord object
     landlord = Landlord(
-        first_name=first_name,
-        second_name=second_name,
+        username=email,
+        first_name=first_name or '',
+        last_name=second_name or '',
         email=email,
-        phone_number=phone_number,
-        address=address
+        address=address or ''
     )
+    landlord.set_unusable_password()
 
     # Save the landlord to the database
     landlord.save()
 
-    # Send confirmation email
+    # Queue confirmation email
     subject = 'Welcome to Quebec Rent Managing System'
     message = f'Thank you for registering, {first_name}! Your account has been created successfully.'
     from_email = settings.DEFAULT_FROM_EMAIL  # Use the default sender email from Django settings
 
-    send_mail(subject, message, from_email, [email])
+    queue_mail(subject, message, from_email, [email])
 
-    return JsonResponse({'message': 'Landlord registered successfully'})
-
-User = get_user_model()
+    return JsonResponse({'message': 'Landlord registered successfully'}, status=201)
 
 class TenantRegistrationView(CreateAPIView):
-    serializer_class = TenantSerializer
+    serializer_class = TenantSignupSerializer
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         # Extract property_id from the request data
         property_id = request.data.get('property_id')
 
-        # Check if the property with the given ID exists
+        # Check if the property with the given ID exists, and lock it until the lease is saved
         try:
-            property_instance = Property.objects.get(pk=property_id)
-        except Property.DoesNotExist:
+            property_instance = Property.objects.select_for_update().get(pk=property_id)
+        except (Property.DoesNotExist, ValueError, TypeError):
             return Response({'error': 'Property not found'}, status=status.HTTP_404_NOT_FOUND)
 
         # Ensure the property is available (status=True)
         if not property_instance.status:
             return Response({'error': 'Property is not available for leasing'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create a new tenant with the leased property
+        # Ensure nobody is leasing it already
+        if property_instance.occupied:
+            return Response({'error': 'Property is currently occupied'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Create the tenant with the leased property, which marks it occupied
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-
-        # Update the leased_property field for the tenant
-        tenant = User.objects.get(email=serializer.data['email'])
-        tenant.leased_property = property_instance
-        tenant.save()
+        serializer.save(leased_property=property_instance)
 
-        # Send confirmation email
+        # Queue confirmation email
         subject = 'Welcome to Quebec Homes LTD'
         message = f'Thank you for registering, {serializer.data["first_name"]}! Your account has been created successfully.'
         from_email = settings.DEFAULT_FROM_EMAIL
 
-        send_mail(subject, message, from_email, [serializer.data['email']])
+        queue_mail(subject, message, from_email, [serializer.data['email']])
 
         # Success message
-        success_message = 'Tenant registered successfully. Confirmation email sent.'
+        success_message = 'Tenant registered successfully. Confirmation email queued.'
 
         headers = self.get_success_headers(serializer.data)
         return Response({'message': success_message, 'data': serializer.data}, status=status.HTTP_201_CREATED, headers=headers)
 
+#Register many tenants at once
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def register_tenants_bulk(request):
+    """
+    Register the ``tenants`` list, each item with a ``property_id`` of the landlord's, and
+    return a result per item.
+    """
+    items = request.data.get('tenants') if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not 0 < len(items) <= MAX_BULK_TENANTS:
+        return Response({'error': f'Send a list of 1 to {MAX_BULK_TENANTS} tenants'}, status=status.HTTP_400_BAD_REQUEST)
+
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    try:
+        results = register_tenants(landlord, items)
+    except ImproperlyConfigured as error:
+        # Tenants sent without a password need an invitation link, which RMS_INVITE_URL is not set up to build
+        return Response({'error': str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    created = sum(result['status'] == 'created' for result in results)
+    return Response(
+        {'created': created, 'errors': len(results) - created, 'results': results},
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+    )
+
+#Invited tenants choose their password
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def accept_invite(request):
+    uid = request.data.get('uid')
+    token = request.data.get('token')
+    password = request.data.get('password')
+    if not uid or not token or not password:
+        return JsonResponse({'error': 'uid, token and password are required'}, status=400)
+
+    try:
+        tenant = accept_invitation(uid, token, password)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    except ValidationError as error:
+        return JsonResponse({'error': error.messages}, status=400)
+    return JsonResponse({'message': 'Password set successfully', 'username': tenant.username})
+
 class ListView (ListCreateAPIView):
-    queryset = Tenant.objects.all()
+    queryset = Tenant.objects.prefetch_related('groups', 'user_permissions')
     serializer_class = TenantSerializer
+    pagination_class = TenantCursorPagination
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        # Bulk exports stream every tenant as one JSON array instead of paging
+        if request.query_params.get('stream', '').lower() in ('1', 'true', 'yes'):
+            queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+            return StreamingHttpResponse(self.stream_tenants(queryset), content_type='application/json')
+        return super().list(request, *args, **kwargs)
+
+    def stream_tenants(self, queryset):
+        """
+        Yield the JSON array of tenants one chunk at a time.
+        """
+        buffer = []
+        separator = '['
+        for tenant in tenant_list_encoder.iter_encode(queryset, chunk_size=self.stream_chunk_size):
+            buffer.append(separator + json.dumps(tenant))
+            separator = ','
+            if len(buffer) == self.stream_chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+        buffer.append(']' if separator == ',' else '[]')
+        yield ''.join(buffer)
 
 #Dashboard for authenticated users
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_per_landlord('dashboard')
+@read_from_replica
 def dashboard(request):
-    user = request.user
-    properties = Property.objects.filter(landlord=user.landlord)
-    tenants = Tenant.objects.filter(property__landlord=user.landlord)
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    properties = Property.objects.filter(landlord=landlord)
+    tenants = Tenant.objects.filter(leased_property__landlord=landlord)
 
-    # Serialize data using Django Rest Framework serializers
-    property_serializer = PropertySerializer(properties, many=True)
-    tenant_serializer = TenantSerializer(tenants, many=True)
+    # Encode with the read-only list encoders; the M2M fields cost one query each however many tenants there are
+    return Response({'properties': property_list_encoder.encode(properties), 'tenants': tenant_list_encoder.encode(tenants)})
 
-    return Response({'properties': property_serializer.data, 'tenants': tenant_serializer.data})
+#Hit and miss counters of the response cache
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def response_cache_stats(request):
+    return JsonResponse(cache_stats(CACHED_VIEWS))
+
+#Latency, query and payload percentiles per view, for this process
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def performance_metrics(request):
+    return JsonResponse(registry.report())
 
 #Check whether property is available
 def is_property_available(property_id):
@@ -121,12 +231,10 @@ def is_property_available(property_id):
     except Property.DoesNotExist:
         return False, Response({'error': 'Property not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    today = datetime.today().date()
-
     if not property_instance.status:
         return False, Response({'error': 'Property is not available for leasing'}, status=status.HTTP_400_BAD_REQUEST)
 
-    if today < property_instance.lease_start_date:
+    if timezone.now() < property_instance.lease_start_date:
         return False, Response({'error': 'Lease start date has not started yet'}, status=status.HTTP_400_BAD_REQUEST)
 
     if not property_instance.is_occupied():
@@ -134,6 +242,46 @@ def is_property_available(property_id):
     else:
         return False, Response({'error': 'Property is currently occupied'}, status=status.HTTP_400_BAD_REQUEST)
 
+#Check which of many properties are available
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def property_availability(request):
+    """
+    Return which of the comma separated property ``ids`` are free on ``date`` (YYYY-MM-DD, default today).
+    Other landlords' properties are reported as unavailable.
+    """
+    try:
+        property_ids = [int(property_id) for property_id in request.query_params.get('ids', '').split(',') if property_id]
+        day = datetime.datetime.strptime(request.query_params['date'], '%Y-%m-%d').replace(tzinfo=datetime.timezone.utc) if 'date' in request.query_params else timezone.now()
+    except ValueError:
+        return JsonResponse({'error': 'ids must be integers and date formatted as YYYY-MM-DD'}, status=400)
+
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    available = available_property_ids(landlord, property_ids, day)
+    return JsonResponse({'available': sorted(available), 'unavailable': sorted(set(property_ids) - available)})
+
+#Occupied and vacant property-days over a date range
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cache_per_landlord('vacancy_rate')
+@read_from_replica
+def vacancy_rate(request):
+    """
+    Return the vacancy rate between ``start`` and ``end`` (YYYY-MM-DD, inclusive; default
+    from the start of the year to today), in total and per month.
+    """
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    today = datetime.date.today()
+    try:
+        start = datetime.date.fromisoformat(request.query_params['start']) if request.query_params.get('start') else today.replace(month=1, day=1)
+        end = datetime.date.fromisoformat(request.query_params['end']) if request.query_params.get('end') else today
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be formatted as YYYY-MM-DD'}, status=400)
+    if start > end:
+        return JsonResponse({'error': 'start must not be after end'}, status=400)
+
+    return JsonResponse(vacancy_report(landlord, start, end))
+
 #Adding tenants
 def add_tenant(request):
     # Check if the user has the necessary permission to add tenants
@@ -193,6 +341,75 @@ class AddPropertyView(APIView):
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+#Bulk import of properties, tenants and revenue
+class ImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Import an uploaded CSV/JSONL ``file`` of ``kind`` records for the authenticated landlord.
+        Imported tenants are emailed an invitation to choose their password with ``invite=true``.
+        """
+        kind = request.data.get('kind')
+        upload = request.FILES.get('file')
+        if kind not in IMPORTERS or upload is None:
+            return Response({'error': f"Send a file and a kind ({', '.join(sorted(IMPORTERS))})"}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get('file_format') or upload.name.rsplit('.', 1)[-1].lower()
+        if file_format not in ('csv', 'jsonl'):
+            return Response({'error': 'file_format must be csv or jsonl'}, status=status.HTTP_400_BAD_REQUEST)
+
+        options = {'invite': True} if kind == 'tenants' and request.data.get('invite') == 'true' else {}
+        landlord = request.user  # Assuming the authenticated user is a landlord
+        try:
+            report = import_file(kind, text_stream(upload), file_format, landlord, **options)
+        except ImproperlyConfigured as error:
+            return Response({'error': str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(report.as_dict(), status=status.HTTP_201_CREATED if report.created else status.HTTP_400_BAD_REQUEST)
+
+#Export the revenue or payment ledger
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_ledger(request, ledger):
+    """
+    Stream the landlord's ``revenue`` or ``payments`` ledger between ``start`` and ``end``
+    (YYYY-MM-DD, inclusive) as CSV, or as Parquet with ``export=parquet``.
+    """
+    if ledger not in exports.LEDGERS:
+        return JsonResponse({'error': f"Unknown ledger, use one of {', '.join(exports.LEDGERS)}"}, status=404)
+
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    try:
+        start = datetime.date.fromisoformat(request.query_params['start']) if request.query_params.get('start') else None
+        end = datetime.date.fromisoformat(request.query_params['end']) if request.query_params.get('end') else None
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be formatted as YYYY-MM-DD'}, status=400)
+
+    export = request.query_params.get('export', 'csv')
+    if export == 'parquet' and not exports.parquet_available():
+        return JsonResponse({'error': 'Parquet export needs pyarrow to be installed'}, status=400)
+    if export not in ('csv', 'parquet'):
+        return JsonResponse({'error': 'export must be csv or parquet'}, status=400)
+
+    columns, types, rows = exports.ledger_rows(ledger, landlord, start, end)
+    if export == 'parquet':
+        response = StreamingHttpResponse(exports.iter_parquet(columns, types, rows), content_type='application/vnd.apache.parquet')
+    else:
+        response = StreamingHttpResponse(exports.iter_csv(columns, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{ledger}.{export}"'
+    return response
+
+#Rent arrears bucketed by days overdue
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def arrears_report(request):
+    """
+    Return what every tenant owed at the last snapshot refresh, split into 0-30, 31-60, 61-90 and over 90 days overdue.
+    """
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    return JsonResponse(aging_report(landlord))
+
 #View tenants and properties
 def view_property_and_tenants(request, property_id):
     # Check if the user has the necessary permission to view tenants
@@ -225,6 +442,8 @@ def view_property_and_tenants(request, property_id):
 #Calculate the total yearly income
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_per_landlord('total_earnings_for_year')
+@read_from_replica
 def total_earnings_for_year(request, year):
     """
     Calculate and return the total earnings for a specific year.
@@ -237,6 +456,8 @@ def total_earnings_for_year(request, year):
 #Calculate the total monthly income
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_per_landlord('total_earnings_for_month')
+@read_from_replica
 def total_earnings_for_month(request, year, month):
     """
     Calculate and return the total earnings for a specific month.
@@ -246,45 +467,133 @@ def total_earnings_for_month(request, year, month):
     
     return JsonResponse({'total_earnings': total_earnings})
 
+#Earnings for every month of a date range
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cache_per_landlord('earnings_series')
+@read_from_replica
+def earnings_series(request):
+    """
+    Return the monthly earnings between ``start`` and ``end`` (YYYY-MM, inclusive),
+    optionally split per property with ``by_property=true``.
+    """
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    try:
+        start_month, end_month, by_property = series_params(request.query_params)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    months, series = landlord.earnings_series(start_month, end_month, by_property=by_property)
+    return series_response(months, series, by_property)
+
+#Expected income from current leases against what was collected
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cache_per_landlord('earnings_forecast')
+@read_from_replica
+def earnings_forecast(request):
+    """
+    Return the expected income of the current month and the next ``months`` months (default 12),
+    and the expected and collected income of the past ``history`` months (default 12).
+    """
+    landlord = request.user  # Assuming the authenticated user is a landlord
+    try:
+        ahead = int(request.query_params.get('months', 12))
+        history = int(request.query_params.get('history', 12))
+    except ValueError:
+        return JsonResponse({'error': 'months and history must be integers'}, status=400)
+    if not (0 <= ahead < MAX_SERIES_MONTHS and 0 <= history < MAX_SERIES_MONTHS):
+        return JsonResponse({'error': f'months and history must be between 0 and {MAX_SERIES_MONTHS - 1}'}, status=400)
+
+    return JsonResponse(rent_roll_forecast(landlord, ahead, history))
+
+def series_params(query_params):
+    """
+    Read and validate the ``start``, ``end`` and ``by_property`` parameters of the earnings series.
+    """
+    today = datetime.date.today()
+    try:
+        start_month = parse_month(query_params.get('start'), datetime.date(today.year, 1, 1))
+        end_month = parse_month(query_params.get('end'), datetime.date(today.year, 12, 1))
+    except ValueError:
+        raise ValueError('start and end must be formatted as YYYY-MM')
+
+    if start_month > end_month:
+        raise ValueError('start must not be after end')
+    if (end_month.year - start_month.year) * 12 + end_month.month - start_month.month >= MAX_SERIES_MONTHS:
+        raise ValueError(f'The range can span at most {MAX_SERIES_MONTHS} months')
+
+    return start_month, end_month, query_params.get('by_property', '').lower() in ('1', 'true', 'yes')
+
+def series_response(months, series, by_property):
+    labels = [month.strftime('%Y-%m') for month in months]
+    if by_property:
+        return JsonResponse({'months': labels, 'properties': series})
+    return JsonResponse({'months': labels, 'totals': series})
+
 #Graphical progress of monthly income
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_per_landlord('monthly_income_graph')
+@read_from_replica
 def monthly_income_graph(request, year, month):
     """
-    Generate and return a bar chart for monthly income.
+    Return the income per property for a month as ``labels``/``totals`` arrays,
+    or as a Plotly bar chart with ``chart=plotly``.
     """
     landlord = request.user  # Assuming the authenticated user is a landlord
-    start_date = f'{year}-{month:02d}-01'
-    end_date = f'{year}-{month:02d}-31'
-    
-    monthly_revenue_data = Revenue.objects.filter(
-        landlord=landlord,
-        payment_date__range=[start_date, end_date]
-    ).values('property__property_name').annotate(total_amount=models.Sum('amount'))
+    first_month = datetime.date(year, month, 1)
 
-    fig = px.bar(monthly_revenue_data, x='property__property_name', y='total_amount', title=f'Monthly Income - {start_date} to {end_date}')
-    
-    return JsonResponse({'graph': fig.to_json()})
+    labels, totals = income_by_property(landlord, first_month, first_month)
+    return income_graph_response(request, labels, totals, monthly_graph_title(year, month))
 
 #Graph for yearly income progress 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_per_landlord('yearly_income_graph')
+@read_from_replica
 def yearly_income_graph(request, year):
     """
-    Generate and return a bar chart for yearly income.
+    Return the income per property for a year as ``labels``/``totals`` arrays,
+    or as a Plotly bar chart with ``chart=plotly``.
     """
     landlord = request.user  # Assuming the authenticated user is a landlord
-    start_date = f'{year}-01-01'
-    end_date = f'{year}-12-31'
-    
-    yearly_revenue_data = Revenue.objects.filter(
+
+    labels, totals = income_by_property(landlord, datetime.date(year, 1, 1), datetime.date(year, 12, 1))
+    return income_graph_response(request, labels, totals, yearly_graph_title(year))
+
+def monthly_graph_title(year, month):
+    return f'Monthly Income - {year}-{month:02d}-01 to {year}-{month:02d}-{calendar.monthrange(year, month)[1]}'
+
+def yearly_graph_title(year):
+    return f'Yearly Income - {year}-01-01 to {year}-12-31'
+
+def income_by_property(landlord, start_month, end_month):
+    """
+    Sum the monthly revenue rollup per property between two months (inclusive).
+    """
+    return income_series(income_rows(landlord, start_month, end_month))
+
+def income_rows(landlord, start_month, end_month):
+    return PropertyMonthlyRevenue.objects.filter(
         landlord=landlord,
-        payment_date__range=[start_date, end_date]
-    ).values('property__property_name').annotate(total_amount=models.Sum('amount'))
+        month__gte=start_month,
+        month__lte=end_month
+    ).values('property_id', 'property__property_name').annotate(total_amount=models.Sum('total')).order_by('property_id')
 
-    fig = px.bar(yearly_revenue_data, x='property__property_name', y='total_amount', title=f'Yearly Income - {start_date} to {end_date}')
-    
-    return JsonResponse({'graph': fig.to_json()})
+def income_series(rows):
+    labels = [row['property__property_name'] for row in rows]
+    totals = [row['total_amount'].quantize(Decimal('0.01')) for row in rows]
+    return labels, totals
+
+def income_graph_response(request, labels, totals, title):
+    """
+    Return the chart series, building the Plotly figure only when it is asked for.
+    """
+    if request.query_params.get('chart') == 'plotly':
+        return JsonResponse({'graph': charts.plotly_bar_json(labels, totals, title)})
+
+    return JsonResponse({'title': title, 'labels': labels, 'totals': totals})
 
 # class RentView(APIView):
 #     def get(self, request):